@@ -0,0 +1,200 @@
+"""Token-budgeted chat history with a rolling summary.
+
+The agent re-sends its history on every model call of a turn, and single
+messages can be large (long replies, CV or transcript text pasted from
+/chat/upload-file). The newest messages are therefore kept against a
+token budget counted with the local tokenizer, each capped in size.
+Older messages are folded into a rolling summary per conversation by a
+background task that runs alongside the turn, so a turn never waits for
+it; a fresh summary is used from the next turn on. The prompt sent on
+each call stays bounded however long the chat runs.
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from app.config import get_settings
+from app.rag.embeddings import get_async_openai_client
+from app.rag.tokenizer import count_tokens, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+# Per-message overhead (role and separators) in the chat format
+_MESSAGE_OVERHEAD_TOKENS = 4
+
+_SUMMARY_PROMPT = """You maintain a running summary of a conversation between a prospective student and Lyon, the NBS Degree Advisor.
+Update the summary with the new messages. Keep what matters for advising: the student's background (education, experience, industry, scores), the programmes they are considering, their goals and constraints, questions already answered and any commitments made (e.g. a hand-off to an advisor).
+Write plain sentences, no lists, at most {max_tokens} tokens."""
+
+
+@dataclass
+class _Summary:
+    text: str
+    # created_at of the newest message folded into the summary
+    covered_until: str
+
+
+def _message_tokens(message: dict) -> int:
+    return count_tokens(message["content"]) + _MESSAGE_OVERHEAD_TOKENS
+
+
+def _cap(message: dict, max_tokens: int) -> dict:
+    """Truncate an oversized message, marking the cut."""
+    if count_tokens(message["content"]) <= max_tokens:
+        return message
+    return {**message, "content": truncate_to_tokens(message["content"], max_tokens) + " [...]"}
+
+
+def select_recent(messages: list[dict], token_budget: int, message_max_tokens: int) -> tuple[list[dict], list[dict]]:
+    """Split history into the newest messages that fit a token budget and the rest.
+
+    Args:
+        messages: History records (role, content, created_at), oldest first
+        token_budget: Tokens available for verbatim history
+        message_max_tokens: Cap applied to each kept message
+
+    Returns:
+        Tuple of (older messages, kept messages), both oldest first
+    """
+    kept: list[dict] = []
+    used = 0
+    for i in range(len(messages) - 1, -1, -1):
+        message = _cap(messages[i], message_max_tokens)
+        tokens = _message_tokens(message)
+        if used + tokens > token_budget:
+            return messages[:i + 1], kept
+        kept.insert(0, message)
+        used += tokens
+    return [], kept
+
+
+class HistoryManager:
+    """Builds bounded history for the agent and keeps rolling summaries."""
+
+    def __init__(
+        self,
+        token_budget: int,
+        message_max_tokens: int,
+        summary_max_tokens: int,
+        summary_model: str,
+        max_conversations: int,
+        summaries_enabled: bool = True,
+    ):
+        self.token_budget = token_budget
+        self.message_max_tokens = message_max_tokens
+        self.summary_max_tokens = summary_max_tokens
+        self.summary_model = summary_model
+        self.max_conversations = max_conversations
+        self.summaries_enabled = summaries_enabled
+        self._summaries: OrderedDict[str, _Summary] = OrderedDict()
+        self._refreshing: dict[str, asyncio.Task] = {}
+
+    def build(self, conversation_id: str, records: list[dict]) -> list[tuple[str, str]]:
+        """Assemble (role, content) history messages for the next agent call.
+
+        The summary (if any) comes first as a system message, followed by
+        the newest messages that fit in what is left of the budget. Older
+        messages not yet summarized are folded in by a background refresh.
+
+        Args:
+            conversation_id: Conversation ID
+            records: History records, oldest first
+
+        Returns:
+            Messages in the agent's (role, content) format
+        """
+        summary = self._summaries.get(conversation_id)
+        budget = self.token_budget
+        messages: list[tuple[str, str]] = []
+        if summary is not None:
+            self._summaries.move_to_end(conversation_id)
+            content = f"Summary of the earlier conversation: {summary.text}"
+            messages.append(("system", content))
+            budget -= count_tokens(content) + _MESSAGE_OVERHEAD_TOKENS
+            # Messages the summary already covers are never sent verbatim
+            records = [r for r in records if (r.get("created_at") or "") > summary.covered_until]
+
+        older, kept = select_recent(records, max(budget, 0), self.message_max_tokens)
+        if older and self.summaries_enabled:
+            self._schedule_refresh(conversation_id, older)
+
+        messages.extend((r["role"], r["content"]) for r in kept)
+        return messages
+
+    async def close(self) -> None:
+        """Wait for in-flight summary refreshes (called on application shutdown)."""
+        if self._refreshing:
+            await asyncio.gather(*self._refreshing.values(), return_exceptions=True)
+
+    def _schedule_refresh(self, conversation_id: str, older: list[dict]) -> None:
+        if conversation_id in self._refreshing:
+            return
+        task = asyncio.create_task(self._refresh(conversation_id, older))
+        self._refreshing[conversation_id] = task
+        task.add_done_callback(lambda _: self._refreshing.pop(conversation_id, None))
+
+    async def _refresh(self, conversation_id: str, older: list[dict]) -> None:
+        previous = self._summaries.get(conversation_id)
+        # Fold at most one budget's worth of the oldest unsummarized messages per refresh
+        batch: list[dict] = []
+        used = 0
+        for record in older:
+            record = _cap(record, self.message_max_tokens)
+            tokens = _message_tokens(record)
+            if batch and used + tokens > self.token_budget:
+                break
+            batch.append(record)
+            used += tokens
+
+        transcript = "\n".join(f"{r['role']}: {r['content']}" for r in batch)
+        prompt = f"Current summary: {previous.text}\n\nNew messages:\n{transcript}" if previous else f"Messages:\n{transcript}"
+        try:
+            client = get_async_openai_client()
+            response = await client.chat.completions.create(
+                model=self.summary_model,
+                messages=[
+                    {"role": "system", "content": _SUMMARY_PROMPT.format(max_tokens=self.summary_max_tokens)},
+                    {"role": "user", "content": prompt},
+                ],
+            )
+            text = (response.choices[0].message.content or "").strip()
+        except Exception as e:
+            logger.warning("History summary refresh failed for %s: %s", conversation_id, e)
+            return
+        if not text:
+            return
+
+        self._summaries[conversation_id] = _Summary(
+            text=truncate_to_tokens(text, self.summary_max_tokens),
+            covered_until=batch[-1].get("created_at") or "",
+        )
+        self._summaries.move_to_end(conversation_id)
+        while len(self._summaries) > self.max_conversations:
+            self._summaries.popitem(last=False)
+
+
+_manager: HistoryManager | None = None
+
+
+def get_history_manager() -> HistoryManager:
+    """Get the shared history manager."""
+    global _manager
+    if _manager is None:
+        settings = get_settings()
+        _manager = HistoryManager(
+            token_budget=settings.history_token_budget,
+            message_max_tokens=settings.history_message_max_tokens,
+            summary_max_tokens=settings.history_summary_max_tokens,
+            summary_model=settings.history_summary_model or settings.chat_model,
+            max_conversations=settings.conversation_cache_max_conversations,
+            summaries_enabled=settings.history_summary_enabled,
+        )
+    return _manager
+
+
+async def close_history_manager() -> None:
+    """Let in-flight summary refreshes finish (called on application shutdown)."""
+    if _manager is not None:
+        await _manager.close()
@@ -7,8 +7,9 @@ from langchain.agents import create_agent
 from langchain.agents.middleware import ModelCallLimitMiddleware
 
 from app.config import get_settings
+from app.agents.history import get_history_manager
 from app.agents.tools import create_rag_tool, create_compare_tool, create_faq_tool, create_handoff_tool
-from app.db.supabase import get_chat_history, store_chat_message
+from app.db.chat_buffer import flush_chat_messages, load_chat_history, record_chat_message, start_conversation
 
 
 # System prompt for Lyon, NTU's lion mascot and NBS Degree Advisor
@@ -155,36 +156,32 @@ class NBSAdvisorAgent:
         # Generate conversation ID if not provided
         if not conversation_id:
             conversation_id = str(uuid.uuid4())
+            start_conversation(conversation_id)
 
-        # Load chat history
+        settings = get_settings()
+
+        # Load chat history, bounded by a token budget (older turns are summarized)
         chat_history = []
         try:
-            history_records = await get_chat_history(conversation_id, limit=10)
-            for record in history_records:
-                chat_history.append({
-                    "role": record["role"],
-                    "content": record["content"]
-                })
+            history_records = await load_chat_history(conversation_id, limit=settings.history_max_messages)
+            chat_history = get_history_manager().build(conversation_id, history_records)
         except Exception:
             # Continue without history if loading fails
             pass
 
-        # Store user message
+        # Store user message (write-behind, off the request path)
         try:
-            await store_chat_message(conversation_id, "user", message)
+            await record_chat_message(conversation_id, "user", message)
         except Exception:
             pass
 
         # Run agent
         try:
             # Build messages list
-            messages = []
-            for msg in chat_history:
-                messages.append((msg["role"], msg["content"]))
+            messages = list(chat_history)
             messages.append(("user", message))
 
             # Invoke agent with proper recursion limit for graph execution
-            settings = get_settings()
             result = await self.agent.ainvoke(
                 {"messages": messages},
                 config={"recursion_limit": settings.agent_recursion_limit}
@@ -222,7 +219,7 @@ class NBSAdvisorAgent:
 
             # Store assistant response
             try:
-                await store_chat_message(conversation_id, "assistant", response)
+                await record_chat_message(conversation_id, "assistant", response)
             except Exception:
                 pass
 
@@ -241,6 +238,10 @@ class NBSAdvisorAgent:
                 "sources": []
             }
 
+        finally:
+            # Serverless instances may be frozen once the response is sent
+            await flush_chat_messages()
+
 
 # Global agent instance
 _agent_instance: NBSAdvisorAgent | None = None
@@ -2,7 +2,7 @@
 
 from langchain_core.tools import tool
 from app.rag.retriever import retrieve_comparison_documents
-from app.db.supabase import get_supabase_client
+from app.db.catalog import get_programme_catalog
 
 
 def create_compare_tool():
@@ -36,19 +36,10 @@ def create_compare_tool():
             if len(programs) < 2:
                 return "Please provide at least two programs to compare, separated by commas."
 
-            # Get program data from database
-            client = get_supabase_client()
-            program_data = []
-
-            for prog_name in programs:
-                result = client.table("programs").select("*").ilike(
-                    "name", f"%{prog_name}%"
-                ).limit(1).execute()
-
-                if result.data:
-                    program_data.append(result.data[0])
-
-            # Get additional context from RAG
+            # Programme data from the in-memory catalog; RAG context with a
+            # fixed quota per programme
+            catalog = await get_programme_catalog()
+            program_data = [prog for prog in map(catalog.find, programs) if prog]
             rag_results = await retrieve_comparison_documents(programs)
 
             # Format comparison
@@ -69,7 +60,7 @@ def create_compare_tool():
             # RAG context
             if rag_results:
                 comparison.append("### Additional Details\n")
-                for doc in rag_results[:4]:
+                for doc in rag_results:
                     content = doc.get("content", "")
                     metadata = doc.get("metadata", {})
                     program = metadata.get("program", "")
@@ -1,6 +1,7 @@
 """RAG retrieval tool for the NBS Advisor agent."""
 
 from langchain_core.tools import tool
+from app.rag.context_packer import pack_context
 from app.rag.retriever import retrieve_relevant_documents
 
 
@@ -12,7 +13,7 @@ def create_rag_tool():
     """
 
     @tool
-    async def search_nbs_knowledge(query: str) -> str:
+    async def search_nbs_knowledge(query: str, programme: str = "") -> str:
         """Search the NBS knowledge base for information about degree programs.
 
         Use this tool to find specific information about NBS programs, including:
@@ -24,24 +25,35 @@ def create_rag_tool():
 
         Args:
             query: The search query about NBS programs
+            programme: Optional programme name to restrict the search to
+                       (e.g. "MSc Finance", "Nanyang MBA"). Leave empty for
+                       general or multi-programme questions.
 
         Returns:
             Relevant information from the knowledge base
         """
         try:
-            # Fetch a wide candidate set to work around pgvector HNSW
-            # approximate index misses, then return top 8 to the LLM.
-            documents = await retrieve_relevant_documents(query, match_count=80)
+            # Exact search via the local index; the RPC fallback over-fetches
+            # internally to work around approximate index misses. A programme
+            # filter narrows the candidates, so fewer results are needed.
+            candidates = await retrieve_relevant_documents(
+                query, match_count=8 if programme else 12, program=programme or None
+            )
+
+            # Drop duplicate sub-page/section text and keep the context
+            # within the token budget.
+            documents = pack_context(candidates)
 
             if not documents:
                 return "No relevant information found in the knowledge base. Please try rephrasing your question or ask about specific NBS programs."
 
-            # Format top 8 results (already sorted by similarity)
+            # Format results (in packing order)
             results = []
-            for i, doc in enumerate(documents[:8], 1):
+            for i, doc in enumerate(documents, 1):
                 content = doc.get("content", "")
                 metadata = doc.get("metadata", {})
-                program = metadata.get("program", "NBS")
+                # Shared boilerplate chunks list every programme they belong to
+                program = ", ".join(metadata.get("programs") or [metadata.get("program", "NBS")])
                 doc_type = metadata.get("type", "general")
                 similarity = doc.get("similarity", 0)
 
@@ -4,9 +4,11 @@ from typing import Annotated
 from fastapi import Depends
 
 from app.config import Settings, get_settings
-from app.db.supabase import get_supabase_client
-from supabase import Client
+from app.db.catalog import ProgrammeCatalog, get_programme_catalog
+from app.db.supabase import get_async_supabase_client
+from supabase import AsyncClient
 
 
 SettingsDep = Annotated[Settings, Depends(get_settings)]
-SupabaseDep = Annotated[Client, Depends(get_supabase_client)]
+SupabaseDep = Annotated[AsyncClient, Depends(get_async_supabase_client)]
+CatalogDep = Annotated[ProgrammeCatalog, Depends(get_programme_catalog)]
@@ -186,10 +186,10 @@ async def get_history(conversation_id: str, limit: int = 20):
     Returns:
         List of chat messages
     """
-    from app.db.supabase import get_chat_history
+    from app.db.chat_buffer import load_chat_history
 
     try:
-        history = await get_chat_history(conversation_id, limit=limit)
+        history = await load_chat_history(conversation_id, limit=limit)
         return {"conversation_id": conversation_id, "messages": history}
     except Exception as e:
         raise HTTPException(
@@ -1,39 +1,37 @@
-"""Programs API routes."""
+"""Programs API routes (served from the in-memory programme catalog)."""
 
 from fastapi import APIRouter, HTTPException
-from app.api.deps import SupabaseDep
+from app.api.deps import CatalogDep
 from app.db.models import Program
 
 router = APIRouter(prefix="/programs", tags=["programs"])
 
 
 @router.get("/", response_model=list[Program])
-async def list_programs(supabase: SupabaseDep) -> list[Program]:
+async def list_programs(catalog: CatalogDep) -> list[Program]:
     """List all NBS degree programs."""
-    result = supabase.table("programs").select("*").execute()
-    return [Program(**p) for p in result.data] if result.data else []
+    return [Program(**p) for p in catalog.all()]
 
 
 @router.get("/{program_id}", response_model=Program)
-async def get_program(program_id: str, supabase: SupabaseDep) -> Program:
+async def get_program(program_id: str, catalog: CatalogDep) -> Program:
     """Get a specific program by ID."""
-    result = supabase.table("programs").select("*").eq("id", program_id).single().execute()
-    if not result.data:
+    program = catalog.get(program_id)
+    if program is None:
         raise HTTPException(status_code=404, detail="Program not found")
-    return Program(**result.data)
+    return Program(**program)
 
 
 @router.get("/type/{degree_type}", response_model=list[Program])
-async def get_programs_by_type(degree_type: str, supabase: SupabaseDep) -> list[Program]:
+async def get_programs_by_type(degree_type: str, catalog: CatalogDep) -> list[Program]:
     """Get programs by degree type (MBA, MSc, PhD, etc.)."""
-    result = supabase.table("programs").select("*").ilike("degree_type", f"%{degree_type}%").execute()
-    return [Program(**p) for p in result.data] if result.data else []
+    return [Program(**p) for p in catalog.of_type(degree_type)]
 
 
 @router.get("/{program_id}/profile")
-async def get_program_profile(program_id: str, supabase: SupabaseDep) -> dict:
+async def get_program_profile(program_id: str, catalog: CatalogDep) -> dict:
     """Get a programme's spider chart profile scores."""
-    result = supabase.table("programs").select("name, profile_scores").eq("id", program_id).single().execute()
-    if not result.data:
+    program = catalog.get(program_id)
+    if program is None:
         raise HTTPException(status_code=404, detail="Program not found")
-    return result.data
+    return {"name": program["name"], "profile_scores": program.get("profile_scores")}
@@ -8,7 +8,7 @@ import io
 
 from app.config import get_settings
 from app.rag.embeddings import get_openai_client
-from app.api.deps import SupabaseDep
+from app.api.deps import CatalogDep
 
 router = APIRouter(prefix="/recommend", tags=["recommend"])
 
@@ -142,11 +142,11 @@ PROGRAMME_RATIONALES = {
 
 
 @router.post("/match", response_model=MatchResponse)
-async def match_programmes(answers: BranchAnswers, supabase: SupabaseDep) -> MatchResponse:
+async def match_programmes(answers: BranchAnswers, catalog: CatalogDep) -> MatchResponse:
     """Match user to programmes based on branching quiz answers.
 
     Uses direct lookup from branch answers to programme names,
-    then fetches programme details from the database.
+    then looks up programme details in the programme catalog.
     """
     # Determine track from experience
     track_map = {"junior": "masters", "mid": "both", "senior": "mba"}
@@ -164,13 +164,9 @@ async def match_programmes(answers: BranchAnswers, supabase: SupabaseDep) -> Mat
     if not programme_names:
         return MatchResponse(matches=[])
 
-    # Fetch programme details from database
-    all_programs = supabase.table("programs").select("*").execute()
-    prog_lookup = {p["name"]: p for p in (all_programs.data or []) if p["name"] in IN_SCOPE_PROGRAMMES}
-
     matches = []
     for name in programme_names:
-        prog = prog_lookup.get(name)
+        prog = catalog.by_name(name) if name in IN_SCOPE_PROGRAMMES else None
         if prog:
             matches.append(ProgramMatch(
                 program_id=prog["id"],
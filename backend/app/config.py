@@ -15,8 +15,21 @@ class Settings(BaseSettings):
     supabase_key: str
     supabase_service_key: str | None = None
 
+    # Connection pool shared by the async Supabase clients (see app/db/supabase.py)
+    supabase_max_connections: int = 100
+    supabase_max_keepalive_connections: int = 20
+    supabase_keepalive_expiry: float = 30.0
+    supabase_timeout: float = 30.0
+
+    # Bulk writes are split so no request body exceeds these limits
+    supabase_max_payload_bytes: int = 2_000_000
+    supabase_max_batch_rows: int = 500
+
     # App settings
     debug: bool = False
+    # Set by Vercel (VERCEL=1); serverless instances may be frozen as soon as
+    # a response is sent, so nothing can be left to background tasks
+    vercel: bool = False
     cors_origins: str = "http://localhost:5173,http://localhost:3000,https://*.vercel.app"
 
     # Model settings
@@ -24,10 +37,106 @@ class Settings(BaseSettings):
     chat_model: str = "gpt-5.2"
     embedding_dimensions: int = 1536
 
-    # RAG settings
-    chunk_size: int = 1000
-    chunk_overlap: int = 200
+    # Embedding cache settings (relative paths resolve against the project root)
+    embedding_cache_enabled: bool = True
+    embedding_cache_path: str = "data/cache/embeddings.sqlite3"
+    embedding_cache_max_entries: int = 50_000
+
+    # Query embedding micro-batching (window 0 disables coalescing)
+    embedding_batch_window_ms: float = 5.0
+    embedding_batch_max_size: int = 64
+
+    # Embedding request limits for bulk (ingestion) batches
+    embedding_batch_max_tokens: int = 100_000  # API cap is 300k tokens per request
+    embedding_max_input_tokens: int = 8191
+    embedding_max_concurrency: int = 4
+
+    # Embedding price (USD per million tokens) used by the ingestion planner
+    embedding_price_per_million_tokens: float = 0.02
+
+    # Ingestion pipeline (chunk -> embed -> write, see app/rag/pipeline.py)
+    ingest_embed_workers: int = 2
+    ingest_write_workers: int = 4
+    ingest_embed_batch_size: int = 256
+    ingest_queue_size: int = 8
+
+    # Near-duplicate chunks (shingle Jaccard >= threshold) collapse into one
+    dedup_enabled: bool = True
+    dedup_threshold: float = 0.85
+
+    # RAG settings (chunk sizes in tokens; overlap is looked up by
+    # sub-page, then doc type, then falls back to chunk_overlap)
+    chunk_size: int = 400
+    chunk_overlap: int = 30
+    chunk_overlap_by_type: dict[str, int] = {
+        "pdf_brochure": 60,
+        "faqs": 0,
+        "section": 0,
+        "sub_page_section": 0,
+    }
     retrieval_k: int = 4
+    # Candidates requested from the match_documents RPC, to work around
+    # approximate pgvector index misses when no local index is loaded
+    rpc_candidate_pool: int = 80
+
+    # Local exact vector index (relative paths resolve against the project root)
+    local_index_enabled: bool = True
+    local_index_path: str = "data/index"
+    local_index_version: str | None = None  # Pin a published version (default: CURRENT)
+    local_index_check_interval_seconds: float = 30.0  # Reload when CURRENT moves (0 disables)
+
+    # Hybrid BM25 + vector retrieval over the local index (reciprocal-rank fusion)
+    hybrid_search_enabled: bool = True
+    hybrid_candidate_pool: int = 40  # Candidates taken from each ranking before fusion
+    rrf_k: int = 60
+    rrf_vector_weight: float = 1.0
+    rrf_lexical_weight: float = 1.0
+
+    # Programme router: search one programme's chunks when a query is
+    # clearly closest to its centroid
+    programme_router_enabled: bool = True
+    programme_router_min_similarity: float = 0.4
+    programme_router_margin: float = 0.05
+
+    # Retrieval result cache (exact query + near-duplicate embedding tiers)
+    retrieval_cache_enabled: bool = True
+    retrieval_cache_max_entries: int = 512
+    retrieval_cache_ttl_seconds: float = 600.0
+    retrieval_cache_similarity_threshold: float = 0.97
+
+    # Context packing for the LLM (see app/rag/context_packer.py)
+    context_token_budget: int = 2000
+    context_mmr_lambda: float = 0.7
+    context_dedup_threshold: float = 0.8
+
+    # Write-behind chat history (see app/db/chat_buffer.py); on Vercel each
+    # turn's messages are flushed before the response is returned
+    chat_buffer_enabled: bool = True
+    chat_buffer_flush_interval_seconds: float = 0.5
+    chat_buffer_max_batch: int = 100  # Flush early once this many messages are queued
+    chat_buffer_max_pending: int = 10_000  # Oldest messages are dropped beyond this
+    chat_buffer_max_attempts: int = 5  # Then a rejected batch is written row by row, dropping rejected rows
+
+    # Recent messages per conversation kept in memory (see app/db/conversation_cache.py)
+    conversation_cache_enabled: bool = True
+    # Several processes serve one conversation (uvicorn workers, replicas);
+    # cache hits then check for newer rows. Always on when running on Vercel
+    conversation_cache_multi_instance: bool = False
+    conversation_cache_max_conversations: int = 1000
+    conversation_cache_max_messages: int = 50
+    conversation_cache_ttl_seconds: float = 1800.0
+
+    # Chat history sent to the agent (see app/agents/history.py)
+    history_max_messages: int = 40  # Messages loaded per turn
+    history_token_budget: int = 1500  # Summary + verbatim messages
+    history_message_max_tokens: int = 500  # Longer messages are truncated
+    history_summary_enabled: bool = True
+    history_summary_max_tokens: int = 250
+    history_summary_model: str | None = None  # Defaults to chat_model
+
+    # In-memory programme catalog (see app/db/catalog.py); after the TTL the
+    # version stamp is checked and the catalog reloaded only if it changed
+    catalog_ttl_seconds: float = 300.0
 
     # Agent settings
     agent_max_model_calls: int = 6  # Max LLM calls per invocation (cost control)
@@ -1,9 +1,10 @@
 """Database module."""
 
-from .supabase import get_supabase_client
+from .supabase import get_async_supabase_client, get_supabase_client
 from .models import ChatMessage, ChatRequest, ChatResponse, Document, Program
 
 __all__ = [
+    "get_async_supabase_client",
     "get_supabase_client",
     "ChatMessage",
     "ChatRequest",
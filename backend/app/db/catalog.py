@@ -0,0 +1,236 @@
+"""In-memory programme catalog.
+
+The programs table holds a couple of dozen rows that change only when the
+site is re-scraped, yet the programme routes, the recommender and the
+compare tool used to read it (descriptions included) on every request.
+The catalog loads it once, at startup, into an immutable snapshot indexed
+by id, name, slug and degree type, and requests are answered from memory.
+When the served local index is a prebuilt bundle (see app/rag/bundle.py),
+the catalog is built from the bundle's programme records instead and
+follows the index's version, with no database access at all.
+
+Freshness: once the TTL has passed, the next read triggers a background
+revalidation while the current snapshot keeps being served. Revalidation
+reads the version stamp in app_metadata and reloads the table only if it
+changed. The stamp is bumped by scrape_and_ingest.py and by every
+ingestion run that changes documents, so it also versions the corpus for
+the retrieval cache. Deployments without the app_metadata table reload
+the table on every TTL instead.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from supabase import Client
+
+from app.config import get_settings
+from app.db.supabase import get_async_supabase_client
+from app.scrapers.programme_registry import match_programme
+
+logger = logging.getLogger(__name__)
+
+_TABLE = "programs"
+_METADATA_TABLE = "app_metadata"
+_VERSION_KEY = "catalog_version"
+# Versions of catalogs built from a bundle, so they never match a database stamp
+_BUNDLE_PREFIX = "bundle:"
+
+
+class ProgrammeCatalog:
+    """Immutable snapshot of the programs table with lookup indexes."""
+
+    def __init__(self, rows: list[dict], version: str | None = None):
+        self.version = version
+        self._rows = rows
+        self._by_id = {str(row["id"]): row for row in rows if row.get("id") is not None}
+        self._by_name = {row["name"].lower(): row for row in rows if row.get("name")}
+        self._by_slug = {
+            (row.get("metadata") or {})["slug"]: row
+            for row in rows if (row.get("metadata") or {}).get("slug")
+        }
+        self._by_type: dict[str, list[dict]] = {}
+        for row in rows:
+            self._by_type.setdefault((row.get("degree_type") or "").lower(), []).append(row)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def all(self) -> list[dict]:
+        """All programmes, in table order."""
+        return list(self._rows)
+
+    def get(self, program_id: str) -> dict | None:
+        """Look up a programme by id."""
+        return self._by_id.get(program_id)
+
+    def by_name(self, name: str) -> dict | None:
+        """Look up a programme by exact name (case-insensitive)."""
+        return self._by_name.get(name.lower())
+
+    def by_slug(self, slug: str) -> dict | None:
+        """Look up a programme by its registry slug."""
+        return self._by_slug.get(slug)
+
+    def of_type(self, degree_type: str) -> list[dict]:
+        """Programmes whose degree type contains ``degree_type`` (case-insensitive)."""
+        needle = degree_type.lower()
+        return [row for key, rows in self._by_type.items() if needle in key for row in rows]
+
+    def find(self, name: str) -> dict | None:
+        """Resolve a user-supplied programme name.
+
+        Names are resolved through the programme registry (names, slugs and
+        aliases such as "EMBA" or "MSBA"), exactly as retrieval filters are,
+        so the overview and the retrieved context describe the same
+        programme. Only text the registry cannot resolve falls back to the
+        shortest catalog name containing it.
+        """
+        entry = match_programme(name)
+        if entry is not None:
+            return self.by_name(entry.name) or self.by_slug(entry.slug)
+        needle = name.strip().lower()
+        if not needle:
+            return None
+        candidates = [row for key, row in self._by_name.items() if needle in key]
+        return min(candidates, key=lambda row: len(row["name"]), default=None)
+
+
+def _bundle_catalog() -> ProgrammeCatalog | None:
+    """Catalog from the served bundle's programme records, or None if it has none."""
+    from app.rag.local_index import get_local_index
+
+    index = get_local_index()
+    if index is None or not index.programs:
+        return None
+    return ProgrammeCatalog(index.programs, f"{_BUNDLE_PREFIX}{index.version}")
+
+
+async def _read_version(client) -> str | None:
+    """Read the catalog version stamp, or None if there is none."""
+    try:
+        result = await client.table(_METADATA_TABLE).select("value").eq("key", _VERSION_KEY).limit(1).execute()
+    except Exception as e:
+        logger.debug("No catalog version stamp: %s", e)
+        return None
+    return result.data[0]["value"] if result.data else None
+
+
+class CatalogCache:
+    """Holds the current catalog snapshot and keeps it fresh."""
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._catalog: ProgrammeCatalog | None = None
+        self._expires_at = 0.0
+        # Bound to the event loop it was created on
+        self._load_lock: asyncio.Lock | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._refresh_task: asyncio.Task | None = None
+
+        self.loads = 0
+        self.revalidations = 0
+
+    async def get(self) -> ProgrammeCatalog:
+        """Return the current catalog, loading it on first use.
+
+        An expired catalog is still returned; it is revalidated in the
+        background.
+        """
+        if self._catalog is None:
+            return await self.load()
+        if time.monotonic() >= self._expires_at and not self._refreshing():
+            self._refresh_task = asyncio.create_task(self._revalidate())
+        return self._catalog
+
+    async def load(self) -> ProgrammeCatalog:
+        """Load the catalog now, unless a concurrent load just did."""
+        loop = asyncio.get_running_loop()
+        if self._load_lock is None or self._loop is not loop:
+            self._load_lock = asyncio.Lock()
+            self._loop = loop
+        loaded = self.loads
+        async with self._load_lock:
+            if self.loads == loaded or self._catalog is None:
+                catalog = _bundle_catalog()
+                if catalog is None:
+                    client = await get_async_supabase_client()
+                    # Stamp first: a scrape finishing mid-read only causes an extra reload
+                    version = await _read_version(client)
+                    result = await client.table(_TABLE).select("*").execute()
+                    catalog = ProgrammeCatalog(result.data or [], version)
+                self._catalog = catalog
+                self._expires_at = time.monotonic() + self.ttl_seconds
+                self.loads += 1
+                logger.info(
+                    "Programme catalog loaded: %d programmes (version %s)", len(catalog), catalog.version
+                )
+            return self._catalog
+
+    def invalidate(self) -> None:
+        """Revalidate on the next read."""
+        self._expires_at = 0.0
+
+    async def close(self) -> None:
+        """Wait for an in-flight revalidation (called on application shutdown)."""
+        if self._refreshing():
+            await asyncio.gather(self._refresh_task, return_exceptions=True)
+        self._refresh_task = None
+
+    def _refreshing(self) -> bool:
+        task = self._refresh_task
+        return task is not None and not task.done() and task.get_loop() is asyncio.get_running_loop()
+
+    async def _revalidate(self) -> None:
+        self.revalidations += 1
+        try:
+            bundle = _bundle_catalog()
+            if bundle is not None:
+                version = bundle.version
+            elif self._catalog.version and self._catalog.version.startswith(_BUNDLE_PREFIX):
+                # The bundle is no longer served; fall back to the database
+                version = None
+            else:
+                version = await _read_version(await get_async_supabase_client())
+            if version is not None and version == self._catalog.version:
+                self._expires_at = time.monotonic() + self.ttl_seconds
+                return
+            await self.load()
+        except Exception as e:
+            # Keep serving the current snapshot; retry after another TTL
+            self._expires_at = time.monotonic() + self.ttl_seconds
+            logger.warning("Programme catalog refresh failed: %s", e)
+
+
+@lru_cache
+def get_catalog_cache() -> CatalogCache:
+    """Get the shared catalog cache."""
+    return CatalogCache(ttl_seconds=get_settings().catalog_ttl_seconds)
+
+
+async def get_programme_catalog() -> ProgrammeCatalog:
+    """Get the current programme catalog."""
+    return await get_catalog_cache().get()
+
+
+def bump_catalog_version(client: Client) -> str:
+    """Write a new catalog version stamp after the programs or documents table changed.
+
+    Serving processes reload their catalog at their next revalidation, and
+    no longer reuse search results cached against the previous stamp.
+
+    Args:
+        client: Supabase client with write access (service role)
+
+    Returns:
+        The new version stamp
+    """
+    version = f"{datetime.now(timezone.utc).isoformat()}-{uuid.uuid4().hex[:8]}"
+    client.table(_METADATA_TABLE).upsert(
+        {"key": _VERSION_KEY, "value": version, "updated_at": datetime.now(timezone.utc).isoformat()},
+        on_conflict="key",
+    ).execute()
+    return version
@@ -0,0 +1,364 @@
+"""Write-behind buffer for chat history.
+
+Each chat turn stores two messages. Instead of awaiting an insert for
+each on the request path, messages are queued in memory and a background
+task writes them in multi-row inserts, either every flush interval or as
+soon as a batch fills up. The buffer is drained on application shutdown.
+
+Ordering is kept per conversation: every message gets its id and a
+strictly increasing created_at when it is queued (rows in one insert
+would otherwise share the transaction's now()), and batches are written
+one at a time in queue order. Messages still in the buffer are merged
+into history reads, so a follow-up turn always sees the previous one.
+
+Reads are served from the conversation cache when it holds the
+conversation (plus, with several instances, a probe for rows the others
+stored since), and recorded messages are appended to it.
+
+A failed flush is retried with backoff. Network errors and 5xx responses
+are retried for as long as they last (bounded by max_pending). A batch
+the database keeps rejecting (4xx, e.g. a row Postgres cannot store) is
+written row by row after max_attempts, and only the rows still rejected
+are dropped, so one bad message cannot block every other conversation's
+writes. On serverless hosts, where an
+instance may be frozen right after responding, the agent flushes each
+turn before returning (see flush_chat_messages).
+"""
+
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from postgrest.exceptions import APIError
+
+from app.config import get_settings
+from app.db.conversation_cache import get_conversation_cache
+from app.db.supabase import get_async_supabase_client, get_chat_history, iter_payload_batches, store_chat_message
+
+logger = logging.getLogger(__name__)
+
+_TABLE = "chat_history"
+
+# Longest wait between retries of a failing flush
+_MAX_BACKOFF_SECONDS = 30.0
+
+# SQLSTATE classes of errors caused by the rows themselves (data
+# exceptions, integrity constraint violations)
+_REJECTED_SQLSTATE_CLASSES = ("22", "23")
+
+
+def _is_rejection(error: Exception) -> bool:
+    """Whether the database rejected the rows, as opposed to being unreachable or failing.
+
+    Only rejections are worth writing row by row; network errors
+    (httpx.TransportError), timeouts and 5xx responses are retried as is.
+    """
+    if not isinstance(error, APIError):
+        return False
+    code = str(error.code or "")
+    if code.isdigit() and len(code) == 3:
+        # Response without a PostgREST error body: the HTTP status
+        return 400 <= int(code) < 500 and int(code) not in (408, 429)
+    if code.startswith("PGRST"):
+        # PGRST0xx are connection errors (503/504), PGRST1xx request errors
+        return code.startswith("PGRST1")
+    return code[:2] in _REJECTED_SQLSTATE_CLASSES
+
+
+class ChatHistoryBuffer:
+    """Queues chat messages and flushes them in batched inserts."""
+
+    def __init__(self, flush_interval_seconds: float, max_batch: int, max_pending: int, max_attempts: int = 5):
+        self.flush_interval_seconds = flush_interval_seconds
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        # Rejected attempts at writing the batch at the head of the queue
+        self._attempts = 0
+        self._loop = asyncio.get_running_loop()
+        self._pending: list[dict] = []
+        self._last_created: dict[str, datetime] = {}
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self._closed = False
+
+        # Metrics
+        self.queued = 0
+        self.flushed = 0
+        self.batches = 0
+        self.failures = 0
+        self.dropped = 0
+
+    def add(self, conversation_id: str, role: str, content: str) -> dict:
+        """Queue a message for writing; returns the row as it will be stored."""
+        now = datetime.now(timezone.utc)
+        last = self._last_created.get(conversation_id)
+        if last is not None and now <= last:
+            now = last + timedelta(microseconds=1)
+        self._last_created[conversation_id] = now
+
+        row = {
+            "id": str(uuid.uuid4()),
+            "conversation_id": conversation_id,
+            "role": role,
+            # Postgres text cannot store NUL (pasted PDF text may contain it)
+            "content": content.replace("\x00", ""),
+            "created_at": now.isoformat(),
+        }
+        self._pending.append(row)
+        self.queued += 1
+
+        if len(self._pending) > self.max_pending:
+            # The database has been unreachable for a while; bound memory
+            dropped = self._pending.pop(0)
+            self.dropped += 1
+            logger.warning("Chat buffer full, dropped a message for %s", dropped["conversation_id"])
+
+        if self._task is None and not self._closed:
+            self._task = self._loop.create_task(self._run())
+        if len(self._pending) >= self.max_batch:
+            self._wakeup.set()
+        return row
+
+    def pending(self, conversation_id: str) -> list[dict]:
+        """Messages for a conversation that are not written yet, oldest first."""
+        return [row for row in self._pending if row["conversation_id"] == conversation_id]
+
+    async def flush(self) -> int:
+        """Write everything queued so far, in queue order.
+
+        Returns:
+            Number of messages written
+        """
+        async with self._flush_lock:
+            written = 0
+            while self._pending:
+                batch = next(iter_payload_batches(self._pending, max_rows=self.max_batch))
+                client = await get_async_supabase_client()
+                try:
+                    await client.table(_TABLE).insert(batch).execute()
+                except Exception as e:
+                    if not _is_rejection(e):
+                        raise
+                    self._attempts += 1
+                    if self._attempts < self.max_attempts:
+                        raise
+                    stored = await self._write_rows(client, batch)
+                else:
+                    # Rows stay visible to pending() until they are stored
+                    self._remove(batch)
+                    stored = len(batch)
+                    self.flushed += stored
+                self._attempts = 0
+                written += stored
+                self.batches += 1
+            self._forget_idle()
+            return written
+
+    async def close(self) -> None:
+        """Stop the background task and drain the buffer."""
+        self._closed = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error("Could not drain %d buffered chat messages: %s", len(self._pending), e)
+
+    def stats(self) -> dict:
+        """Return queue and flush counters."""
+        return {
+            "pending": len(self._pending),
+            "queued": self.queued,
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "failures": self.failures,
+            "dropped": self.dropped,
+        }
+
+    async def _write_rows(self, client, batch: list[dict]) -> int:
+        """Write a repeatedly rejected batch one row at a time, dropping rejected rows.
+
+        Any other error is raised, leaving the rows not yet handled queued.
+
+        Returns:
+            Number of rows written
+        """
+        written = 0
+        for row in batch:
+            try:
+                await client.table(_TABLE).insert(row).execute()
+            except Exception as e:
+                if not _is_rejection(e):
+                    raise
+                self.dropped += 1
+                logger.error(
+                    "Dropped a chat message for %s after %d rejected attempts: %s",
+                    row["conversation_id"], self._attempts, e,
+                )
+            else:
+                written += 1
+                self.flushed += 1
+            self._remove([row])
+        return written
+
+    def _remove(self, rows: list[dict]) -> None:
+        """Take handled rows off the queue.
+
+        By id rather than position: add() may have evicted the oldest
+        rows while they were being written.
+        """
+        ids = {row["id"] for row in rows}
+        self._pending = [row for row in self._pending if row["id"] not in ids]
+
+    async def _run(self) -> None:
+        delay = self.flush_interval_seconds
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if not self._pending:
+                continue
+            try:
+                await self.flush()
+                delay = self.flush_interval_seconds
+            except Exception as e:
+                # Keep the messages and retry with backoff
+                self.failures += 1
+                delay = min(max(delay, 0.1) * 2, _MAX_BACKOFF_SECONDS)
+                logger.warning("Chat history flush failed (%d pending): %s", len(self._pending), e)
+
+    def _forget_idle(self) -> None:
+        """Drop ordering state for conversations with nothing pending."""
+        active = {row["conversation_id"] for row in self._pending}
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=1)
+        for conversation_id, last in list(self._last_created.items()):
+            if conversation_id not in active and last < cutoff:
+                del self._last_created[conversation_id]
+
+
+_buffer: ChatHistoryBuffer | None = None
+
+
+def get_chat_buffer() -> ChatHistoryBuffer:
+    """Get the chat history buffer bound to the running event loop."""
+    global _buffer
+    if _buffer is None or _buffer._loop is not asyncio.get_running_loop():
+        settings = get_settings()
+        _buffer = ChatHistoryBuffer(
+            flush_interval_seconds=settings.chat_buffer_flush_interval_seconds,
+            max_batch=settings.chat_buffer_max_batch,
+            max_pending=settings.chat_buffer_max_pending,
+            max_attempts=settings.chat_buffer_max_attempts,
+        )
+    return _buffer
+
+
+async def close_chat_buffer() -> None:
+    """Drain and stop the buffer (called on application shutdown)."""
+    global _buffer
+    if _buffer is not None and _buffer._loop is asyncio.get_running_loop():
+        await _buffer.close()
+    _buffer = None
+
+
+async def record_chat_message(conversation_id: str, role: str, content: str) -> None:
+    """Store a chat message, write-behind when the buffer is enabled."""
+    if get_settings().chat_buffer_enabled:
+        row = get_chat_buffer().add(conversation_id, role, content)
+    else:
+        row = await store_chat_message(conversation_id, role, content)
+
+    cache = get_conversation_cache()
+    if cache is not None and row:
+        cache.append(conversation_id, row)
+
+
+async def flush_chat_messages() -> None:
+    """Write buffered messages now when running serverless (called at the end of a turn).
+
+    Messages that cannot be written stay queued for the background retry.
+    """
+    settings = get_settings()
+    if not (settings.chat_buffer_enabled and settings.vercel):
+        return
+    try:
+        await get_chat_buffer().flush()
+    except Exception as e:
+        logger.warning("Could not write chat messages before responding: %s", e)
+
+
+def start_conversation(conversation_id: str) -> None:
+    """Note a newly created conversation, so its first history read is a cache hit."""
+    cache = get_conversation_cache()
+    if cache is not None:
+        cache.start(conversation_id)
+
+
+def _pending(conversation_id: str) -> list[dict]:
+    return get_chat_buffer().pending(conversation_id) if get_settings().chat_buffer_enabled else []
+
+
+async def _with_newer_rows(cache, conversation_id: str, cached: list[dict], limit: int) -> list[dict]:
+    """Add messages stored after the cached tail, e.g. by another instance.
+
+    Several instances (serverless, uvicorn workers) can serve one
+    conversation, so a cache hit is checked with an index-only probe for
+    rows newer than the newest cached message; it is usually empty.
+    """
+    newest = cached[-1].get("created_at") or ""
+    newer = await get_chat_history(conversation_id, limit=max(limit, cache.max_messages), after=newest)
+    known = {row.get("id") for row in cached}
+    newer = [row for row in newer if (row.get("created_at") or "") > newest and row.get("id") not in known]
+    if not newer:
+        return cached
+    for row in newer:
+        cache.append(conversation_id, row)
+    merged = cached + newer
+    return merged[-limit:] if limit else merged
+
+
+async def load_chat_history(conversation_id: str, limit: int = 10) -> list[dict]:
+    """Read a conversation's latest messages, including ones not yet written.
+
+    Args:
+        conversation_id: Conversation ID
+        limit: Maximum number of messages to return
+
+    Returns:
+        Messages ordered by created_at
+    """
+    cache = get_conversation_cache()
+    if cache is not None:
+        cached = cache.get(conversation_id, limit)
+        settings = get_settings()
+        if cached and (settings.vercel or settings.conversation_cache_multi_instance):
+            return await _with_newer_rows(cache, conversation_id, cached, limit)
+        if cached is not None:
+            # Only this process writes to it, or it was started this turn
+            return cached
+
+    # Read enough to fill the cache's ring buffer for the next turns
+    fetch = max(limit, cache.max_messages) if cache is not None else limit
+
+    # Snapshot before reading so a flush during the read cannot lose messages,
+    # and again after it for messages recorded meanwhile
+    pending = _pending(conversation_id)
+    stored = await get_chat_history(conversation_id, limit=fetch)
+    by_id = {row.get("id"): row for row in stored}
+    for row in pending + _pending(conversation_id):
+        by_id.setdefault(row["id"], row)
+    merged = sorted(by_id.values(), key=lambda row: row.get("created_at") or "")
+
+    if cache is not None:
+        cache.put(conversation_id, merged, complete=len(stored) < fetch)
+    return merged[-limit:] if limit else merged
@@ -0,0 +1,119 @@
+"""In-memory cache of recent messages per conversation.
+
+Each chat turn reads the conversation's recent history. The cache keeps
+the latest messages of each conversation in a bounded ring buffer, LRU
+over conversations with a TTL, so a turn on a warm conversation needs no
+database read. Messages are appended as they are recorded; a miss loads
+the tail from the database once.
+
+The cache is per process. When several instances serve a conversation
+(on Vercel, or with conversation_cache_multi_instance set), a hit also
+probes the database for rows newer than its cached tail, so turns
+another instance served are picked up (see
+app/db/chat_buffer.load_chat_history).
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+from functools import lru_cache
+
+from app.config import get_settings
+
+
+class ConversationCache:
+    """LRU + TTL cache of each conversation's latest messages."""
+
+    def __init__(self, max_conversations: int = 1000, max_messages: int = 50, ttl_seconds: float = 1800.0):
+        self.max_conversations = max_conversations
+        self.max_messages = max_messages
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        # conversation id -> (expires_at, latest messages, whole conversation held)
+        self._entries: OrderedDict[str, tuple[float, deque[dict], bool]] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, conversation_id: str, limit: int) -> list[dict] | None:
+        """Return the latest ``limit`` messages, oldest first, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(conversation_id)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(conversation_id, None)
+                self.misses += 1
+                return None
+            _, messages, complete = entry
+            if limit > self.max_messages and not complete:
+                # Older messages than the ring buffer holds were asked for
+                self.misses += 1
+                return None
+            self._entries.move_to_end(conversation_id)
+            self.hits += 1
+            return list(messages)[-limit:] if limit else list(messages)
+
+    def put(self, conversation_id: str, messages: list[dict], complete: bool) -> None:
+        """Cache a conversation's tail.
+
+        Args:
+            conversation_id: Conversation ID
+            messages: Latest messages, oldest first
+            complete: Whether these are all of the conversation's messages
+        """
+        with self._lock:
+            ring = deque(messages[-self.max_messages:], maxlen=self.max_messages)
+            complete = complete and len(messages) <= self.max_messages
+            self._entries[conversation_id] = (time.monotonic() + self.ttl_seconds, ring, complete)
+            self._entries.move_to_end(conversation_id)
+            while len(self._entries) > self.max_conversations:
+                self._entries.popitem(last=False)
+
+    def start(self, conversation_id: str) -> None:
+        """Cache a brand-new conversation as known to be empty."""
+        self.put(conversation_id, [], complete=True)
+
+    def append(self, conversation_id: str, message: dict) -> None:
+        """Add a recorded message to a cached conversation (no-op when not cached)."""
+        with self._lock:
+            entry = self._entries.get(conversation_id)
+            if entry is None:
+                return
+            _, ring, complete = entry
+            if len(ring) == ring.maxlen:
+                # The oldest message falls out of the ring buffer
+                complete = False
+            ring.append(message)
+            self._entries[conversation_id] = (time.monotonic() + self.ttl_seconds, ring, complete)
+            self._entries.move_to_end(conversation_id)
+
+    def invalidate(self, conversation_id: str | None = None) -> None:
+        """Drop one conversation, or all of them."""
+        with self._lock:
+            if conversation_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(conversation_id, None)
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "conversations": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+@lru_cache
+def get_conversation_cache() -> ConversationCache | None:
+    """Get the shared conversation cache, or None if disabled."""
+    settings = get_settings()
+    if not settings.conversation_cache_enabled:
+        return None
+    return ConversationCache(
+        max_conversations=settings.conversation_cache_max_conversations,
+        max_messages=settings.conversation_cache_max_messages,
+        ttl_seconds=settings.conversation_cache_ttl_seconds,
+    )
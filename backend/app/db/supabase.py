@@ -1,29 +1,220 @@
-"""Supabase client initialization and utilities."""
+"""Supabase client initialization and utilities.
 
+The API serves requests with async clients, so a database round trip
+never blocks the event loop. Both async clients (anon and service role)
+share one pooled httpx.AsyncClient with keep-alive, created lazily per
+event loop and closed on application shutdown.
+
+The sync clients serve scripts and ingestion work in worker threads. They
+are cached and share one pooled httpx.Client, so a whole ingestion run
+reuses its connections; the bulk helpers split large writes into
+requests bounded by row count and payload size.
+"""
+
+import asyncio
+import json
+from collections.abc import Iterator
 from functools import lru_cache
-from supabase import create_client, Client
+
+import httpx
+from supabase import (
+    AsyncClient,
+    AsyncClientOptions,
+    Client,
+    ClientOptions,
+    acreate_client,
+    create_client,
+)
 
 from app.config import get_settings
 
 
+def _pool_limits() -> httpx.Limits:
+    settings = get_settings()
+    return httpx.Limits(
+        max_connections=settings.supabase_max_connections,
+        max_keepalive_connections=settings.supabase_max_keepalive_connections,
+        keepalive_expiry=settings.supabase_keepalive_expiry,
+    )
+
+
+@lru_cache
+def _get_sync_http_client() -> httpx.Client:
+    """Get the pooled HTTP client shared by the sync Supabase clients (thread-safe)."""
+    return httpx.Client(limits=_pool_limits(), timeout=get_settings().supabase_timeout)
+
+
 @lru_cache
 def get_supabase_client() -> Client:
     """Get cached Supabase client instance."""
     settings = get_settings()
-    return create_client(settings.supabase_url, settings.supabase_key)
+    return create_client(
+        settings.supabase_url,
+        settings.supabase_key,
+        options=ClientOptions(httpx_client=_get_sync_http_client()),
+    )
 
 
+@lru_cache
 def get_supabase_admin_client() -> Client:
-    """Get Supabase client with service role key for admin operations."""
+    """Get cached Supabase client with service role key for admin operations."""
     settings = get_settings()
     key = settings.supabase_service_key or settings.supabase_key
-    return create_client(settings.supabase_url, key)
+    return create_client(
+        settings.supabase_url,
+        key,
+        options=ClientOptions(httpx_client=_get_sync_http_client()),
+    )
+
+
+# ── Async clients ─────────────────────────────────────────────────────
+
+# Bound to the event loop they were created on
+_http_client: httpx.AsyncClient | None = None
+_async_clients: dict[str, AsyncClient] = {}
+_loop: asyncio.AbstractEventLoop | None = None
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """Get the pooled HTTP client for the running event loop."""
+    global _http_client, _loop
+    loop = asyncio.get_running_loop()
+    if _http_client is None or _loop is not loop:
+        _http_client = httpx.AsyncClient(limits=_pool_limits(), timeout=get_settings().supabase_timeout)
+        _async_clients.clear()
+        _loop = loop
+    return _http_client
+
+
+async def _get_async_client(key: str) -> AsyncClient:
+    http_client = _get_http_client()
+    client = _async_clients.get(key)
+    if client is None:
+        settings = get_settings()
+        client = await acreate_client(
+            settings.supabase_url,
+            key,
+            options=AsyncClientOptions(httpx_client=http_client),
+        )
+        # Another task may have created one meanwhile; keep the first
+        client = _async_clients.setdefault(key, client)
+    return client
+
+
+async def get_async_supabase_client() -> AsyncClient:
+    """Get the async Supabase client for the running event loop."""
+    return await _get_async_client(get_settings().supabase_key)
+
+
+async def get_async_supabase_admin_client() -> AsyncClient:
+    """Get the async Supabase client with the service role key."""
+    settings = get_settings()
+    return await _get_async_client(settings.supabase_service_key or settings.supabase_key)
+
 
+async def close_async_supabase_clients() -> None:
+    """Close the pooled HTTP connections (called on application shutdown)."""
+    global _http_client, _loop
+    if _http_client is not None and _loop is asyncio.get_running_loop():
+        await _http_client.aclose()
+    _http_client = None
+    _async_clients.clear()
+    _loop = None
+
+
+# ── Bulk writes (sync) ────────────────────────────────────────────────
+
+def iter_payload_batches(
+    rows: list[dict],
+    max_bytes: int | None = None,
+    max_rows: int | None = None,
+) -> Iterator[list[dict]]:
+    """Split rows into batches bounded by row count and JSON payload size.
+
+    Args:
+        rows: Rows to write
+        max_bytes: Maximum serialized bytes per batch (default from settings)
+        max_rows: Maximum rows per batch (default from settings)
+
+    Yields:
+        Consecutive batches of rows; a single oversized row is its own batch
+    """
+    settings = get_settings()
+    max_bytes = max_bytes or settings.supabase_max_payload_bytes
+    max_rows = max_rows or settings.supabase_max_batch_rows
+
+    batch: list[dict] = []
+    batch_bytes = 0
+    for row in rows:
+        size = len(json.dumps(row, separators=(",", ":"), default=str)) + 1
+        if batch and (batch_bytes + size > max_bytes or len(batch) >= max_rows):
+            yield batch
+            batch, batch_bytes = [], 0
+        batch.append(row)
+        batch_bytes += size
+    if batch:
+        yield batch
+
+
+def bulk_upsert(
+    client: Client,
+    table: str,
+    rows: list[dict],
+    on_conflict: str,
+    max_bytes: int | None = None,
+) -> int:
+    """Upsert rows in payload-bounded multi-row requests.
+
+    Args:
+        client: Sync Supabase client
+        table: Table name
+        rows: Rows to upsert
+        on_conflict: Column(s) with a unique constraint to resolve conflicts on
+        max_bytes: Maximum payload bytes per request (default from settings)
+
+    Returns:
+        Number of rows written
+    """
+    written = 0
+    for batch in iter_payload_batches(rows, max_bytes):
+        result = client.table(table).upsert(batch, on_conflict=on_conflict).execute()
+        written += len(result.data) if result.data else 0
+    return written
+
+
+def bulk_insert(client: Client, table: str, rows: list[dict], max_bytes: int | None = None) -> int:
+    """Insert rows in payload-bounded multi-row requests.
+
+    Returns:
+        Number of rows written
+    """
+    written = 0
+    for batch in iter_payload_batches(rows, max_bytes):
+        result = client.table(table).insert(batch).execute()
+        written += len(result.data) if result.data else 0
+    return written
+
+
+def bulk_delete(client: Client, table: str, column: str, values: list, batch_size: int = 200) -> None:
+    """Delete rows whose column is in a list of keys, a bounded number per request.
+
+    Args:
+        client: Sync Supabase client
+        table: Table name
+        column: Key column to match, e.g. "id"
+        values: Keys of the rows to delete
+        batch_size: Keys per request (they travel in the URL)
+    """
+    for i in range(0, len(values), batch_size):
+        client.table(table).delete().in_(column, values[i:i + batch_size]).execute()
+
+
+# ── Data access ───────────────────────────────────────────────────────
 
 async def store_document(content: str, embedding: list[float], metadata: dict) -> dict:
     """Store a document with its embedding in Supabase."""
-    client = get_supabase_admin_client()
-    result = client.table("documents").insert({
+    client = await get_async_supabase_admin_client()
+    result = await client.table("documents").insert({
         "content": content,
         "embedding": embedding,
         "metadata": metadata
@@ -33,8 +224,8 @@ async def store_document(content: str, embedding: list[float], metadata: dict) -
 
 async def search_documents(embedding: list[float], match_count: int = 4) -> list[dict]:
     """Search for similar documents using vector similarity."""
-    client = get_supabase_client()
-    result = client.rpc(
+    client = await get_async_supabase_client()
+    result = await client.rpc(
         "match_documents",
         {
             "query_embedding": embedding,
@@ -46,8 +237,8 @@ async def search_documents(embedding: list[float], match_count: int = 4) -> list
 
 async def store_chat_message(conversation_id: str, role: str, content: str) -> dict:
     """Store a chat message in the conversation history."""
-    client = get_supabase_client()
-    result = client.table("chat_history").insert({
+    client = await get_async_supabase_client()
+    result = await client.table("chat_history").insert({
         "conversation_id": conversation_id,
         "role": role,
         "content": content
@@ -55,10 +246,20 @@ async def store_chat_message(conversation_id: str, role: str, content: str) -> d
     return result.data[0] if result.data else {}
 
 
-async def get_chat_history(conversation_id: str, limit: int = 10) -> list[dict]:
-    """Retrieve chat history for a conversation."""
-    client = get_supabase_client()
-    result = client.table("chat_history").select("*").eq(
-        "conversation_id", conversation_id
-    ).order("created_at", desc=False).limit(limit).execute()
-    return result.data or []
+async def get_chat_history(conversation_id: str, limit: int = 10, after: str | None = None) -> list[dict]:
+    """Retrieve the latest messages of a conversation, oldest first.
+
+    Reads the tail newest-first so the (conversation_id, created_at) index
+    serves it at constant cost however long the conversation is.
+
+    Args:
+        conversation_id: Conversation ID
+        limit: Maximum number of messages
+        after: Only messages created after this timestamp
+    """
+    client = await get_async_supabase_client()
+    query = client.table("chat_history").select("*").eq("conversation_id", conversation_id)
+    if after is not None:
+        query = query.gt("created_at", after)
+    result = await query.order("created_at", desc=True).limit(limit).execute()
+    return list(reversed(result.data or []))
@@ -11,6 +11,11 @@ from fastapi.staticfiles import StaticFiles
 from app.config import get_settings
 from app.db.models import HealthResponse
 from app.api.routes import programs, chat, recommend
+from app.agents.history import close_history_manager
+from app.db.catalog import get_catalog_cache
+from app.db.chat_buffer import close_chat_buffer
+from app.db.supabase import close_async_supabase_clients
+from app.rag.local_index import get_local_index
 
 
 @asynccontextmanager
@@ -19,9 +24,24 @@ async def lifespan(app: FastAPI):
     # Startup
     settings = get_settings()
     print(f"Starting NBS Degree Advisor API (debug={settings.debug})")
+    # Load the local vector index up front so the first search doesn't pay for it
+    index = get_local_index()
+    if index is not None:
+        print(f"Local vector index loaded: {len(index)} documents (version {index.version})")
+    # Programme routes answer from the catalog; a failed load is retried on first use
+    try:
+        catalog = await get_catalog_cache().load()
+        print(f"Programme catalog loaded: {len(catalog)} programmes")
+    except Exception as e:
+        print(f"Programme catalog not loaded: {e}")
     yield
     # Shutdown
     print("Shutting down NBS Degree Advisor API")
+    await close_history_manager()
+    await get_catalog_cache().close()
+    # Write out buffered chat messages before the connection pool closes
+    await close_chat_buffer()
+    await close_async_supabase_clients()
 
 
 def create_app() -> FastAPI:
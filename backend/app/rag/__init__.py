@@ -1,12 +1,19 @@
 """RAG (Retrieval-Augmented Generation) module."""
 
-from .embeddings import get_embedding, get_embeddings_batch
+from .embeddings import (
+    aget_embedding,
+    aget_embeddings_batch,
+    get_embedding,
+    get_embeddings_batch,
+)
 from .retriever import retrieve_relevant_documents
 from .ingestion import ingest_documents, chunk_text
 
 __all__ = [
     "get_embedding",
     "get_embeddings_batch",
+    "aget_embedding",
+    "aget_embeddings_batch",
     "retrieve_relevant_documents",
     "ingest_documents",
     "chunk_text",
@@ -0,0 +1,145 @@
+"""Lexical BM25 index and reciprocal-rank fusion for hybrid retrieval.
+
+Embeddings alone retrieve poorly for queries built around exact tokens
+("GMAT", "SGD 68,000", "MSBA"). A BM25 inverted index over the same chunks
+catches those, and reciprocal-rank fusion (RRF) merges both rankings
+without having to calibrate BM25 scores against cosine similarities.
+"""
+
+import math
+import re
+from collections import Counter, defaultdict
+
+import numpy as np
+
+# Words, acronyms and numbers; digit groups like "68,000" or "3.5" stay whole
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.,]\d+)*")
+
+# Very common words that carry no retrieval signal
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from how i in is it of on or that the "
+    "this to was what when where which who will with you your".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercase a text and split it into BM25 terms.
+
+    Thousands separators are dropped so "68,000" and "68000" match.
+    """
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        if token[0].isdigit():
+            token = token.replace(",", "")
+        tokens.append(token)
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed list of texts."""
+
+    def __init__(self, texts: list[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.n_docs = len(texts)
+
+        postings: dict[str, list[tuple[int, int]]] = defaultdict(list)
+        doc_lengths = np.zeros(self.n_docs, dtype=np.float32)
+        for doc_id, text in enumerate(texts):
+            terms = Counter(tokenize(text))
+            doc_lengths[doc_id] = sum(terms.values())
+            for term, tf in terms.items():
+                postings[term].append((doc_id, tf))
+
+        avg_length = float(doc_lengths.mean()) if self.n_docs else 0.0
+        # Per-document length normalization, precomputed once
+        self._length_norm = k1 * (1 - b + b * doc_lengths / (avg_length or 1.0))
+
+        self._postings: dict[str, tuple[np.ndarray, np.ndarray]] = {}
+        self._idf: dict[str, float] = {}
+        for term, entries in postings.items():
+            doc_ids = np.fromiter((d for d, _ in entries), dtype=np.int32, count=len(entries))
+            tfs = np.fromiter((tf for _, tf in entries), dtype=np.float32, count=len(entries))
+            self._postings[term] = (doc_ids, tfs)
+            df = len(entries)
+            self._idf[term] = math.log(1 + (self.n_docs - df + 0.5) / (df + 0.5))
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every document for a query."""
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        for term in set(tokenize(query)):
+            if term not in self._postings:
+                continue
+            doc_ids, tfs = self._postings[term]
+            scores[doc_ids] += self._idf[term] * tfs * (self.k1 + 1) / (tfs + self._length_norm[doc_ids])
+        return scores
+
+    def search(self, query: str, k: int, mask: np.ndarray | None = None) -> list[tuple[int, float]]:
+        """Top-k documents for a query.
+
+        Args:
+            query: Query text
+            k: Number of results
+            mask: Optional boolean array; only True rows are eligible
+
+        Returns:
+            (document position, score) pairs with a positive score, best first
+        """
+        if not self.n_docs or k <= 0:
+            return []
+
+        scores = self.scores(query)
+        if mask is not None:
+            scores = np.where(mask, scores, 0.0)
+
+        k = min(k, self.n_docs)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i])) for i in top if scores[i] > 0]
+
+
+def reciprocal_rank_fusion(
+    rankings: list[list[dict]],
+    weights: list[float] | None = None,
+    k: int = 60,
+) -> list[dict]:
+    """Merge several ranked result lists with weighted reciprocal-rank fusion.
+
+    Each document scores ``sum(weight / (k + rank))`` over the lists it
+    appears in. Documents are identified by ``id`` (falling back to content);
+    the first occurrence's fields are kept and an ``rrf_score`` is added.
+
+    Args:
+        rankings: Result lists, each ordered best first
+        weights: Optional weight per list (default 1.0 each)
+        k: RRF damping constant
+
+    Returns:
+        Fused documents, best first
+    """
+    if weights is None:
+        weights = [1.0] * len(rankings)
+
+    fused: dict[str, dict] = {}
+    scores: dict[str, float] = defaultdict(float)
+    for ranking, weight in zip(rankings, weights):
+        for rank, doc in enumerate(ranking, 1):
+            key = str(doc.get("id") or doc.get("content"))
+            fused.setdefault(key, doc)
+            scores[key] += weight / (k + rank)
+
+    ordered = sorted(fused, key=lambda key: scores[key], reverse=True)
+    return [{**fused[key], "rrf_score": scores[key]} for key in ordered]
+
+
+_lexical_cache: tuple[object, BM25Index] | None = None
+
+
+def get_lexical_index(index) -> BM25Index:
+    """Get the BM25 index over a LocalVectorIndex's chunks, building it once."""
+    global _lexical_cache
+    if _lexical_cache is None or _lexical_cache[0] is not index:
+        _lexical_cache = (index, BM25Index([doc["content"] for doc in index.documents]))
+    return _lexical_cache[1]
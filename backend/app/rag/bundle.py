@@ -0,0 +1,110 @@
+"""Prebuilt index bundles built straight from scraped programme data.
+
+A bundle is a published local index version (see app/rag/local_index.py)
+built without Supabase: the scraped programmes are chunked and
+de-duplicated exactly as ingestion does, embedded (reusing the embedding
+cache), and written with their programme records. Shipping a bundle with
+the code lets the backend serve searches and the programme catalog (see
+app/db/catalog.py) with no database round trips.
+"""
+
+import logging
+import uuid
+from collections.abc import Iterable
+from pathlib import Path
+
+from app.rag.dedup import collapse_duplicates
+from app.rag.embeddings import aget_embeddings_batch
+from app.rag.ingestion import build_program_texts, prepare_documents
+from app.rag.local_index import LocalVectorIndex, publish_index
+from app.scrapers.programme_registry import degree_type_for, match_programme
+
+logger = logging.getLogger(__name__)
+
+# Same cap the scrape pipeline applies to programs.description
+_DESCRIPTION_CHARS = 3000
+
+# Programme ids are derived from the slug, so they are stable across builds
+_ID_NAMESPACE = uuid.UUID("5f0c4d3e-9a51-4c1b-8f0e-2b6a7d9c1e40")
+
+
+def programme_record(program: dict, profile_scores: dict | None = None) -> dict:
+    """Build a programs-table style record from a scraped programme dict.
+
+    Args:
+        program: Scraped programme dict
+        profile_scores: Spider chart scores for the programme, if any
+    """
+    entry = match_programme(program["name"])
+    return {
+        "id": str(uuid.uuid5(_ID_NAMESPACE, program.get("slug") or program["name"])),
+        "name": program["name"],
+        "degree_type": program.get("degree_type") or (degree_type_for(entry) if entry else "Other"),
+        "description": (program.get("description") or "")[:_DESCRIPTION_CHARS],
+        "url": program.get("url", ""),
+        "metadata": {
+            "category": program.get("category", ""),
+            "slug": program.get("slug", ""),
+            "language": program.get("language", "en"),
+            "is_external": program.get("is_external", False),
+            **(program.get("structured_data") or {}),
+        },
+        "profile_scores": profile_scores or {},
+    }
+
+
+async def build_bundle(
+    programs: Iterable[dict],
+    root: str | Path | None = None,
+    dedup: bool = True,
+    publish: bool = True,
+    profile_scores: dict[str, dict] | None = None,
+) -> LocalVectorIndex:
+    """Build an index bundle from scraped programme dicts.
+
+    Args:
+        programs: Programme dicts as in all_programs_deep.jsonl; consumed lazily
+        root: Index root to publish under (defaults to settings.local_index_path)
+        dedup: Collapse near-duplicate chunks across programmes
+        publish: Save the bundle as a new version and make it current
+        profile_scores: Spider chart scores by programme name
+
+    Returns:
+        The built index (its version names the published directory)
+    """
+    # Keep only chunks and programme records; raw programme text is released as we go
+    groups: list[list[dict]] = []
+    records: list[dict] = []
+    for program in programs:
+        if "error" in program:
+            continue
+        groups.append(prepare_documents(*build_program_texts(program)))
+        records.append(programme_record(program, (profile_scores or {}).get(program["name"])))
+
+    if dedup:
+        groups, removed = collapse_duplicates(groups)
+        logger.info("Bundle: collapsed %d near-duplicate chunks", sum(removed))
+    documents = [doc for group in groups for doc in group]
+
+    embeddings = await aget_embeddings_batch([doc["content"] for doc in documents])
+
+    # Chunk keys are stable across builds, so they double as document ids
+    chunks = [
+        {
+            "id": doc["chunk_key"],
+            "content": doc["content"],
+            "metadata": doc["metadata"],
+            "embedding": embedding,
+        }
+        for doc, embedding in zip(documents, embeddings)
+    ]
+    index = LocalVectorIndex.from_records(
+        chunks,
+        {"source": "bundle", "program_count": len(records)},
+        programs=records,
+    )
+
+    if publish:
+        directory = publish_index(index, root)
+        logger.info("Published bundle %s (%d chunks) to %s", index.version, len(index), directory)
+    return index
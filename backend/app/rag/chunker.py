@@ -0,0 +1,168 @@
+"""Structure-aware, token-sized chunking.
+
+The scrapers emit one block per line: headings, paragraphs and table rows
+(cells joined with " | "). Chunks are packed from whole blocks up to a
+token budget, preferring to break before a heading, so sections stay
+together and newlines survive. Overlap is a tail of whole blocks sized
+per doc type, and a chunk that starts mid-section repeats the section
+heading for context.
+
+Everything is a generator over the source text; no collapsed copy of the
+document is built.
+"""
+
+import re
+from collections.abc import Iterator
+from typing import Any
+
+from app.config import get_settings
+from app.rag.tokenizer import count_tokens
+
+HEADING = "heading"
+TABLE_ROW = "table_row"
+PARAGRAPH = "paragraph"
+
+_LINE_RE = re.compile(r"[^\n]+")
+_SENTENCE_RE = re.compile(r"[^.!?]+(?:[.!?]+[\"')\]]*\s*|$)")
+
+# A heading is a short line without terminal punctuation
+_MAX_HEADING_CHARS = 80
+_MAX_HEADING_WORDS = 10
+_HEADING_END_CHARS = ".!?:;,"
+
+# Start a new chunk at a heading once the current one is this full
+_HEADING_BREAK_FILL = 0.5
+
+
+def _classify(line: str) -> str:
+    if " | " in line:
+        return TABLE_ROW
+    if (
+        len(line) <= _MAX_HEADING_CHARS
+        and len(line.split()) <= _MAX_HEADING_WORDS
+        and line[-1] not in _HEADING_END_CHARS
+        and (line[0].isupper() or line[0].isdigit())
+    ):
+        return HEADING
+    return PARAGRAPH
+
+
+def iter_blocks(text: str) -> Iterator[tuple[str, str]]:
+    """Yield (kind, text) for each non-empty line of a document.
+
+    Args:
+        text: Document text with one block per line
+
+    Yields:
+        (HEADING | TABLE_ROW | PARAGRAPH, stripped line)
+    """
+    for match in _LINE_RE.finditer(text):
+        # PostgreSQL rejects \u0000
+        line = " ".join(match.group().replace("\x00", "").split())
+        if line:
+            yield _classify(line), line
+
+
+def _split_long_block(block: str, max_tokens: int) -> Iterator[str]:
+    """Split a block longer than max_tokens at sentence, then word, boundaries."""
+    piece: list[str] = []
+    piece_tokens = 0
+    for match in _SENTENCE_RE.finditer(block):
+        sentence = match.group().strip()
+        if not sentence:
+            continue
+        tokens = count_tokens(sentence)
+        if tokens > max_tokens:
+            # A single run-on sentence: fall back to word windows
+            if piece:
+                yield " ".join(piece)
+                piece, piece_tokens = [], 0
+            words: list[str] = []
+            for word in sentence.split():
+                if words and count_tokens(" ".join(words + [word])) > max_tokens:
+                    yield " ".join(words)
+                    words = []
+                words.append(word)
+            if words:
+                yield " ".join(words)
+            continue
+        if piece and piece_tokens + tokens > max_tokens:
+            yield " ".join(piece)
+            piece, piece_tokens = [], 0
+        piece.append(sentence)
+        piece_tokens += tokens
+    if piece:
+        yield " ".join(piece)
+
+
+def iter_chunks(text: str, chunk_tokens: int, overlap_tokens: int = 0) -> Iterator[str]:
+    """Yield token-budgeted chunks of whole blocks.
+
+    Args:
+        text: Document text with one block per line
+        chunk_tokens: Maximum tokens per chunk
+        overlap_tokens: Maximum tokens of trailing blocks repeated in the next chunk
+
+    Yields:
+        Chunk texts, blocks joined by newlines
+    """
+    current: list[tuple[str, str, int]] = []  # (kind, text, tokens)
+    current_tokens = 0
+    heading: tuple[str, str, int] | None = None  # most recent section heading
+
+    def flush() -> Iterator[str]:
+        # Runs of short lines (e.g. a list of course names) classify as
+        # headings too, so a chunk of only headings is still content
+        if current:
+            yield "\n".join(text for _, text, _ in current)
+
+    def carry() -> list[tuple[str, str, int]]:
+        """Blocks that open the next chunk: overlap tail plus the section heading."""
+        tail: list[tuple[str, str, int]] = []
+        budget = overlap_tokens
+        for block in reversed(current):
+            if block[2] > budget or block[0] == HEADING:
+                break
+            tail.insert(0, block)
+            budget -= block[2]
+        if heading is not None and heading not in tail:
+            tail.insert(0, heading)
+        return tail
+
+    for kind, block in iter_blocks(text):
+        tokens = count_tokens(block) + 1  # + newline
+        pieces = [(kind, block, tokens)]
+        if tokens > chunk_tokens:
+            pieces = [
+                (kind, piece, count_tokens(piece) + 1)
+                for piece in _split_long_block(block, chunk_tokens // 2)
+            ]
+
+        for piece in pieces:
+            is_heading = piece[0] == HEADING
+            full = current_tokens + piece[2] > chunk_tokens
+            heading_break = is_heading and current_tokens >= chunk_tokens * _HEADING_BREAK_FILL
+            if current and (full or heading_break):
+                yield from flush()
+                current = [] if is_heading else carry()
+                # Overlap gives way first, then the repeated heading
+                while current and sum(b[2] for b in current) + piece[2] > chunk_tokens:
+                    overlap = [i for i, b in enumerate(current) if b[0] != HEADING]
+                    current.pop(overlap[0] if overlap else 0)
+                current_tokens = sum(b[2] for b in current)
+            if is_heading:
+                heading = piece
+            current.append(piece)
+            current_tokens += piece[2]
+
+    yield from flush()
+
+
+def overlap_for(metadata: dict[str, Any]) -> int:
+    """Look up the overlap (tokens) for a document by sub-page, then doc type."""
+    settings = get_settings()
+    by_type = settings.chunk_overlap_by_type
+    for key in (metadata.get("sub_page"), metadata.get("type")):
+        if key in by_type:
+            return by_type[key]
+    return settings.chunk_overlap
@@ -0,0 +1,142 @@
+"""Pack retrieved chunks into a token-budgeted context for the LLM.
+
+Ingestion stores each sub-page in full *and* each of its sections, so
+search results often repeat the same text. Packing runs between
+retrieval and the tool output:
+
+1. drop chunks that are contained in, or nearly identical to, a chunk
+   ranked above them (word-shingle overlap);
+2. pick the remaining chunks by maximal marginal relevance (MMR), trading
+   rank against lexical overlap with chunks already picked;
+3. stop once the token budget is full.
+"""
+
+import logging
+
+from app.config import get_settings
+from app.rag.bm25 import tokenize
+from app.rag.tokenizer import count_tokens, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+# Words per shingle for duplicate detection
+_SHINGLE_SIZE = 3
+
+# Allowance for the "[Source n] (programme - type, relevance)" header line
+_HEADER_TOKENS = 20
+
+# Don't bother adding a truncated chunk smaller than this
+_MIN_CHUNK_TOKENS = 50
+
+
+def _shingles(terms: list[str]) -> set[tuple[str, ...]]:
+    if len(terms) < _SHINGLE_SIZE:
+        return {tuple(terms)} if terms else set()
+    return {tuple(terms[i:i + _SHINGLE_SIZE]) for i in range(len(terms) - _SHINGLE_SIZE + 1)}
+
+
+def _overlap(a: set, b: set) -> float:
+    """Overlap coefficient: 1.0 when the smaller set is contained in the larger."""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / min(len(a), len(b))
+
+
+def _jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def drop_near_duplicates(documents: list[dict], threshold: float | None = None) -> list[dict]:
+    """Remove chunks contained in, or nearly identical to, a higher-ranked chunk.
+
+    Args:
+        documents: Retrieved documents, best first
+        threshold: Shingle overlap at or above which a chunk is a duplicate
+                   (default from settings)
+
+    Returns:
+        The documents that remain, in their original order
+    """
+    if threshold is None:
+        threshold = get_settings().context_dedup_threshold
+
+    kept: list[dict] = []
+    kept_shingles: list[set] = []
+    for doc in documents:
+        shingles = _shingles(tokenize(doc.get("content", "")))
+        if any(_overlap(shingles, other) >= threshold for other in kept_shingles):
+            continue
+        kept.append(doc)
+        kept_shingles.append(shingles)
+    return kept
+
+
+def pack_context(
+    documents: list[dict],
+    token_budget: int | None = None,
+    mmr_lambda: float | None = None,
+    dedup_threshold: float | None = None,
+) -> list[dict]:
+    """Select a diverse, non-redundant subset of documents that fits a token budget.
+
+    Args:
+        documents: Retrieved documents, best first
+        token_budget: Maximum tokens of chunk text plus headers (default from settings)
+        mmr_lambda: Relevance vs. diversity trade-off, 1.0 = rank order only
+                    (default from settings)
+        dedup_threshold: Shingle overlap treated as a duplicate (default from settings)
+
+    Returns:
+        Selected documents in selection order. A chunk that only partly fits
+        the remaining budget is truncated.
+    """
+    settings = get_settings()
+    if token_budget is None:
+        token_budget = settings.context_token_budget
+    if mmr_lambda is None:
+        mmr_lambda = settings.context_mmr_lambda
+
+    candidates = drop_near_duplicates(documents, dedup_threshold)
+    if not candidates:
+        return []
+
+    # Rank-based relevance works for cosine and RRF-scored results alike
+    n = len(candidates)
+    relevance = [1.0 - i / n for i in range(n)]
+    terms = [set(tokenize(doc.get("content", ""))) for doc in candidates]
+    costs = [count_tokens(doc.get("content", "")) + _HEADER_TOKENS for doc in candidates]
+
+    selected: list[dict] = []
+    selected_terms: list[set] = []
+    remaining = set(range(n))
+    budget = token_budget
+
+    while remaining and budget > _HEADER_TOKENS:
+        def mmr(i: int) -> float:
+            redundancy = max((_jaccard(terms[i], other) for other in selected_terms), default=0.0)
+            return mmr_lambda * relevance[i] - (1 - mmr_lambda) * redundancy
+
+        best = max(remaining, key=mmr)
+        remaining.discard(best)
+        doc = candidates[best]
+
+        if costs[best] > budget:
+            # Truncate the chunk into what is left, if that is still worth it
+            room = budget - _HEADER_TOKENS
+            if room < _MIN_CHUNK_TOKENS:
+                continue
+            doc = {**doc, "content": truncate_to_tokens(doc.get("content", ""), room)}
+            budget = 0
+        else:
+            budget -= costs[best]
+
+        selected.append(doc)
+        selected_terms.append(terms[best])
+
+    logger.debug(
+        "Packed %d of %d chunks (%d after dedup) into %d/%d tokens",
+        len(selected), len(documents), n, token_budget - budget, token_budget,
+    )
+    return selected
@@ -0,0 +1,226 @@
+"""MinHash/LSH near-duplicate detection for ingestion.
+
+NTU pages repeat the same boilerplate (contact blocks, "apply now" text,
+accreditation blurbs) across programmes and sub-pages. Each chunk gets a
+MinHash signature over word shingles; locality-sensitive hashing on bands
+of the signature finds candidate pairs, which are confirmed by the exact
+Jaccard similarity of their shingle sets. Confirmed duplicates collapse
+into the first occurrence, which records every programme it stands for
+in ``metadata["programs"]``.
+
+A run only sees its own sources. On a partial run (e.g. one programme),
+programmes a stored shared chunk stands for that are not part of the run
+are carried over with merge_stored_programs, since their own copies were
+deleted when the chunk was first collapsed. Conversely, a source's chunks
+that a shared chunk stored under a programme outside the run already
+stands for are dropped with drop_covered_chunks, rather than stored again
+as the source's own copies.
+"""
+
+import hashlib
+import logging
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+from app.config import get_settings
+from app.rag.bm25 import tokenize
+from app.rag.ingestion import content_hash
+
+logger = logging.getLogger(__name__)
+
+# Words per shingle
+_SHINGLE_SIZE = 5
+
+# 32 bands x 4 rows: pairs above ~0.4 Jaccard almost always share a band
+_NUM_BANDS = 32
+_ROWS_PER_BAND = 4
+_NUM_PERM = _NUM_BANDS * _ROWS_PER_BAND
+
+# Universal hashing (a * x + b) mod p, with x < 2**32 so nothing overflows uint64
+_PRIME = np.uint64((1 << 61) - 1)
+
+
+def _permutations() -> tuple[np.ndarray, np.ndarray]:
+    # Fixed seed so signatures are reproducible across runs
+    rng = np.random.default_rng(1)
+    a = rng.integers(1, 1 << 31, size=_NUM_PERM, dtype=np.uint64)
+    b = rng.integers(0, 1 << 31, size=_NUM_PERM, dtype=np.uint64)
+    return a, b
+
+
+_PERM_A, _PERM_B = _permutations()
+
+
+def shingle_hashes(text: str) -> set[int]:
+    """Hash the word shingles of a text to 32-bit integers."""
+    terms = tokenize(text)
+    if len(terms) < _SHINGLE_SIZE:
+        return {zlib.crc32(" ".join(terms).encode("utf-8"))} if terms else set()
+    return {
+        zlib.crc32(" ".join(terms[i:i + _SHINGLE_SIZE]).encode("utf-8"))
+        for i in range(len(terms) - _SHINGLE_SIZE + 1)
+    }
+
+
+def minhash(shingles: set[int]) -> np.ndarray:
+    """MinHash signature of a shingle set."""
+    if not shingles:
+        return np.full(_NUM_PERM, np.iinfo(np.uint64).max, dtype=np.uint64)
+    x = np.fromiter(shingles, dtype=np.uint64, count=len(shingles))
+    hashed = (np.outer(x, _PERM_A) + _PERM_B) % _PRIME
+    return hashed.min(axis=0)
+
+
+def find_duplicates(texts: list[str], threshold: float) -> dict[int, int]:
+    """Map each near-duplicate text to the first text it duplicates.
+
+    Args:
+        texts: Texts in priority order (earlier texts are kept)
+        threshold: Minimum Jaccard similarity of word shingles
+
+    Returns:
+        {duplicate position: canonical position}
+    """
+    shingles = [shingle_hashes(text) for text in texts]
+    buckets: dict[tuple[int, bytes], list[int]] = defaultdict(list)
+    duplicates: dict[int, int] = {}
+
+    for i, sh in enumerate(shingles):
+        if not sh:
+            continue
+        signature = minhash(sh).reshape(_NUM_BANDS, _ROWS_PER_BAND)
+        bands = [
+            (band, hashlib.blake2b(rows.tobytes(), digest_size=8).digest())
+            for band, rows in enumerate(signature)
+        ]
+
+        candidates = {j for key in bands for j in buckets.get(key, ())}
+        for j in sorted(candidates):
+            union = len(sh | shingles[j])
+            if union and len(sh & shingles[j]) / union >= threshold:
+                duplicates[i] = j
+                break
+        else:
+            # Only canonical texts are indexed, so duplicates map to a kept text
+            for key in bands:
+                buckets[key].append(i)
+
+    return duplicates
+
+
+def collapse_duplicates(
+    groups: list[list[dict]],
+    threshold: float | None = None,
+) -> tuple[list[list[dict]], list[int]]:
+    """Collapse near-identical chunks across groups of prepared documents.
+
+    The first occurrence is kept; when duplicates come from other
+    programmes, its metadata gains a ``programs`` list of every programme
+    it now stands for and its content hash is updated to match.
+
+    Args:
+        groups: Prepared documents per source, in priority order
+        threshold: Minimum shingle Jaccard similarity (default from settings)
+
+    Returns:
+        Tuple of (kept documents per group, number removed per group)
+    """
+    if threshold is None:
+        threshold = get_settings().dedup_threshold
+
+    flat = [(g, doc) for g, documents in enumerate(groups) for doc in documents]
+    duplicates = find_duplicates([doc["content"] for _, doc in flat], threshold)
+
+    programs: dict[int, list[str]] = {}
+    for dup, canonical in duplicates.items():
+        names = programs.setdefault(canonical, [flat[canonical][1]["metadata"].get("program", "")])
+        name = flat[dup][1]["metadata"].get("program", "")
+        if name not in names:
+            names.append(name)
+
+    kept: list[list[dict]] = [[] for _ in groups]
+    removed = [0] * len(groups)
+    for i, (g, doc) in enumerate(flat):
+        if i in duplicates:
+            removed[g] += 1
+            continue
+        names = [n for n in programs.get(i, []) if n]
+        if len(names) > 1:
+            doc = {
+                **doc,
+                "metadata": {**doc["metadata"], "programs": names},
+                "content_hash": content_hash(doc["content"], names),
+            }
+        kept[g].append(doc)
+
+    if duplicates:
+        logger.info("Collapsed %d near-duplicate chunks of %d", len(duplicates), len(flat))
+    return kept, removed
+
+
+def drop_covered_chunks(
+    documents: list[dict],
+    shared_rows: list[dict],
+    ingested: set[str],
+    threshold: float | None = None,
+) -> tuple[list[dict], int]:
+    """Drop chunks a stored shared chunk of a programme outside this run stands for.
+
+    Args:
+        documents: Kept documents of one source (output of collapse_duplicates)
+        shared_rows: Output of fetch_shared_chunks for the source's programme
+        ingested: Programmes whose chunks this run collapses; shared chunks
+            they own are decided by the run itself
+        threshold: Minimum shingle Jaccard similarity (default from settings)
+
+    Returns:
+        Tuple of (remaining documents, number dropped)
+    """
+    if threshold is None:
+        threshold = get_settings().dedup_threshold
+
+    rows = [row for row in shared_rows if row.get("content") and row.get("program") not in ingested]
+    if not rows or not documents:
+        return documents, 0
+
+    # Stored chunks come first, so a source chunk maps to the shared chunk it duplicates
+    texts = [row["content"] for row in rows] + [doc["content"] for doc in documents]
+    duplicates = find_duplicates(texts, threshold)
+    covered = {i - len(rows) for i, j in duplicates.items() if i >= len(rows) and j < len(rows)}
+    return [doc for i, doc in enumerate(documents) if i not in covered], len(covered)
+
+
+def merge_stored_programs(
+    documents: list[dict],
+    stored_rows: list[dict],
+    ingested: set[str],
+) -> list[dict]:
+    """Keep the programmes a stored shared chunk stands for outside this run.
+
+    Args:
+        documents: Kept documents of one source (output of collapse_duplicates)
+        stored_rows: Output of fetch_stored_chunks for the source's scope
+        ingested: Programmes whose chunks this run collapses; their sharing
+            is decided by the run itself
+
+    Returns:
+        Documents whose ``programs`` list (and content hash) includes every
+        stored programme the run does not cover
+    """
+    stored = {row["chunk_key"]: row.get("programs") or [] for row in stored_rows if row.get("chunk_key")}
+    merged = []
+    for doc in documents:
+        outside = [n for n in stored.get(doc["chunk_key"], []) if n and n not in ingested]
+        names = doc["metadata"].get("programs") or [doc["metadata"].get("program", "")]
+        extra = [n for n in outside if n not in names]
+        if extra:
+            names = [*names, *extra]
+            doc = {
+                **doc,
+                "metadata": {**doc["metadata"], "programs": names},
+                "content_hash": content_hash(doc["content"], names),
+            }
+        merged.append(doc)
+    return merged
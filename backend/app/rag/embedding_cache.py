@@ -0,0 +1,205 @@
+"""Persistent, content-addressed cache for embedding vectors.
+
+Vectors are stored in a local SQLite file keyed by a hash of
+(embedding model, dimensions, normalized text), so re-ingesting
+unchanged chunks and repeating popular chat queries never go back
+to the OpenAI API.
+"""
+
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from array import array
+from functools import lru_cache
+from pathlib import Path
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Project root (backend/app/rag/embedding_cache.py -> repo root)
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent.parent
+
+# Fraction of entries evicted once the cache grows past its limit, so we
+# don't run an eviction query on every single insert at the boundary.
+_EVICTION_FRACTION = 0.1
+
+
+def normalize_embedding_text(text: str) -> str:
+    """Normalize text the same way it is sent to the embeddings API."""
+    return text.replace("\n", " ").strip()
+
+
+def embedding_cache_key(text: str, model: str, dimensions: int) -> str:
+    """Build the content-addressed cache key for a text.
+
+    Args:
+        text: Already-normalized text
+        model: Embedding model name
+        dimensions: Embedding dimensions
+
+    Returns:
+        Hex SHA-256 digest identifying the (model, dimensions, text) triple
+    """
+    payload = f"{model}\x1f{dimensions}\x1f{text}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+class EmbeddingCache:
+    """SQLite-backed embedding cache with LRU eviction and hit/miss counters."""
+
+    def __init__(self, path: str | Path, max_entries: int = 50_000):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("pragma journal_mode=wal")
+        self._conn.execute("pragma synchronous=normal")
+        self._conn.execute(
+            """
+            create table if not exists embeddings (
+                key text primary key,
+                vector blob not null,
+                last_used real not null
+            )
+            """
+        )
+        self._conn.execute(
+            "create index if not exists embeddings_last_used_idx on embeddings (last_used)"
+        )
+        self._conn.commit()
+
+    def get_many(self, keys: list[str]) -> dict[str, list[float]]:
+        """Look up several keys at once.
+
+        Args:
+            keys: Cache keys to look up
+
+        Returns:
+            Dict mapping each found key to its vector (missing keys are omitted)
+        """
+        if not keys:
+            return {}
+
+        unique_keys = list(dict.fromkeys(keys))
+        found: dict[str, list[float]] = {}
+        now = time.time()
+
+        with self._lock:
+            # SQLite caps bound parameters, so look up in slices
+            for i in range(0, len(unique_keys), 500):
+                batch = unique_keys[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"select key, vector from embeddings where key in ({placeholders})",
+                    batch,
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+
+            if found:
+                self._conn.executemany(
+                    "update embeddings set last_used = ? where key = ?",
+                    [(now, key) for key in found],
+                )
+                self._conn.commit()
+
+            self.hits += sum(1 for key in keys if key in found)
+            self.misses += sum(1 for key in keys if key not in found)
+
+        return found
+
+    def get(self, key: str) -> list[float] | None:
+        """Look up a single key."""
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items: dict[str, list[float]]) -> None:
+        """Store vectors, evicting least-recently-used entries past the size limit."""
+        if not items:
+            return
+
+        now = time.time()
+        rows = [(key, array("f", vector).tobytes(), now) for key, vector in items.items()]
+
+        with self._lock:
+            self._conn.executemany(
+                "insert or replace into embeddings (key, vector, last_used) values (?, ?, ?)",
+                rows,
+            )
+            self._evict_if_needed()
+            self._conn.commit()
+
+    def put(self, key: str, vector: list[float]) -> None:
+        """Store a single vector."""
+        self.put_many({key: vector})
+
+    def _evict_if_needed(self) -> None:
+        """Drop the least-recently-used entries when over capacity (lock held)."""
+        (count,) = self._conn.execute("select count(*) from embeddings").fetchone()
+        if count <= self.max_entries:
+            return
+
+        excess = count - self.max_entries
+        n_evict = excess + int(self.max_entries * _EVICTION_FRACTION)
+        self._conn.execute(
+            """
+            delete from embeddings where key in (
+                select key from embeddings order by last_used asc limit ?
+            )
+            """,
+            (n_evict,),
+        )
+        logger.info("Embedding cache evicted %d entries", n_evict)
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("select count(*) from embeddings").fetchone()
+        return count
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and current size."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self),
+            "max_entries": self.max_entries,
+        }
+
+    def clear(self) -> None:
+        """Remove all cached vectors and reset counters."""
+        with self._lock:
+            self._conn.execute("delete from embeddings")
+            self._conn.commit()
+            self.hits = 0
+            self.misses = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+@lru_cache
+def get_embedding_cache() -> EmbeddingCache | None:
+    """Get the process-wide embedding cache, or None if disabled/unavailable."""
+    settings = get_settings()
+    if not settings.embedding_cache_enabled:
+        return None
+
+    path = Path(settings.embedding_cache_path)
+    if not path.is_absolute():
+        path = _PROJECT_ROOT / path
+
+    try:
+        return EmbeddingCache(path, max_entries=settings.embedding_cache_max_entries)
+    except (sqlite3.Error, OSError) as e:
+        # e.g. read-only filesystem on serverless deployments
+        logger.warning("Embedding cache disabled, could not open %s: %s", path, e)
+        return None
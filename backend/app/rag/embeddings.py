@@ -1,18 +1,166 @@
 """Embedding generation using OpenAI."""
 
-from openai import OpenAI
+import asyncio
+import logging
+import time
+from functools import lru_cache
+from openai import AsyncOpenAI, OpenAI, RateLimitError
 from app.config import get_settings
+from app.rag.embedding_cache import (
+    embedding_cache_key,
+    get_embedding_cache,
+    normalize_embedding_text,
+)
+from app.rag.tokenizer import count_tokens, truncate_to_tokens
 
+logger = logging.getLogger(__name__)
 
+# The embeddings endpoint accepts at most this many inputs per request
+_MAX_INPUTS_PER_REQUEST = 2048
+
+# Retries for rate-limited (429) requests, with exponential backoff
+_MAX_RETRIES = 5
+_BACKOFF_BASE = 2.0
+
+
+@lru_cache
 def get_openai_client() -> OpenAI:
-    """Get OpenAI client instance."""
+    """Get cached OpenAI client instance.
+
+    The client owns an HTTP connection pool, so reusing one instance keeps
+    connections alive across calls instead of paying a TLS handshake each time.
+    """
     settings = get_settings()
     return OpenAI(api_key=settings.openai_api_key)
 
 
+@lru_cache
+def get_async_openai_client() -> AsyncOpenAI:
+    """Get cached AsyncOpenAI client instance shared by all async callers."""
+    settings = get_settings()
+    return AsyncOpenAI(api_key=settings.openai_api_key)
+
+
+def _lookup_cached(texts: list[str]) -> tuple[list[str], dict[str, list[float]], list[tuple[str, str]]]:
+    """Split already-cleaned texts into cached vectors and texts still to embed.
+
+    Returns:
+        Tuple of (cache key per text, vectors found by key, distinct (key, text) pairs to embed)
+    """
+    settings = get_settings()
+    keys = [
+        embedding_cache_key(t, settings.embedding_model, settings.embedding_dimensions)
+        for t in texts
+    ]
+    cache = get_embedding_cache()
+    found = cache.get_many(keys) if cache is not None else {}
+
+    # Embed each distinct uncached text once
+    missing = list(dict.fromkeys(
+        (key, text) for key, text in zip(keys, texts) if key not in found
+    ))
+    return keys, found, missing
+
+
+def _store_fresh(missing: list[tuple[str, str]], response_data: list) -> dict[str, list[float]]:
+    """Map API results back to cache keys and write them to the cache."""
+    # Sort by index to maintain order
+    sorted_data = sorted(response_data, key=lambda x: x.index)
+    fresh = {key: item.embedding for (key, _), item in zip(missing, sorted_data)}
+    cache = get_embedding_cache()
+    if cache is not None:
+        cache.put_many(fresh)
+    return fresh
+
+
+def _clean_batch(texts: list[str]) -> list[str]:
+    """Normalize texts for batch embedding, replacing empties with a space."""
+    cleaned_texts = [normalize_embedding_text(t) for t in texts]
+    return [t if t else " " for t in cleaned_texts]  # Handle empty strings
+
+
+def _split_by_token_budget(missing: list[tuple[str, str]]) -> list[list[tuple[str, str]]]:
+    """Split (key, text) pairs into request-sized sub-batches.
+
+    Each input is truncated to the per-input token limit, and each sub-batch
+    stays under both the per-request token budget and input count limit.
+    """
+    settings = get_settings()
+    batches: list[list[tuple[str, str]]] = []
+    current: list[tuple[str, str]] = []
+    current_tokens = 0
+
+    for key, text in missing:
+        n_tokens = count_tokens(text)
+        if n_tokens > settings.embedding_max_input_tokens:
+            text = truncate_to_tokens(text, settings.embedding_max_input_tokens)
+            n_tokens = settings.embedding_max_input_tokens
+
+        if current and (
+            current_tokens + n_tokens > settings.embedding_batch_max_tokens
+            or len(current) >= _MAX_INPUTS_PER_REQUEST
+        ):
+            batches.append(current)
+            current, current_tokens = [], 0
+
+        current.append((key, text))
+        current_tokens += n_tokens
+
+    if current:
+        batches.append(current)
+    return batches
+
+
+def estimate_embedding_requests(texts: list[str]) -> tuple[int, int, int]:
+    """Estimate what get_embeddings_batch(texts) would send, without calling the API.
+
+    Args:
+        texts: Texts that would be embedded together
+
+    Returns:
+        Tuple of (API requests, tokens sent, texts served from the cache)
+    """
+    keys, found, missing = _lookup_cached(_clean_batch(texts))
+    batches = _split_by_token_budget(missing)
+    tokens = sum(count_tokens(text) for batch in batches for _, text in batch)
+    return len(batches), tokens, sum(1 for key in keys if key in found)
+
+
+def _embed_missing(missing: list[tuple[str, str]]) -> dict[str, list[float]]:
+    """Embed (key, text) pairs with the sync client and cache the results."""
+    settings = get_settings()
+    client = get_openai_client()
+    fresh: dict[str, list[float]] = {}
+
+    for batch in _split_by_token_budget(missing):
+        for attempt in range(_MAX_RETRIES):
+            try:
+                response = client.embeddings.create(
+                    model=settings.embedding_model,
+                    input=[text for _, text in batch],
+                    dimensions=settings.embedding_dimensions
+                )
+                break
+            except RateLimitError:
+                if attempt == _MAX_RETRIES - 1:
+                    raise
+                wait = _BACKOFF_BASE ** attempt
+                logger.warning(
+                    "Embedding request rate-limited - retrying in %.1fs (attempt %d/%d)",
+                    wait, attempt + 1, _MAX_RETRIES,
+                )
+                time.sleep(wait)
+        fresh.update(_store_fresh(batch, response.data))
+
+    return fresh
+
+
 def get_embedding(text: str) -> list[float]:
     """Generate embedding for a single text.
 
+    Served from the on-disk embedding cache when the same text has been
+    embedded before with the current model and dimensions.
+
     Args:
         text: Text to embed
 
@@ -20,44 +168,244 @@ def get_embedding(text: str) -> list[float]:
         List of floats representing the embedding vector
     """
     settings = get_settings()
-    client = get_openai_client()
 
     # Clean and truncate text if needed
-    text = text.replace("\n", " ").strip()
+    text = normalize_embedding_text(text)
     if not text:
         return [0.0] * settings.embedding_dimensions
 
-    response = client.embeddings.create(
-        model=settings.embedding_model,
-        input=text,
-        dimensions=settings.embedding_dimensions
-    )
-
-    return response.data[0].embedding
+    keys, found, missing = _lookup_cached([text])
+    if missing:
+        found.update(_embed_missing(missing))
+    return found[keys[0]]
 
 
 def get_embeddings_batch(texts: list[str]) -> list[list[float]]:
     """Generate embeddings for multiple texts in batch.
 
+    Only texts missing from the embedding cache are sent to the API, split
+    into sub-batches that respect the per-request token budget.
+
     Args:
         texts: List of texts to embed
 
     Returns:
-        List of embedding vectors
+        List of embedding vectors, in the same order as ``texts``
     """
+    keys, found, missing = _lookup_cached(_clean_batch(texts))
+
+    if missing:
+        found.update(_embed_missing(missing))
+
+    return [found[key] for key in keys]
+
+
+async def _acreate_with_retry(batch: list[tuple[str, str]]) -> dict[str, list[float]]:
+    """Send one sub-batch with the async client, backing off on 429s."""
     settings = get_settings()
-    client = get_openai_client()
+    client = get_async_openai_client()
 
-    # Clean texts
-    cleaned_texts = [t.replace("\n", " ").strip() for t in texts]
-    cleaned_texts = [t if t else " " for t in cleaned_texts]  # Handle empty strings
+    for attempt in range(_MAX_RETRIES):
+        try:
+            response = await client.embeddings.create(
+                model=settings.embedding_model,
+                input=[text for _, text in batch],
+                dimensions=settings.embedding_dimensions
+            )
+            # SQLite writes stay off the event loop
+            return await asyncio.to_thread(_store_fresh, batch, response.data)
+        except RateLimitError:
+            if attempt == _MAX_RETRIES - 1:
+                raise
+            wait = _BACKOFF_BASE ** attempt
+            logger.warning(
+                "Embedding request rate-limited - retrying in %.1fs (attempt %d/%d)",
+                wait, attempt + 1, _MAX_RETRIES,
+            )
+            await asyncio.sleep(wait)
 
-    response = client.embeddings.create(
-        model=settings.embedding_model,
-        input=cleaned_texts,
-        dimensions=settings.embedding_dimensions
-    )
 
-    # Sort by index to maintain order
-    sorted_data = sorted(response.data, key=lambda x: x.index)
-    return [item.embedding for item in sorted_data]
+async def _aembed_missing(missing: list[tuple[str, str]]) -> dict[str, list[float]]:
+    """Embed (key, text) pairs with the async client and cache the results.
+
+    Token-budgeted sub-batches are sent concurrently, bounded by
+    ``embedding_max_concurrency``.
+    """
+    settings = get_settings()
+    batches = _split_by_token_budget(missing)
+    if len(batches) == 1:
+        return await _acreate_with_retry(batches[0])
+
+    semaphore = asyncio.Semaphore(settings.embedding_max_concurrency)
+
+    async def send(batch: list[tuple[str, str]]) -> dict[str, list[float]]:
+        async with semaphore:
+            return await _acreate_with_retry(batch)
+
+    fresh: dict[str, list[float]] = {}
+    for result in await asyncio.gather(*(send(batch) for batch in batches)):
+        fresh.update(result)
+    return fresh
+
+
+class EmbeddingBatcher:
+    """Coalesces concurrent single-text embedding requests into batched API calls.
+
+    Requests arriving within ``window_ms`` of the first pending one (or until
+    ``max_batch_size`` distinct texts are pending) are sent as a single
+    ``embeddings.create`` call; each caller gets back its own vector.
+    """
+
+    def __init__(self, window_ms: float, max_batch_size: int):
+        self.window_ms = window_ms
+        self.max_batch_size = max_batch_size
+        self._loop = asyncio.get_running_loop()
+        # key -> (text, waiting futures, enqueue time)
+        self._pending: dict[str, tuple[str, list[asyncio.Future], float]] = {}
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+        # Metrics
+        self.batches = 0
+        self.texts = 0
+        self.requests = 0
+        self.max_batch_seen = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+
+    async def embed(self, key: str, text: str) -> list[float]:
+        """Queue a text for the next batch and wait for its vector."""
+        future = self._loop.create_future()
+        self.requests += 1
+
+        if key in self._pending:
+            # Same text already queued -- share its result
+            self._pending[key][1].append(future)
+        else:
+            self._pending[key] = (text, [future], time.perf_counter())
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = self._loop.call_later(self.window_ms / 1000, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        """Send everything pending as one batch."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, {}
+        task = self._loop.create_task(self._send(batch))
+        # Keep a reference so the task isn't garbage-collected mid-flight
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: dict[str, tuple[str, list[asyncio.Future], float]]) -> None:
+        sent_at = time.perf_counter()
+        waits_ms = [(sent_at - enqueued) * 1000 for _, _, enqueued in batch.values()]
+        self._record(len(batch), waits_ms)
+
+        try:
+            vectors = await _aembed_missing([(key, text) for key, (text, _, _) in batch.items()])
+        except Exception as e:
+            for _, futures, _ in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+
+        for key, (_, futures, _) in batch.items():
+            for future in futures:
+                if not future.done():
+                    future.set_result(vectors[key])
+
+    def _record(self, batch_size: int, waits_ms: list[float]) -> None:
+        self.batches += 1
+        self.texts += batch_size
+        self.max_batch_seen = max(self.max_batch_seen, batch_size)
+        self.total_wait_ms += sum(waits_ms)
+        self.max_wait_ms = max(self.max_wait_ms, max(waits_ms))
+        logger.debug(
+            "Embedding batch: %d texts, max added wait %.1fms",
+            batch_size, max(waits_ms),
+        )
+
+    def stats(self) -> dict:
+        """Return batch-size and added-wait metrics."""
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "texts": self.texts,
+            "avg_batch_size": self.texts / self.batches if self.batches else 0.0,
+            "max_batch_size": self.max_batch_seen,
+            "avg_wait_ms": self.total_wait_ms / self.texts if self.texts else 0.0,
+            "max_wait_ms": self.max_wait_ms,
+        }
+
+
+_batcher: EmbeddingBatcher | None = None
+
+
+def get_embedding_batcher() -> EmbeddingBatcher:
+    """Get the embedding batcher bound to the running event loop."""
+    global _batcher
+    if _batcher is None or _batcher._loop is not asyncio.get_running_loop():
+        settings = get_settings()
+        _batcher = EmbeddingBatcher(
+            window_ms=settings.embedding_batch_window_ms,
+            max_batch_size=settings.embedding_batch_max_size,
+        )
+    return _batcher
+
+
+async def aget_embedding(text: str) -> list[float]:
+    """Async version of get_embedding that does not block the event loop.
+
+    Cache misses are coalesced with other concurrent callers' texts into a
+    single batched API request (see EmbeddingBatcher).
+
+    Args:
+        text: Text to embed
+
+    Returns:
+        List of floats representing the embedding vector
+    """
+    settings = get_settings()
+
+    text = normalize_embedding_text(text)
+    if not text:
+        return [0.0] * settings.embedding_dimensions
+
+    keys, found, missing = await asyncio.to_thread(_lookup_cached, [text])
+    if not missing:
+        return found[keys[0]]
+
+    if settings.embedding_batch_window_ms <= 0:
+        fresh = await _aembed_missing(missing)
+        return fresh[keys[0]]
+
+    return await get_embedding_batcher().embed(keys[0], text)
+
+
+async def aget_embeddings_batch(texts: list[str]) -> list[list[float]]:
+    """Async version of get_embeddings_batch using the shared AsyncOpenAI client.
+
+    Sub-batches are sent concurrently; the result order still matches ``texts``.
+
+    Args:
+        texts: List of texts to embed
+
+    Returns:
+        List of embedding vectors, in the same order as ``texts``
+    """
+    keys, found, missing = await asyncio.to_thread(_lookup_cached, _clean_batch(texts))
+
+    if missing:
+        found.update(await _aembed_missing(missing))
+
+    return [found[key] for key in keys]
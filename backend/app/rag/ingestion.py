@@ -1,10 +1,18 @@
-"""Document ingestion pipeline for RAG."""
+"""Document ingestion pipeline for RAG.
 
-import re
+Every chunk gets a stable ``chunk_key`` (programme/source, type, sub-page,
+section and chunk position) and a ``content_hash`` of its text and the
+embedding model. sync_documents() compares these with what is stored and
+only embeds and upserts new or changed chunks, then deletes vanished
+ones, so refreshes never empty the live table. The embedding and writes
+run through the concurrent pipeline in app/rag/pipeline.py.
+"""
+
+import hashlib
 from typing import Any
 from app.config import get_settings
-from app.db.supabase import get_supabase_admin_client
-from app.rag.embeddings import get_embeddings_batch
+from app.db.supabase import bulk_delete, bulk_upsert
+from app.rag.chunker import iter_chunks, overlap_for
 
 
 def chunk_text(
@@ -12,12 +20,13 @@ def chunk_text(
     chunk_size: int | None = None,
     chunk_overlap: int | None = None
 ) -> list[str]:
-    """Split text into overlapping chunks.
+    """Split text into structure-aware, overlapping chunks.
 
     Args:
-        text: Text to split
-        chunk_size: Maximum characters per chunk
-        chunk_overlap: Overlap between chunks
+        text: Text to split (one heading, paragraph or table row per line)
+        chunk_size: Maximum tokens per chunk (default from settings)
+        chunk_overlap: Tokens of trailing blocks repeated in the next chunk
+            (default from settings)
 
     Returns:
         List of text chunks
@@ -28,66 +37,92 @@ def chunk_text(
     if chunk_overlap is None:
         chunk_overlap = settings.chunk_overlap
 
-    # Clean text - strip null bytes (PostgreSQL rejects \u0000)
-    text = text.replace("\x00", "")
-    text = re.sub(r'\s+', ' ', text).strip()
+    return list(iter_chunks(text, chunk_size, chunk_overlap))
 
-    if len(text) <= chunk_size:
-        return [text]
 
-    chunks = []
-    start = 0
+# Metadata fields that identify where a chunk comes from. Source URLs are
+# only part of the key for PDFs, since a programme can have several.
+_CHUNK_KEY_FIELDS = ("program", "source", "type", "sub_page", "section_name")
 
-    while start < len(text):
-        end = start + chunk_size
+# Rows per request when reading existing chunks / ids per delete request
+_SYNC_PAGE_SIZE = 1000
+_DELETE_BATCH_SIZE = 200
 
-        # Try to break at sentence boundary
-        if end < len(text):
-            # Look for sentence endings
-            last_period = text.rfind('. ', start, end)
-            last_newline = text.rfind('\n', start, end)
-            break_point = max(last_period, last_newline)
 
-            if break_point > start + chunk_size // 2:
-                end = break_point + 1
+def chunk_key(metadata: dict[str, Any]) -> str:
+    """Build the stable key identifying a chunk across re-ingestions.
 
-        chunk = text[start:end].strip()
-        if chunk:
-            chunks.append(chunk)
+    Args:
+        metadata: Chunk metadata (including chunk_index)
 
-        start = end - chunk_overlap
+    Returns:
+        Hex digest of the identifying metadata fields
+    """
+    parts = [str(metadata.get(field, "")) for field in _CHUNK_KEY_FIELDS]
+    if metadata.get("type") == "pdf_brochure":
+        parts.append(str(metadata.get("source_url", "")))
+    parts.append(str(metadata.get("chunk_index", 0)))
+    return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()
 
-    return chunks
+
+def content_hash(content: str, programs: list[str] | None = None) -> str:
+    """Hash a chunk's text together with the embedding model it is embedded with.
+
+    For chunks shared by several programmes (see app/rag/dedup.py) the
+    programme list is hashed too, so a change in sharing rewrites the row;
+    the embedding itself then comes from the embedding cache.
+    """
+    settings = get_settings()
+    payload = f"{settings.embedding_model}:{settings.embedding_dimensions}:{content}"
+    if programs:
+        payload += "\x1f" + "\x1f".join(programs)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
 
 def prepare_documents(
     texts: list[str],
-    metadatas: list[dict[str, Any]] | None = None
+    metadatas: list[dict[str, Any]] | None = None,
+    chunk_size: int | None = None,
+    chunk_overlap: int | None = None,
 ) -> list[dict]:
     """Prepare documents with chunking and metadata.
 
     Args:
         texts: List of document texts
         metadatas: Optional list of metadata dicts (one per text)
+        chunk_size: Optional chunk size override in tokens (default from settings)
+        chunk_overlap: Optional overlap override in tokens (default per doc type,
+            see chunker.overlap_for)
 
     Returns:
-        List of prepared document dicts
+        List of prepared document dicts (content, metadata, chunk_key, content_hash)
     """
     if metadatas is None:
         metadatas = [{} for _ in texts]
 
     documents = []
+    seen_keys: dict[str, int] = {}
     for text, metadata in zip(texts, metadatas):
-        chunks = chunk_text(text)
+        overlap = chunk_overlap if chunk_overlap is not None else overlap_for(metadata)
+        chunks = chunk_text(text, chunk_size, overlap)
         for i, chunk in enumerate(chunks):
             doc_metadata = {
                 **metadata,
                 "chunk_index": i,
                 "total_chunks": len(chunks)
             }
+            key = chunk_key(doc_metadata)
+            # Identically-labelled texts (e.g. repeated section names) get
+            # distinct keys in order of appearance
+            occurrence = seen_keys.get(key, 0)
+            seen_keys[key] = occurrence + 1
+            if occurrence:
+                key = f"{key}-{occurrence}"
             documents.append({
                 "content": chunk,
-                "metadata": doc_metadata
+                "metadata": doc_metadata,
+                "chunk_key": key,
+                "content_hash": content_hash(chunk),
             })
 
     return documents
@@ -100,50 +135,29 @@ async def ingest_documents(
 ) -> int:
     """Ingest documents into the vector database.
 
+    Runs the chunk -> embed -> write pipeline (see app/rag/pipeline.py),
+    upserting every chunk.
+
     Args:
         texts: List of document texts
         metadatas: Optional list of metadata dicts
-        batch_size: Number of documents to process at once
+        batch_size: Number of rows per database upsert
 
     Returns:
         Number of documents ingested
     """
-    # Prepare documents with chunking
-    documents = prepare_documents(texts, metadatas)
-
-    if not documents:
-        return 0
-
-    client = get_supabase_admin_client()
-    total_ingested = 0
-
-    # Process in batches
-    for i in range(0, len(documents), batch_size):
-        batch = documents[i:i + batch_size]
-        contents = [doc["content"] for doc in batch]
-
-        # Generate embeddings for batch
-        embeddings = get_embeddings_batch(contents)
-
-        # Prepare records for insertion
-        records = [
-            {
-                "content": doc["content"],
-                "metadata": doc["metadata"],
-                "embedding": emb
-            }
-            for doc, emb in zip(batch, embeddings)
-        ]
+    from app.rag.pipeline import IngestionPipeline, IngestionSource
 
-        # Insert into Supabase
-        result = client.table("documents").insert(records).execute()
-        total_ingested += len(result.data) if result.data else 0
+    if metadatas is None:
+        metadatas = [{} for _ in texts]
 
-    return total_ingested
+    pipeline = IngestionPipeline(write_batch_size=batch_size)
+    counts = await pipeline.run([IngestionSource("documents", texts, metadatas)])
+    return counts["documents"]["upserted"]
 
 
-async def ingest_program_data(program: dict) -> int:
-    """Ingest a program's data into the vector database.
+def build_program_texts(program: dict) -> tuple[list[str], list[dict[str, Any]]]:
+    """Turn a program's scraped data into texts and metadata for ingestion.
 
     Args:
         program: Program data dict with name, description, etc.
@@ -151,7 +165,7 @@ async def ingest_program_data(program: dict) -> int:
             format with sub_pages and pdf_contents.
 
     Returns:
-        Number of documents ingested
+        Tuple of (texts, metadatas), one metadata dict per text
     """
     texts = []
     metadatas = []
@@ -250,4 +264,141 @@ async def ingest_program_data(program: dict) -> int:
                 "source_url": pdf.get("source_url", "") if isinstance(pdf, dict) else "",
             })
 
+    return texts, metadatas
+
+
+def _select_documents(client, columns: str, metadata: dict[str, Any]) -> list[dict]:
+    """Read columns of every stored row whose metadata contains the given fields, page by page."""
+    rows: list[dict] = []
+    start = 0
+    while True:
+        result = (
+            client.table("documents")
+            .select(columns)
+            .contains("metadata", metadata)
+            .order("id")
+            .range(start, start + _SYNC_PAGE_SIZE - 1)
+            .execute()
+        )
+        page = result.data or []
+        rows.extend(page)
+        if len(page) < _SYNC_PAGE_SIZE:
+            return rows
+        start += _SYNC_PAGE_SIZE
+
+
+def fetch_stored_chunks(client, scope: dict[str, Any]) -> list[dict]:
+    """Read id, chunk_key, content_hash and shared programmes of stored rows whose metadata contains scope."""
+    return _select_documents(client, "id, chunk_key, content_hash, programs:metadata->programs", scope)
+
+
+def fetch_shared_chunks(client, program: str) -> list[dict]:
+    """Read id, content and owning programme of stored shared rows that stand for a programme.
+
+    These are the rows whose ``metadata.programs`` lists the programme,
+    including rows stored under another programme's scope.
+    """
+    return _select_documents(
+        client, "id, chunk_key, content, program:metadata->>program", {"programs": [program]}
+    )
+
+
+def diff_stored_chunks(
+    client,
+    documents: list[dict],
+    scope: dict[str, Any],
+    stored_rows: list[dict] | None = None,
+) -> tuple[list[dict], list[str]]:
+    """Compare prepared documents with the chunks stored for a scope.
+
+    Args:
+        client: Supabase client allowed to read the documents table
+        documents: Output of prepare_documents for the whole scope
+        scope: Metadata every chunk of this source shares, e.g. {"program": "MSc Finance"}
+        stored_rows: Output of fetch_stored_chunks for the scope, if already read
+
+    Returns:
+        Tuple of (new or changed documents, ids of stored rows that vanished).
+        Rows stored before chunk keys were introduced count as vanished.
+    """
+    if stored_rows is None:
+        stored_rows = fetch_stored_chunks(client, scope)
+    stored = {row["chunk_key"]: row for row in stored_rows if row.get("chunk_key")}
+    changed = [
+        doc for doc in documents
+        if stored.get(doc["chunk_key"], {}).get("content_hash") != doc["content_hash"]
+    ]
+    current_keys = {doc["chunk_key"] for doc in documents}
+    vanished = [row["id"] for row in stored_rows if row.get("chunk_key") not in current_keys]
+    return changed, vanished
+
+
+def upsert_documents(client, records: list[dict]) -> int:
+    """Upsert document rows (with embeddings) by chunk_key.
+
+    Large batches are split into requests bounded by payload size.
+
+    Returns:
+        Number of rows written
+    """
+    return bulk_upsert(client, "documents", records, on_conflict="chunk_key")
+
+
+def delete_documents(client, ids: list[str]) -> None:
+    """Delete document rows by id, a bounded number per request."""
+    bulk_delete(client, "documents", "id", ids, _DELETE_BATCH_SIZE)
+
+
+async def sync_documents(
+    texts: list[str],
+    metadatas: list[dict[str, Any]],
+    scope: dict[str, Any],
+    batch_size: int = 100
+) -> dict[str, int]:
+    """Incrementally bring the stored chunks for one scope in line with texts.
+
+    Only new or changed chunks are embedded and upserted; stored chunks in
+    the scope that no longer exist (including rows ingested before chunk
+    keys were introduced) are deleted afterwards. Unchanged rows are never
+    touched, so searches keep working throughout.
+
+    Args:
+        texts: List of document texts
+        metadatas: List of metadata dicts (one per text)
+        scope: Metadata every chunk of this source shares, e.g. {"program": "MSc Finance"}
+        batch_size: Number of rows per database upsert
+
+    Returns:
+        Counts of upserted, unchanged, deleted and near-duplicate chunks
+    """
+    from app.rag.pipeline import IngestionPipeline, IngestionSource
+
+    pipeline = IngestionPipeline(write_batch_size=batch_size)
+    counts = await pipeline.run([IngestionSource("documents", texts, metadatas, scope)])
+    return counts["documents"]
+
+
+async def ingest_program_data(program: dict) -> int:
+    """Ingest a program's data into the vector database.
+
+    Args:
+        program: Program data dict (see build_program_texts)
+
+    Returns:
+        Number of documents ingested
+    """
+    texts, metadatas = build_program_texts(program)
     return await ingest_documents(texts, metadatas)
+
+
+async def sync_program_data(program: dict) -> dict[str, int]:
+    """Incrementally re-ingest one program, touching only changed chunks.
+
+    Args:
+        program: Program data dict (see build_program_texts)
+
+    Returns:
+        Counts of upserted, unchanged and deleted chunks
+    """
+    texts, metadatas = build_program_texts(program)
+    return await sync_documents(texts, metadatas, {"program": program["name"]})
@@ -0,0 +1,457 @@
+"""In-process exact vector index over the documents corpus.
+
+The corpus is a few thousand 1536-d vectors, so a brute-force cosine
+search over a contiguous float32 matrix is exact and takes well under a
+millisecond -- no network round trip and none of the recall misses of an
+approximate pgvector index.
+
+On disk an index is a directory with:
+
+    manifest.json     model, dimensions, document count, content hash, version
+    chunks.jsonl      one {"id", "content", "metadata"} object per row
+    embeddings.npy    float32 matrix of L2-normalized vectors (memory-mapped on load)
+    programs.json     optional programme records (prebuilt bundles, see app/rag/bundle.py)
+
+Published indexes live in versioned subdirectories of the index root,
+with a CURRENT file naming the one to serve:
+
+    data/index/CURRENT
+    data/index/<version>/...
+
+Rolling back is pointing CURRENT (or settings.local_index_version) at an
+older version. Serving processes notice a moved CURRENT within
+settings.local_index_check_interval_seconds and load the new version.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from app.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Project root (backend/app/rag/local_index.py -> repo root)
+_PROJECT_ROOT = Path(__file__).resolve().parent.parent.parent.parent
+
+MANIFEST_FILE = "manifest.json"
+CHUNKS_FILE = "chunks.jsonl"
+EMBEDDINGS_FILE = "embeddings.npy"
+PROGRAMS_FILE = "programs.json"
+CURRENT_FILE = "CURRENT"
+
+# Rows fetched per request when snapshotting the documents table
+_SNAPSHOT_PAGE_SIZE = 500
+
+
+def _corpus_hash(documents: list[dict]) -> str:
+    """Hash chunk texts and metadata, so identical corpora get identical hashes."""
+    digest = hashlib.sha256()
+    for doc in documents:
+        digest.update(doc["content"].encode("utf-8"))
+        digest.update(json.dumps(doc["metadata"], sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize each row so a dot product equals cosine similarity."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+def _parse_embedding(value: Any) -> list[float]:
+    """Parse a pgvector value, which PostgREST returns as a '[...]' string."""
+    if isinstance(value, str):
+        return json.loads(value)
+    return list(value)
+
+
+def _matches(metadata: dict, key: str, value: Any) -> bool:
+    if metadata.get(key) == value:
+        return True
+    return key == "program" and value in metadata.get("programs", ())
+
+
+class LocalVectorIndex:
+    """Exact cosine-similarity index with metadata filters."""
+
+    def __init__(
+        self,
+        embeddings: np.ndarray,
+        documents: list[dict],
+        manifest: dict[str, Any] | None = None,
+        programs: list[dict] | None = None,
+    ):
+        if len(embeddings) != len(documents):
+            raise ValueError(
+                f"Embedding rows ({len(embeddings)}) do not match documents ({len(documents)})"
+            )
+        self.embeddings = embeddings
+        self.documents = documents
+        self.manifest = manifest or {}
+        self.programs = programs or []
+        self._mask_cache: dict[tuple, np.ndarray] = {}
+
+    @property
+    def version(self) -> str:
+        return self.manifest.get("version", "")
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    # ── Construction ──────────────────────────────────────────────────
+
+    @classmethod
+    def from_records(
+        cls,
+        records: list[dict],
+        manifest: dict[str, Any] | None = None,
+        programs: list[dict] | None = None,
+    ) -> "LocalVectorIndex":
+        """Build an index from rows with id, content, metadata and embedding."""
+        settings = get_settings()
+        documents = [
+            {
+                "id": r.get("id"),
+                "content": r["content"],
+                "metadata": r.get("metadata") or {},
+            }
+            for r in records
+        ]
+        if records:
+            matrix = np.asarray([_parse_embedding(r["embedding"]) for r in records], dtype=np.float32)
+        else:
+            matrix = np.zeros((0, settings.embedding_dimensions), dtype=np.float32)
+
+        content_hash = _corpus_hash(documents)
+        manifest = {
+            "embedding_model": settings.embedding_model,
+            "embedding_dimensions": settings.embedding_dimensions,
+            "document_count": len(documents),
+            "content_hash": content_hash,
+            "version": f"{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')}-{content_hash[:8]}",
+            **(manifest or {}),
+        }
+        return cls(_normalize_rows(matrix), documents, manifest, programs)
+
+    @classmethod
+    def from_supabase(cls, client) -> "LocalVectorIndex":
+        """Snapshot the documents table into an index.
+
+        Args:
+            client: Supabase client allowed to read the documents table
+
+        Returns:
+            LocalVectorIndex with every stored document
+        """
+        records: list[dict] = []
+        start = 0
+        while True:
+            result = (
+                client.table("documents")
+                .select("id, content, metadata, embedding")
+                .order("id")
+                .range(start, start + _SNAPSHOT_PAGE_SIZE - 1)
+                .execute()
+            )
+            rows = result.data or []
+            records.extend(r for r in rows if r.get("embedding") is not None)
+            if len(rows) < _SNAPSHOT_PAGE_SIZE:
+                break
+            start += _SNAPSHOT_PAGE_SIZE
+
+        return cls.from_records(records, {"source": "supabase"})
+
+    # ── Persistence ───────────────────────────────────────────────────
+
+    def save(self, directory: str | Path) -> Path:
+        """Write the index to a directory (see module docstring for layout)."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        np.save(directory / EMBEDDINGS_FILE, np.ascontiguousarray(self.embeddings, dtype=np.float32))
+        with open(directory / CHUNKS_FILE, "w", encoding="utf-8") as f:
+            for doc in self.documents:
+                f.write(json.dumps(doc, ensure_ascii=False) + "\n")
+        if self.programs:
+            with open(directory / PROGRAMS_FILE, "w", encoding="utf-8") as f:
+                json.dump(self.programs, f, indent=2, ensure_ascii=False)
+        # Manifest last: a directory without one is never loaded
+        with open(directory / MANIFEST_FILE, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2)
+
+        return directory
+
+    @classmethod
+    def load(cls, directory: str | Path, mmap: bool = True) -> "LocalVectorIndex":
+        """Load an index written by save().
+
+        Args:
+            directory: Index directory
+            mmap: Memory-map the embeddings instead of reading them into RAM
+
+        Returns:
+            LocalVectorIndex
+        """
+        directory = Path(directory)
+        with open(directory / MANIFEST_FILE, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+
+        embeddings = np.load(directory / EMBEDDINGS_FILE, mmap_mode="r" if mmap else None)
+
+        documents: list[dict] = []
+        with open(directory / CHUNKS_FILE, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    documents.append(json.loads(line))
+
+        programs: list[dict] = []
+        if (directory / PROGRAMS_FILE).exists():
+            with open(directory / PROGRAMS_FILE, "r", encoding="utf-8") as f:
+                programs = json.load(f)
+
+        return cls(embeddings, documents, manifest, programs)
+
+    # ── Search ────────────────────────────────────────────────────────
+
+    def filter_mask(self, filters: dict[str, Any]) -> np.ndarray:
+        """Boolean mask of rows whose metadata matches every filter value.
+
+        A programme filter also matches chunks shared by several programmes
+        (metadata["programs"], see app/rag/dedup.py).
+        """
+        key = tuple(sorted(filters.items()))
+        mask = self._mask_cache.get(key)
+        if mask is None:
+            mask = np.fromiter(
+                (
+                    all(_matches(doc["metadata"], k, v) for k, v in filters.items())
+                    for doc in self.documents
+                ),
+                dtype=bool,
+                count=len(self.documents),
+            )
+            self._mask_cache[key] = mask
+        return mask
+
+    def similarities(self, query_embedding: list[float]) -> np.ndarray:
+        """Cosine similarity of every document to a query vector."""
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return np.zeros(len(self.documents), dtype=np.float32)
+        return self.embeddings @ (query / norm)
+
+    def search(
+        self,
+        query_embedding: list[float],
+        k: int = 4,
+        threshold: float | None = None,
+        filters: dict[str, Any] | None = None,
+    ) -> list[dict]:
+        """Exact top-k search by cosine similarity.
+
+        Args:
+            query_embedding: Query vector
+            k: Number of documents to return
+            threshold: Optional minimum similarity
+            filters: Optional metadata key/value pairs every result must match
+
+        Returns:
+            Documents (id, content, metadata, similarity), most similar first
+        """
+        if not len(self.documents) or k <= 0:
+            return []
+
+        scores = self.similarities(query_embedding)
+
+        if filters:
+            scores = np.where(self.filter_mask(filters), scores, -np.inf)
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        results = []
+        for i in top:
+            similarity = float(scores[i])
+            if similarity == -np.inf or (threshold is not None and similarity <= threshold):
+                break
+            results.append({**self.documents[i], "similarity": similarity})
+        return results
+
+
+def resolve_index_path(path: str | None = None) -> Path:
+    """Resolve the configured index root directory against the project root."""
+    index_path = Path(path or get_settings().local_index_path)
+    if not index_path.is_absolute():
+        index_path = _PROJECT_ROOT / index_path
+    return index_path
+
+
+def resolve_serving_path(root: str | Path | None = None) -> Path:
+    """Resolve the index directory to serve.
+
+    settings.local_index_version wins, then the root's CURRENT file; a root
+    without either is treated as a single unversioned index.
+    """
+    root = resolve_index_path(str(root) if root else None)
+    version = get_settings().local_index_version
+    if not version and (root / CURRENT_FILE).exists():
+        version = (root / CURRENT_FILE).read_text(encoding="utf-8").strip()
+    return root / version if version else root
+
+
+def list_index_versions(root: str | Path | None = None) -> list[str]:
+    """Published index versions under the root, oldest first."""
+    root = resolve_index_path(str(root) if root else None)
+    if not root.exists():
+        return []
+    return sorted(d.name for d in root.iterdir() if (d / MANIFEST_FILE).exists())
+
+
+def set_current_version(version: str, root: str | Path | None = None) -> None:
+    """Point the root's CURRENT file at a published version (atomic)."""
+    root = resolve_index_path(str(root) if root else None)
+    if not (root / version / MANIFEST_FILE).exists():
+        raise ValueError(f"No index version {version!r} under {root}")
+    tmp = root / f"{CURRENT_FILE}.tmp"
+    tmp.write_text(version + "\n", encoding="utf-8")
+    os.replace(tmp, root / CURRENT_FILE)
+
+
+def publish_index(index: LocalVectorIndex, root: str | Path | None = None) -> Path:
+    """Save an index as a new version under the root and make it current.
+
+    Args:
+        index: Index to publish
+        root: Index root (defaults to settings.local_index_path)
+
+    Returns:
+        Directory the version was written to
+    """
+    root = resolve_index_path(str(root) if root else None)
+    directory = index.save(root / index.version)
+    set_current_version(index.version, root)
+    return directory
+
+
+_index: LocalVectorIndex | None = None
+_index_loaded = False
+_index_lock = threading.Lock()
+# Serving directory and manifest version the loaded index came from, and
+# when that was last compared against disk
+_index_source: tuple[str, str] | None = None
+_index_checked_at = 0.0
+
+
+def _serving_source() -> tuple[str, str] | None:
+    """Directory and manifest version that would be served now, or None if there is none."""
+    path = resolve_serving_path()
+    try:
+        with open(path / MANIFEST_FILE, "r", encoding="utf-8") as f:
+            return str(path), json.load(f).get("version", "")
+    except (OSError, ValueError):
+        return None
+
+
+def get_local_index() -> LocalVectorIndex | None:
+    """Get the process-wide local index, or None if disabled or not built yet.
+
+    Every local_index_check_interval_seconds the serving directory (CURRENT)
+    and its manifest are re-checked, and a newly published version is
+    loaded in place of the old one.
+    """
+    global _index_checked_at
+    if _index_loaded:
+        interval = get_settings().local_index_check_interval_seconds
+        if interval <= 0 or time.monotonic() - _index_checked_at < interval:
+            return _index
+        _index_checked_at = time.monotonic()
+        source = _serving_source()
+        if source is None or source == _index_source:
+            return _index
+        logger.info("Local vector index changed on disk (%s); reloading", source[1])
+        return reload_local_index()
+
+    with _index_lock:
+        if not _index_loaded:
+            _load_index()
+    return _index
+
+
+def reload_local_index() -> LocalVectorIndex | None:
+    """Drop the loaded index and load it again from disk."""
+    from app.rag.retrieval_cache import invalidate_retrieval_cache
+
+    with _index_lock:
+        _load_index()
+    # Results cached against the previous index may now be stale
+    invalidate_retrieval_cache()
+    return _index
+
+
+def _load_index() -> None:
+    """Load the configured index (caller holds _index_lock)."""
+    global _index, _index_loaded, _index_source, _index_checked_at
+    _index_source = _serving_source()
+    _index_checked_at = time.monotonic()
+    _index = _load_configured_index()
+    _index_loaded = True
+
+
+def _load_configured_index() -> LocalVectorIndex | None:
+    settings = get_settings()
+    if not settings.local_index_enabled:
+        return None
+
+    path = resolve_serving_path()
+    if not (path / MANIFEST_FILE).exists():
+        logger.info("No local vector index at %s; using match_documents RPC", path)
+        return None
+
+    try:
+        index = LocalVectorIndex.load(path)
+    except (OSError, ValueError) as e:
+        logger.warning("Could not load local vector index from %s: %s", path, e)
+        return None
+
+    if index.manifest.get("embedding_model") != settings.embedding_model or (
+        index.manifest.get("embedding_dimensions") != settings.embedding_dimensions
+    ):
+        logger.warning(
+            "Local vector index at %s was built with %s/%s; expected %s/%s. Ignoring it.",
+            path,
+            index.manifest.get("embedding_model"),
+            index.manifest.get("embedding_dimensions"),
+            settings.embedding_model,
+            settings.embedding_dimensions,
+        )
+        return None
+
+    logger.info("Loaded local vector index (%d documents, version %s)", len(index), index.version)
+    return index
+
+
+def snapshot_local_index(client, path: str | None = None) -> LocalVectorIndex:
+    """Snapshot the documents table and publish it as the current index version.
+
+    Args:
+        client: Supabase client allowed to read the documents table
+        path: Optional index root (defaults to settings.local_index_path)
+
+    Returns:
+        The freshly built index
+    """
+    index = LocalVectorIndex.from_supabase(client)
+    publish_index(index, path)
+    return index
@@ -0,0 +1,256 @@
+"""Pipelined ingestion: chunk -> embed -> write with bounded queues.
+
+A single producer chunks every source, collapses near-duplicate chunks
+across them (see app/rag/dedup.py) and diffs each against the stored
+chunks. Sources are consumed lazily, so programmes can be streamed in as
+they are parsed (see app/scrapers/programme_store.py). Embedding workers
+and database writers run concurrently behind bounded queues, so OpenAI
+requests and Supabase upserts overlap instead of alternating.
+
+With dedup off, each source is embedded as soon as it is chunked. With it
+on, chunks (never raw source text) are held until every source has been
+seen. Vanished chunks are deleted once all writes have landed.
+
+Supabase calls use the sync client and run in worker threads.
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.config import get_settings
+from app.db.catalog import bump_catalog_version
+from app.db.supabase import get_supabase_admin_client
+from app.rag.dedup import collapse_duplicates, drop_covered_chunks, merge_stored_programs
+from app.rag.embeddings import aget_embeddings_batch
+from app.rag.ingestion import (
+    delete_documents,
+    diff_stored_chunks,
+    fetch_shared_chunks,
+    fetch_stored_chunks,
+    prepare_documents,
+    upsert_documents,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class IngestionSource:
+    """One unit of ingestion, e.g. a programme.
+
+    With a scope, the source is synced incrementally: only new or changed
+    chunks are written and stored chunks in the scope that vanished are
+    deleted. Without one, every chunk is upserted.
+    """
+
+    label: str
+    texts: list[str]
+    metadatas: list[dict[str, Any]]
+    scope: dict[str, Any] | None = None
+
+
+@dataclass
+class StageStats:
+    """Throughput counters for one pipeline stage."""
+
+    name: str
+    items: int = 0
+    batches: int = 0
+    busy_seconds: float = 0.0
+
+    def summary(self, elapsed: float) -> str:
+        rate = self.items / elapsed if elapsed else 0.0
+        return (
+            f"{self.name:<6} {self.items:>6} items in {self.batches:>4} batches, "
+            f"busy {self.busy_seconds:6.1f}s, {rate:8.1f} items/s"
+        )
+
+
+@dataclass
+class _Batch:
+    label: str
+    items: list[dict] = field(default_factory=list)
+
+
+class IngestionPipeline:
+    """Concurrent chunk -> embed -> write pipeline over ingestion sources."""
+
+    def __init__(
+        self,
+        embed_workers: int | None = None,
+        write_workers: int | None = None,
+        embed_batch_size: int | None = None,
+        write_batch_size: int = 100,
+        queue_size: int | None = None,
+        dedup: bool | None = None,
+    ):
+        settings = get_settings()
+        self.embed_workers = embed_workers or settings.ingest_embed_workers
+        self.write_workers = write_workers or settings.ingest_write_workers
+        self.embed_batch_size = embed_batch_size or settings.ingest_embed_batch_size
+        self.write_batch_size = write_batch_size
+        self.queue_size = queue_size or settings.ingest_queue_size
+
+        self.dedup = settings.dedup_enabled if dedup is None else dedup
+
+        self.stages = {
+            name: StageStats(name) for name in ("chunk", "dedup", "embed", "write", "delete")
+        }
+        self.counts: dict[str, dict[str, int]] = {}
+        self.elapsed = 0.0
+        self._vanished: list[str] = []
+
+    async def run(self, sources: Iterable[IngestionSource]) -> dict[str, dict[str, int]]:
+        """Ingest every source.
+
+        Args:
+            sources: Sources to ingest; consumed lazily by the chunk stage
+
+        Returns:
+            Counts of upserted, unchanged, deleted and near-duplicate chunks
+            per source label
+        """
+        start = time.perf_counter()
+        client = get_supabase_admin_client()
+        embed_queue: asyncio.Queue[_Batch | None] = asyncio.Queue(self.queue_size)
+        write_queue: asyncio.Queue[_Batch | None] = asyncio.Queue(self.queue_size)
+
+        async def embedders():
+            async with asyncio.TaskGroup() as group:
+                for _ in range(self.embed_workers):
+                    group.create_task(self._embed(embed_queue, write_queue))
+            # All embeddings are queued; tell the writers to finish
+            for _ in range(self.write_workers):
+                await write_queue.put(None)
+
+        async with asyncio.TaskGroup() as group:
+            group.create_task(self._chunk(sources, client, embed_queue))
+            group.create_task(embedders())
+            for _ in range(self.write_workers):
+                group.create_task(self._write(client, write_queue))
+
+        # Delete vanished chunks only after their replacements are in place
+        if self._vanished:
+            began = time.perf_counter()
+            await asyncio.to_thread(delete_documents, client, self._vanished)
+            self._record("delete", len(self._vanished), began)
+
+        if any(c["upserted"] or c["deleted"] for c in self.counts.values()):
+            # Serving processes key cached search results by this stamp
+            try:
+                await asyncio.to_thread(bump_catalog_version, client)
+            except Exception as e:
+                logger.warning("Could not write the catalog version stamp: %s", e)
+
+        self.elapsed = time.perf_counter() - start
+        logger.info("Ingestion pipeline finished\n%s", self.summary())
+        return self.counts
+
+    def summary(self) -> str:
+        """Per-stage throughput and totals for the last run."""
+        totals = {
+            key: sum(c[key] for c in self.counts.values())
+            for key in ("upserted", "unchanged", "deleted", "duplicates")
+        }
+        lines = [stage.summary(self.elapsed) for stage in self.stages.values()]
+        lines.append(
+            f"{len(self.counts)} sources in {self.elapsed:.1f}s: {totals['upserted']} upserted, "
+            f"{totals['unchanged']} unchanged, {totals['deleted']} deleted, "
+            f"{totals['duplicates']} near-duplicates collapsed"
+        )
+        return "\n".join(lines)
+
+    # ── Stages ────────────────────────────────────────────────────────
+
+    async def _chunk(self, sources: Iterable[IngestionSource], client, embed_queue: asyncio.Queue):
+        try:
+            # Sources may be lazy generators doing blocking work; advance them off the loop
+            pending: list[tuple[str, dict | None, list[dict]]] = []
+            iterator = iter(sources)
+            while (source := await asyncio.to_thread(next, iterator, None)) is not None:
+                began = time.perf_counter()
+                documents = await asyncio.to_thread(prepare_documents, source.texts, source.metadatas)
+                self._record("chunk", len(documents), began)
+                if self.dedup:
+                    # Only the chunks are kept; the source's raw text is released
+                    pending.append((source.label, source.scope, documents))
+                else:
+                    ingested = {source.scope.get("program")} if source.scope else set()
+                    await self._enqueue(source.label, source.scope, documents, 0, ingested, client, embed_queue)
+
+            # Near-duplicates are found across all sources, so with dedup on
+            # everything is chunked before the first embedding request
+            if pending:
+                began = time.perf_counter()
+                kept, removed = await asyncio.to_thread(
+                    collapse_duplicates, [documents for _, _, documents in pending]
+                )
+                self._record("dedup", sum(removed), began)
+                ingested = {scope.get("program") for _, scope, _ in pending if scope}
+                for (label, scope, _), documents, duplicates in zip(pending, kept, removed):
+                    await self._enqueue(label, scope, documents, duplicates, ingested, client, embed_queue)
+        finally:
+            for _ in range(self.embed_workers):
+                await embed_queue.put(None)
+
+    async def _enqueue(
+        self,
+        label: str,
+        scope: dict | None,
+        documents: list[dict],
+        duplicates: int,
+        ingested: set[str],
+        client,
+        embed_queue: asyncio.Queue,
+    ):
+        changed, vanished = documents, []
+        if scope is not None:
+            if self.dedup and scope.get("program"):
+                # Chunks already shared from a programme outside this run are not stored again
+                shared_rows = await asyncio.to_thread(fetch_shared_chunks, client, scope["program"])
+                documents, covered = await asyncio.to_thread(
+                    drop_covered_chunks, documents, shared_rows, ingested
+                )
+                duplicates += covered
+            stored_rows = await asyncio.to_thread(fetch_stored_chunks, client, scope)
+            # Shared chunks keep the programmes this run does not re-ingest
+            documents = merge_stored_programs(documents, stored_rows, ingested)
+            changed, vanished = diff_stored_chunks(client, documents, scope, stored_rows)
+
+        self.counts[label] = {
+            "upserted": 0,
+            "unchanged": len(documents) - len(changed),
+            "deleted": len(vanished),
+            "duplicates": duplicates,
+        }
+        self._vanished.extend(vanished)
+
+        for i in range(0, len(changed), self.embed_batch_size):
+            await embed_queue.put(_Batch(label, changed[i:i + self.embed_batch_size]))
+
+    async def _embed(self, embed_queue: asyncio.Queue, write_queue: asyncio.Queue):
+        while (batch := await embed_queue.get()) is not None:
+            began = time.perf_counter()
+            embeddings = await aget_embeddings_batch([doc["content"] for doc in batch.items])
+            self._record("embed", len(batch.items), began)
+
+            records = [{**doc, "embedding": emb} for doc, emb in zip(batch.items, embeddings)]
+            for i in range(0, len(records), self.write_batch_size):
+                await write_queue.put(_Batch(batch.label, records[i:i + self.write_batch_size]))
+
+    async def _write(self, client, write_queue: asyncio.Queue):
+        while (batch := await write_queue.get()) is not None:
+            began = time.perf_counter()
+            written = await asyncio.to_thread(upsert_documents, client, batch.items)
+            self._record("write", written, began)
+            self.counts[batch.label]["upserted"] += written
+
+    def _record(self, stage: str, items: int, began: float):
+        stats = self.stages[stage]
+        stats.items += items
+        stats.batches += 1
+        stats.busy_seconds += time.perf_counter() - began
@@ -0,0 +1,231 @@
+"""Dry-run planning for ingestion runs.
+
+Chunks every source exactly as the pipeline would (prepare_documents and
+near-duplicate collapsing), counts tokens with the local tokenizer and,
+when the documents table has chunk keys, diffs against the stored content
+hashes to find what would actually be embedded. Embedding requests are
+estimated with the same token-budgeted batching and embedding cache the
+pipeline uses, so the report gives chunks, tokens, API calls, cost and
+index growth per programme and per doc type without any writes or
+embedding calls.
+"""
+
+import json
+import logging
+from collections.abc import Iterable
+from dataclasses import dataclass, field, fields
+
+from app.config import get_settings
+from app.rag.dedup import collapse_duplicates, drop_covered_chunks, merge_stored_programs
+from app.rag.embeddings import estimate_embedding_requests
+from app.rag.ingestion import fetch_shared_chunks, fetch_stored_chunks, prepare_documents
+from app.rag.pipeline import IngestionSource
+from app.rag.tokenizer import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# float32 vectors in the local index
+_BYTES_PER_DIMENSION = 4
+
+
+@dataclass
+class PlanCounts:
+    """Planned work for one programme, doc type or the whole run."""
+
+    chunks: int = 0
+    tokens: int = 0
+    bytes: int = 0
+    new: int = 0
+    modified: int = 0
+    unchanged: int = 0
+    deleted: int = 0
+    duplicates: int = 0
+    stored: int = 0
+    embed_tokens: int = 0
+    requests: int = 0
+    api_tokens: int = 0
+    cached: int = 0
+
+    def add(self, other: "PlanCounts"):
+        for f in fields(self):
+            setattr(self, f.name, getattr(self, f.name) + getattr(other, f.name))
+
+    @property
+    def to_embed(self) -> int:
+        return self.new + self.modified
+
+    @property
+    def growth(self) -> int:
+        return self.chunks - self.stored
+
+
+@dataclass
+class IngestionPlan:
+    """Breakdown of a planned ingestion run."""
+
+    by_program: dict[str, PlanCounts] = field(default_factory=dict)
+    # (programme, doc type) -> counts
+    by_type: dict[tuple[str, str], PlanCounts] = field(default_factory=dict)
+    diffed: bool = False
+
+    @property
+    def total(self) -> PlanCounts:
+        total = PlanCounts()
+        for counts in self.by_program.values():
+            total.add(counts)
+        return total
+
+    @property
+    def cost(self) -> float:
+        """Estimated embedding cost in USD."""
+        return self.total.api_tokens * get_settings().embedding_price_per_million_tokens / 1_000_000
+
+    def report(self, top: int | None = None) -> str:
+        """Per-programme and per-doc-type tables plus totals.
+
+        Args:
+            top: Only list the programmes with the most tokens
+        """
+        price = get_settings().embedding_price_per_million_tokens
+        rows = sorted(self.by_program.items(), key=lambda item: item[1].tokens, reverse=True)
+        if top:
+            rows = rows[:top]
+
+        header = (
+            f"{'programme':<40} {'chunks':>6} {'tokens':>8} {'pdf tok':>8} {'embed':>6} "
+            f"{'deleted':>7} {'growth':>6} {'calls':>5} {'cost $':>8}"
+        )
+        lines = [header, "-" * len(header)]
+        for name, c in rows:
+            pdf = self.by_type.get((name, "pdf_brochure"), PlanCounts()).tokens
+            lines.append(
+                f"{name[:40]:<40} {c.chunks:>6} {c.tokens:>8} {pdf:>8} {c.to_embed:>6} "
+                f"{c.deleted:>7} {c.growth:>+6} {c.requests:>5} {c.api_tokens * price / 1_000_000:>8.4f}"
+            )
+
+        types: dict[str, PlanCounts] = {}
+        for (_, doc_type), counts in self.by_type.items():
+            types.setdefault(doc_type, PlanCounts()).add(counts)
+        header = f"{'doc type':<24} {'chunks':>6} {'tokens':>8} {'avg tok':>7} {'embed':>6} {'embed tok':>9} {'MB':>6}"
+        lines += ["", header, "-" * len(header)]
+        for doc_type, c in sorted(types.items(), key=lambda item: item[1].tokens, reverse=True):
+            lines.append(
+                f"{doc_type[:24]:<24} {c.chunks:>6} {c.tokens:>8} {c.tokens // max(c.chunks, 1):>7} "
+                f"{c.to_embed:>6} {c.embed_tokens:>9} {c.bytes / 1e6:>6.2f}"
+            )
+
+        t = self.total
+        diff = (
+            f"{t.new} new, {t.modified} modified, {t.unchanged} unchanged, {t.deleted} deleted"
+            if self.diffed else "no stored hashes; every chunk counted as new"
+        )
+        lines += [
+            "",
+            f"{len(self.by_program)} sources: {t.chunks} chunks, {t.tokens} tokens, "
+            f"{t.duplicates} near-duplicates collapsed",
+            f"Diff: {diff}",
+            f"Embedding: {t.requests} API calls, {t.api_tokens} tokens "
+            f"({t.cached} chunks from cache), ~${self.cost:.4f}",
+            f"Index: {t.stored} -> {t.chunks} chunks ({t.growth:+d}), ~{t.bytes / 1e6:.1f} MB for these sources",
+        ]
+        return "\n".join(lines)
+
+
+def _document_bytes(doc: dict, dimensions: int) -> int:
+    """Approximate stored size of a chunk: vector, text and metadata."""
+    return (
+        dimensions * _BYTES_PER_DIMENSION
+        + len(doc["content"].encode("utf-8"))
+        + len(json.dumps(doc["metadata"], ensure_ascii=False).encode("utf-8"))
+    )
+
+
+def plan_ingestion(
+    sources: Iterable[IngestionSource],
+    client=None,
+    dedup: bool | None = None,
+) -> IngestionPlan:
+    """Plan an ingestion run without embedding or writing anything.
+
+    Args:
+        sources: Sources as they would be passed to IngestionPipeline.run()
+        client: Supabase client to diff scoped sources against stored
+            chunk hashes; None (or a table without chunk keys) plans a
+            full ingest
+        dedup: Collapse near-duplicates (default from settings)
+
+    Returns:
+        IngestionPlan with per-programme and per-doc-type counts
+    """
+    settings = get_settings()
+    if dedup is None:
+        dedup = settings.dedup_enabled
+
+    pending = [
+        (source.label, source.scope, prepare_documents(source.texts, source.metadatas))
+        for source in sources
+    ]
+    removed = [0] * len(pending)
+    if dedup and pending:
+        kept, removed = collapse_duplicates([documents for _, _, documents in pending])
+        pending = [(label, scope, documents) for (label, scope, _), documents in zip(pending, kept)]
+
+    plan = IngestionPlan(diffed=client is not None)
+    ingested = {scope.get("program") for _, scope, _ in pending if scope}
+    for (label, scope, documents), duplicates in zip(pending, removed):
+        stored_rows: list[dict] = []
+        if plan.diffed and scope is not None:
+            try:
+                if dedup and scope.get("program"):
+                    # As in the pipeline: chunks already shared from outside the run are skipped
+                    documents, covered = drop_covered_chunks(
+                        documents, fetch_shared_chunks(client, scope["program"]), ingested
+                    )
+                    duplicates += covered
+                stored_rows = fetch_stored_chunks(client, scope)
+            except Exception as e:
+                logger.warning("Cannot read stored chunk hashes, planning a full ingest: %s", e)
+                plan.diffed = False
+        if stored_rows:
+            # As in the pipeline: without dedup only this source's programme is re-decided
+            documents = merge_stored_programs(
+                documents, stored_rows, ingested if dedup else {scope.get("program")}
+            )
+        stored = {row["chunk_key"]: row.get("content_hash") for row in stored_rows if row.get("chunk_key")}
+        current_keys = {doc["chunk_key"] for doc in documents}
+
+        counts = plan.by_program.setdefault(label, PlanCounts())
+        counts.duplicates += duplicates
+        counts.stored += len(stored_rows)
+        counts.deleted += sum(1 for row in stored_rows if row.get("chunk_key") not in current_keys)
+
+        changed = []
+        for doc in documents:
+            tokens = count_tokens(doc["content"])
+            size = _document_bytes(doc, settings.embedding_dimensions)
+            status = (
+                "new" if doc["chunk_key"] not in stored
+                else "unchanged" if stored[doc["chunk_key"]] == doc["content_hash"]
+                else "modified"
+            )
+
+            key = (label, doc["metadata"].get("type", "unknown"))
+            for c in (counts, plan.by_type.setdefault(key, PlanCounts())):
+                c.chunks += 1
+                c.tokens += tokens
+                c.bytes += size
+                setattr(c, status, getattr(c, status) + 1)
+                if status != "unchanged":
+                    c.embed_tokens += tokens
+            if status != "unchanged":
+                changed.append(doc)
+
+        # Same batching as the pipeline's embed stage
+        for i in range(0, len(changed), settings.ingest_embed_batch_size):
+            batch = changed[i:i + settings.ingest_embed_batch_size]
+            requests, api_tokens, cached = estimate_embedding_requests([doc["content"] for doc in batch])
+            counts.requests += requests
+            counts.api_tokens += api_tokens
+            counts.cached += cached
+
+    return plan
@@ -0,0 +1,107 @@
+"""Route queries to a programme partition by centroid similarity.
+
+Most chat queries are about a single programme. Each programme in the
+registry gets a centroid: the normalized mean of its chunk embeddings in
+the local index. A query embedding that is clearly closest to one
+centroid is searched within that programme's chunks only; ambiguous
+queries keep the global search.
+"""
+
+import logging
+
+import numpy as np
+
+from app.config import get_settings
+from app.rag.local_index import LocalVectorIndex
+from app.scrapers.programme_registry import NBS_PROGRAMME_REGISTRY
+
+logger = logging.getLogger(__name__)
+
+
+class ProgrammeRouter:
+    """Nearest-centroid classifier over programme partitions."""
+
+    def __init__(self, names: list[str], centroids: np.ndarray):
+        self.names = names
+        self.centroids = centroids
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @classmethod
+    def from_index(cls, index: LocalVectorIndex) -> "ProgrammeRouter":
+        """Compute one centroid per registry programme that has chunks in the index."""
+        names: list[str] = []
+        rows: list[np.ndarray] = []
+        for entry in NBS_PROGRAMME_REGISTRY:
+            mask = index.filter_mask({"program": entry.name})
+            if not mask.any():
+                continue
+            centroid = np.asarray(index.embeddings[mask].mean(axis=0), dtype=np.float32)
+            norm = np.linalg.norm(centroid)
+            if norm == 0:
+                continue
+            names.append(entry.name)
+            rows.append(centroid / norm)
+
+        if rows:
+            centroids = np.vstack(rows)
+        else:
+            centroids = np.zeros((0, index.embeddings.shape[1]), dtype=np.float32)
+        return cls(names, centroids)
+
+    def scores(self, query_embedding: list[float]) -> np.ndarray:
+        """Cosine similarity of the query to every programme centroid."""
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0 or not len(self.names):
+            return np.zeros(len(self.names), dtype=np.float32)
+        return self.centroids @ (query / norm)
+
+    def route(
+        self,
+        query_embedding: list[float],
+        min_similarity: float | None = None,
+        margin: float | None = None,
+    ) -> str | None:
+        """Pick the programme a query is about, if the match is confident.
+
+        Args:
+            query_embedding: Query vector
+            min_similarity: Minimum similarity to the best centroid (default from settings)
+            margin: Minimum lead of the best centroid over the runner-up (default from settings)
+
+        Returns:
+            Canonical programme name, or None to search globally
+        """
+        settings = get_settings()
+        if min_similarity is None:
+            min_similarity = settings.programme_router_min_similarity
+        if margin is None:
+            margin = settings.programme_router_margin
+
+        scores = self.scores(query_embedding)
+        if not len(scores):
+            return None
+
+        order = np.argsort(-scores)
+        best = float(scores[order[0]])
+        runner_up = float(scores[order[1]]) if len(order) > 1 else -1.0
+        if best < min_similarity or best - runner_up < margin:
+            return None
+        return self.names[order[0]]
+
+
+_router_cache: tuple[object, ProgrammeRouter] | None = None
+
+
+def get_programme_router(index: LocalVectorIndex | None) -> ProgrammeRouter | None:
+    """Get the router for a local index, building it once; None if disabled or no index."""
+    global _router_cache
+    if index is None or not get_settings().programme_router_enabled:
+        return None
+    if _router_cache is None or _router_cache[0] is not index:
+        router = ProgrammeRouter.from_index(index)
+        logger.info("Built programme router with %d centroids", len(router))
+        _router_cache = (index, router)
+    return _router_cache[1]
@@ -0,0 +1,172 @@
+"""Two-tier cache for retrieval results.
+
+Prospective students ask the same questions over and over ("MBA fees",
+"GMAT waiver"). Tier one is keyed by the normalized query string and
+skips both the query embedding and the search. Tier two compares a new
+query's embedding against cached ones and reuses results above a cosine
+threshold, so paraphrases ("fees for the MBA") skip the search too.
+
+Both tiers are LRU with a TTL. Results are keyed by the version of the
+corpus they were searched in (see retriever._corpus_version), so a
+re-ingest is never answered from results cached before it, and the whole
+cache is dropped when a new local index is loaded.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any
+
+import numpy as np
+
+from app.config import get_settings
+
+
+def normalize_query(query: str) -> str:
+    """Normalize a query for exact-match lookups (case, spacing, punctuation)."""
+    query = re.sub(r"\s+", " ", query.lower()).strip()
+    return query.strip(" ?!.,;:")
+
+
+def _params_key(params: dict[str, Any]) -> tuple:
+    """Hashable key for the search parameters that affect results."""
+    return tuple(sorted(
+        (k, tuple(sorted(v.items())) if isinstance(v, dict) else v)
+        for k, v in params.items()
+    ))
+
+
+class RetrievalCache:
+    """LRU + TTL cache with exact-query and similar-embedding lookups."""
+
+    def __init__(
+        self,
+        max_entries: int = 512,
+        ttl_seconds: float = 600.0,
+        similarity_threshold: float = 0.97,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._lock = threading.Lock()
+        # (normalized query, params) -> (expires_at, results)
+        self._exact: OrderedDict[tuple, tuple[float, list[dict]]] = OrderedDict()
+        # (normalized query, params) -> (expires_at, params key, unit embedding, results)
+        self._semantic: OrderedDict[tuple, tuple[float, tuple, np.ndarray, list[dict]]] = OrderedDict()
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, query: str, params: dict[str, Any]) -> list[dict] | None:
+        """Tier one: look up results for the same normalized query and parameters."""
+        key = (normalize_query(query), _params_key(params))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._exact.get(key)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    del self._exact[key]
+                return None
+            self._exact.move_to_end(key)
+            self.exact_hits += 1
+            return [dict(doc) for doc in entry[1]]
+
+    def get_similar(self, embedding: list[float], params: dict[str, Any]) -> list[dict] | None:
+        """Tier two: look up results for a near-identical query embedding.
+
+        Only entries searched with the same parameters are considered. Counts
+        a miss when nothing qualifies, so call it after get().
+        """
+        pkey = _params_key(params)
+        query = _unit(embedding)
+        now = time.monotonic()
+        with self._lock:
+            best_key, best_sim = None, self.similarity_threshold
+            for key, (expires_at, entry_pkey, vector, _) in list(self._semantic.items()):
+                if expires_at < now:
+                    del self._semantic[key]
+                    continue
+                if entry_pkey != pkey:
+                    continue
+                sim = float(vector @ query)
+                if sim >= best_sim:
+                    best_key, best_sim = key, sim
+
+            if best_key is None:
+                self.misses += 1
+                return None
+            self._semantic.move_to_end(best_key)
+            self.semantic_hits += 1
+            return [dict(doc) for doc in self._semantic[best_key][3]]
+
+    def put(
+        self,
+        query: str,
+        embedding: list[float],
+        params: dict[str, Any],
+        results: list[dict],
+    ) -> None:
+        """Store results in both tiers."""
+        pkey = _params_key(params)
+        key = (normalize_query(query), pkey)
+        expires_at = time.monotonic() + self.ttl_seconds
+        stored = [dict(doc) for doc in results]
+        with self._lock:
+            self._exact[key] = (expires_at, stored)
+            self._exact.move_to_end(key)
+            self._semantic[key] = (expires_at, pkey, _unit(embedding), stored)
+            self._semantic.move_to_end(key)
+            while len(self._exact) > self.max_entries:
+                self._exact.popitem(last=False)
+            while len(self._semantic) > self.max_entries:
+                self._semantic.popitem(last=False)
+
+    def invalidate(self) -> None:
+        """Drop every cached result (e.g. after ingestion changes the corpus)."""
+        with self._lock:
+            self._exact.clear()
+            self._semantic.clear()
+            self.invalidations += 1
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and current size."""
+        hits = self.exact_hits + self.semantic_hits
+        total = hits + self.misses
+        return {
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": hits / total if total else 0.0,
+            "entries": len(self._exact),
+            "invalidations": self.invalidations,
+        }
+
+
+def _unit(embedding: list[float]) -> np.ndarray:
+    vector = np.asarray(embedding, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+@lru_cache
+def get_retrieval_cache() -> RetrievalCache | None:
+    """Get the process-wide retrieval cache, or None if disabled."""
+    settings = get_settings()
+    if not settings.retrieval_cache_enabled:
+        return None
+    return RetrievalCache(
+        max_entries=settings.retrieval_cache_max_entries,
+        ttl_seconds=settings.retrieval_cache_ttl_seconds,
+        similarity_threshold=settings.retrieval_cache_similarity_threshold,
+    )
+
+
+def invalidate_retrieval_cache() -> None:
+    """Invalidate the process-wide retrieval cache, if enabled."""
+    cache = get_retrieval_cache()
+    if cache is not None:
+        cache.invalidate()
@@ -1,44 +1,234 @@
-"""Vector similarity retrieval from Supabase pgvector."""
+"""Document retrieval for RAG.
+
+Searches the in-process exact index when one is loaded -- fusing vector
+and BM25 rankings with reciprocal-rank fusion when hybrid search is on --
+and falls back to the Supabase pgvector match_documents RPC otherwise.
+"""
+
+import asyncio
+import logging
 
 from app.config import get_settings
-from app.db.supabase import get_supabase_client
-from app.rag.embeddings import get_embedding
+from app.db.catalog import get_programme_catalog
+from app.db.supabase import get_async_supabase_client
+from app.rag.bm25 import get_lexical_index, reciprocal_rank_fusion
+from app.rag.embeddings import aget_embedding
+from app.rag.local_index import LocalVectorIndex, get_local_index
+from app.rag.programme_router import get_programme_router
+from app.rag.retrieval_cache import get_retrieval_cache
+from app.scrapers.programme_registry import match_programme
+
+logger = logging.getLogger(__name__)
+
+
+def build_metadata_filter(
+    program: str | None = None,
+    doc_type: str | None = None,
+    language: str | None = None,
+) -> dict[str, str]:
+    """Build a metadata filter, resolving loose programme names to canonical ones.
+
+    Unrecognised programme names are dropped rather than filtering everything out.
+    """
+    filters: dict[str, str] = {}
+    if program:
+        entry = match_programme(program)
+        if entry is not None:
+            filters["program"] = entry.name
+        else:
+            logger.debug("Unrecognised programme filter %r ignored", program)
+    if doc_type:
+        filters["type"] = doc_type
+    if language:
+        filters["language"] = language
+    return filters
+
+
+def search_local_index(
+    index: LocalVectorIndex,
+    query: str,
+    query_embedding: list[float],
+    match_count: int,
+    match_threshold: float,
+    filters: dict[str, str],
+    hybrid: bool | None = None,
+) -> list[dict]:
+    """Search the local index, optionally fusing vector and BM25 rankings.
+
+    Args:
+        index: Local vector index to search
+        query: Query text (for the BM25 ranking)
+        query_embedding: Query vector
+        match_count: Number of documents to return
+        match_threshold: Minimum similarity for vector hits
+        filters: Metadata key/value pairs every result must match
+        hybrid: Fuse with BM25 (default settings.hybrid_search_enabled)
+
+    Returns:
+        Documents, best first
+    """
+    settings = get_settings()
+    if hybrid is None:
+        hybrid = settings.hybrid_search_enabled
+    if not hybrid:
+        return index.search(
+            query_embedding, k=match_count, threshold=match_threshold, filters=filters
+        )
+
+    pool = max(match_count, settings.hybrid_candidate_pool)
+    vector_results = index.search(
+        query_embedding, k=pool, threshold=match_threshold, filters=filters
+    )
+
+    # Lexical hits skip the similarity threshold: an exact token match
+    # ("GMAT", "SGD 68,000") is relevant even when the embedding disagrees.
+    similarities = index.similarities(query_embedding)
+    lexical_results = [
+        {**index.documents[i], "similarity": float(similarities[i])}
+        for i, _ in get_lexical_index(index).search(
+            query, k=pool, mask=index.filter_mask(filters) if filters else None
+        )
+    ]
+
+    fused = reciprocal_rank_fusion(
+        [vector_results, lexical_results],
+        weights=[settings.rrf_vector_weight, settings.rrf_lexical_weight],
+        k=settings.rrf_k,
+    )
+    return fused[:match_count]
 
 
 async def retrieve_relevant_documents(
     query: str,
     match_count: int | None = None,
-    match_threshold: float = 0.5
+    match_threshold: float = 0.5,
+    program: str | None = None,
+    doc_type: str | None = None,
+    language: str | None = None,
 ) -> list[dict]:
-    """Retrieve documents relevant to the query using vector similarity.
+    """Retrieve documents relevant to the query.
+
+    Uses hybrid vector + BM25 search over the local index when available,
+    otherwise vector similarity via the match_documents RPC. Metadata
+    filters are applied inside the search, before ranking. Without an
+    explicit programme, queries clearly about one programme are routed to
+    its chunks (see app/rag/programme_router.py). Results are served from
+    the retrieval cache for repeated or near-identical queries.
 
     Args:
         query: User query text
         match_count: Number of documents to retrieve (default from settings)
         match_threshold: Minimum similarity threshold (0-1)
+        program: Only search this programme's documents (loose names like "MSBA" are resolved)
+        doc_type: Only search documents of this metadata type (e.g. "sub_page", "pdf_brochure")
+        language: Only search documents in this language code (e.g. "en")
 
     Returns:
         List of relevant documents with content, metadata, and similarity score
+        (plus rrf_score for hybrid results)
     """
     settings = get_settings()
     if match_count is None:
         match_count = settings.retrieval_k
 
+    filters = build_metadata_filter(program, doc_type, language)
+    params = {
+        "match_count": match_count,
+        "match_threshold": match_threshold,
+        "filters": filters,
+        "corpus": await _corpus_version(),
+    }
+
+    # Tier one: same normalized query -- skips the embedding as well
+    cache = get_retrieval_cache()
+    if cache is not None:
+        cached = cache.get(query, params)
+        if cached is not None:
+            return cached
+
     # Generate query embedding
-    query_embedding = get_embedding(query)
+    query_embedding = await aget_embedding(query)
+
+    # Tier two: near-identical query embedding
+    if cache is not None:
+        cached = cache.get_similar(query_embedding, params)
+        if cached is not None:
+            return cached
+
+    results = await _search(query, query_embedding, match_count, match_threshold, filters)
+
+    if cache is not None:
+        cache.put(query, query_embedding, params, results)
+    return results
+
+
+async def _corpus_version() -> str | None:
+    """Version of the corpus a search would run against.
+
+    The local index's version when one is loaded; otherwise the version
+    stamp bumped by every ingestion run that changes the documents table
+    (read through the programme catalog, which revalidates it on a TTL).
+    """
+    index = get_local_index()
+    if index is not None:
+        return index.version
+    try:
+        return (await get_programme_catalog()).version
+    except Exception as e:
+        logger.debug("No corpus version for the retrieval cache: %s", e)
+        return None
+
 
-    # Search using Supabase RPC function
-    client = get_supabase_client()
-    result = client.rpc(
-        "match_documents",
-        {
-            "query_embedding": query_embedding,
-            "match_count": match_count,
-            "match_threshold": match_threshold
-        }
-    ).execute()
+async def _search(
+    query: str,
+    query_embedding: list[float],
+    match_count: int,
+    match_threshold: float,
+    filters: dict[str, str],
+) -> list[dict]:
+    """Run a search on the local index, or the match_documents RPC as a fallback."""
+    settings = get_settings()
+
+    # Exact in-process search when a local index is available
+    index = get_local_index()
+    if index is not None:
+        try:
+            # Queries clearly about one programme only search its chunks;
+            # too few hits there falls through to the global search.
+            router = get_programme_router(index) if "program" not in filters else None
+            routed = router.route(query_embedding) if router is not None else None
+            if routed is not None:
+                results = search_local_index(
+                    index, query, query_embedding, match_count, match_threshold,
+                    {**filters, "program": routed},
+                )
+                if len(results) >= match_count:
+                    return results
+                logger.debug("Routed search in %s found %d results; searching globally", routed, len(results))
+
+            return search_local_index(
+                index, query, query_embedding, match_count, match_threshold, filters
+            )
+        except Exception as e:
+            logger.warning("Local index search failed, falling back to RPC: %s", e)
 
-    return result.data or []
+    # Search using Supabase RPC function. Unfiltered searches over-fetch
+    # candidates because the approximate index can miss close neighbours,
+    # then keep the top ones. Filters are pushed down as `metadata @> filter`
+    # (see scripts/add_match_documents_filter.sql), which narrows the scan to
+    # a few programme rows ranked exactly, so they ask for match_count.
+    params = {
+        "query_embedding": query_embedding,
+        "match_count": match_count if filters else max(match_count, settings.rpc_candidate_pool),
+        "match_threshold": match_threshold
+    }
+    if filters:
+        params["filter"] = filters
+
+    client = await get_async_supabase_client()
+    result = await client.rpc("match_documents", params).execute()
+
+    return (result.data or [])[:match_count]
 
 
 async def retrieve_program_documents(
@@ -55,22 +245,52 @@ async def retrieve_program_documents(
         List of relevant documents about the program
     """
     query = f"Information about {program_name} program at NBS Nanyang Business School"
-    return await retrieve_relevant_documents(query, match_count=match_count)
+    return await retrieve_relevant_documents(query, match_count=match_count, program=program_name)
 
 
 async def retrieve_comparison_documents(
     programs: list[str],
-    match_count: int = 8
+    per_program_count: int = 2
 ) -> list[dict]:
     """Retrieve documents for comparing multiple programs.
 
+    Runs one programme-filtered search per programme concurrently, so no
+    single programme crowds the others out and wall-clock time stays at
+    about one search however many programmes are compared.
+
     Args:
         programs: List of program names to compare
-        match_count: Total number of documents to retrieve
+        per_program_count: Number of documents to retrieve for each program
 
     Returns:
-        List of relevant documents about the programs
+        Documents grouped by program, in the order the programs were given.
+        Names the programme registry cannot resolve get no documents, since
+        an unfiltered search would fill their share with other programmes'.
     """
-    program_list = ", ".join(programs)
-    query = f"Compare {program_list} programs at NBS: requirements, curriculum, career outcomes"
-    return await retrieve_relevant_documents(query, match_count=match_count)
+    resolved = []
+    for program in programs:
+        entry = match_programme(program)
+        if entry is None:
+            logger.info("Unrecognised programme %r left out of the comparison context", program)
+        else:
+            resolved.append(entry.name)
+
+    queries = [
+        f"{program} programme at NBS: requirements, curriculum, career outcomes"
+        for program in resolved
+    ]
+    per_program_results = await asyncio.gather(*(
+        retrieve_relevant_documents(query, match_count=per_program_count, program=program)
+        for query, program in zip(queries, resolved)
+    ))
+
+    # Merge in the given programme order, skipping documents already taken
+    merged: list[dict] = []
+    seen: set[str] = set()
+    for results in per_program_results:
+        for doc in results:
+            key = str(doc.get("id") or doc.get("content"))
+            if key not in seen:
+                seen.add(key)
+                merged.append(doc)
+    return merged
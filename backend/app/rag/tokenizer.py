@@ -0,0 +1,66 @@
+"""Local token counting for embedding and prompt budgets.
+
+Uses tiktoken's cl100k_base encoding (shared by text-embedding-3-* models)
+when it is available, and falls back to a conservative character-based
+estimate otherwise (e.g. when the encoding file cannot be downloaded).
+"""
+
+import logging
+import math
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+_ENCODING_NAME = "cl100k_base"
+
+# Fallback estimate; deliberately low so we over-count rather than
+# overflow a request limit.
+_CHARS_PER_TOKEN = 3
+
+
+@lru_cache
+def _get_encoding():
+    """Load the tiktoken encoding once, or None if unavailable."""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(_ENCODING_NAME)
+    except Exception as e:
+        logger.warning("tiktoken unavailable, estimating tokens from length: %s", e)
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens in a text.
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Number of tokens (estimated if tiktoken is unavailable)
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        return math.ceil(len(text) / _CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Truncate a text to at most ``max_tokens`` tokens.
+
+    Args:
+        text: Text to truncate
+        max_tokens: Maximum number of tokens to keep
+
+    Returns:
+        The text, cut down to the token limit if it was longer
+    """
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[:max_tokens * _CHARS_PER_TOKEN]
+
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
@@ -3,9 +3,11 @@
 from .deep_scraper import NBSDeepScraper, ScrapedPage, ScrapedProgramme
 from .programme_registry import (
     ProgrammeEntry,
+    degree_type_for,
     get_registry,
     get_registry_by_category,
     get_registry_by_slug,
+    match_programme,
 )
 
 # Legacy scraper still available for backward compatibility
@@ -16,9 +18,11 @@ __all__ = [
     "ScrapedPage",
     "ScrapedProgramme",
     "ProgrammeEntry",
+    "degree_type_for",
     "get_registry",
     "get_registry_by_category",
     "get_registry_by_slug",
+    "match_programme",
     # Legacy
     "NBSScraper",
     "scrape_nbs_programs",
@@ -6,6 +6,7 @@ in the registry, with rate limiting, retries, and error isolation.
 
 import logging
 import time
+from collections.abc import Iterator
 from dataclasses import dataclass, field
 from urllib.parse import urlparse
 
@@ -314,36 +315,49 @@ class NBSDeepScraper:
 
         return result
 
-    def scrape_all(
+    def iter_scrape(
         self, registry: list[ProgrammeEntry]
-    ) -> list[ScrapedProgramme]:
-        """Iterate all programmes with progress reporting.
+    ) -> Iterator[ScrapedProgramme]:
+        """Scrape programmes one at a time with progress reporting.
 
-        Individual programme failures are logged and skipped.
+        Each programme is yielded as soon as it finishes, so callers can
+        write or ingest it before the next one is fetched. Individual
+        programme failures are logged and skipped.
 
         Args:
             registry: List of programme entries to scrape
 
-        Returns:
-            List of ScrapedProgramme results
+        Yields:
+            ScrapedProgramme results in registry order
         """
-        results: list[ScrapedProgramme] = []
         total = len(registry)
 
         for i, entry in enumerate(registry, 1):
             print(f"[{i}/{total}] Scraping {entry.name}...")
             try:
                 programme = self.scrape_programme(entry)
-                results.append(programme)
-
-                # Progress summary
-                n_sub = len(programme.sub_pages)
-                n_pdf = len(programme.pdf_contents)
-                status = "OK" if programme.landing_page and not programme.landing_page.error else "FAILED"
-                print(f"  -> {status} | {n_sub} sub-pages | {n_pdf} PDFs")
-
             except Exception as e:
                 logger.error("Unexpected error scraping %s: %s", entry.name, e, exc_info=True)
                 print(f"  -> ERROR: {e}")
+                continue
+
+            # Progress summary
+            n_sub = len(programme.sub_pages)
+            n_pdf = len(programme.pdf_contents)
+            status = "OK" if programme.landing_page and not programme.landing_page.error else "FAILED"
+            print(f"  -> {status} | {n_sub} sub-pages | {n_pdf} PDFs")
 
-        return results
+            yield programme
+
+    def scrape_all(
+        self, registry: list[ProgrammeEntry]
+    ) -> list[ScrapedProgramme]:
+        """Scrape every programme and collect the results.
+
+        Args:
+            registry: List of programme entries to scrape
+
+        Returns:
+            List of ScrapedProgramme results
+        """
+        return list(self.iter_scrape(registry))
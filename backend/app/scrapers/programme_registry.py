@@ -5,6 +5,7 @@ Auto-discovery from index pages is unreliable (JS-rendered cards),
 so we curate the list but make it easy to update.
 """
 
+import re
 from dataclasses import dataclass, field
 
 
@@ -19,6 +20,7 @@ class ProgrammeEntry:
     is_external: bool = False
     language: str = "en"
     sub_page_suffixes: list[str] = field(default_factory=list)
+    aliases: list[str] = field(default_factory=list)  # Short names users type, e.g. "MSBA"
 
 
 # Standard sub-page suffixes found on most NTU-hosted programme pages
@@ -48,6 +50,7 @@ NBS_PROGRAMME_REGISTRY: list[ProgrammeEntry] = [
         category="mba",
         landing_url="https://www.ntu.edu.sg/business/admissions/graduate-studies/nanyang-mba",
         sub_page_suffixes=DEFAULT_SUB_PAGES,
+        aliases=["MBA", "NMBA", "full-time MBA"],
     ),
     ProgrammeEntry(
         name="Nanyang Fellows MBA",
@@ -55,6 +58,7 @@ NBS_PROGRAMME_REGISTRY: list[ProgrammeEntry] = [
         category="mba",
         landing_url="https://www.ntu.edu.sg/business/admissions/graduate-studies/nanyang-fellows-mba/home",
         sub_page_suffixes=DEFAULT_SUB_PAGES,
+        aliases=["Fellows MBA", "NFMBA", "FMBA"],
     ),
     ProgrammeEntry(
         name="Nanyang Executive MBA",
@@ -62,6 +66,7 @@ NBS_PROGRAMME_REGISTRY: list[ProgrammeEntry] = [
         category="executive",
         landing_url="https://www.ntu.edu.sg/business/admissions/graduate-studies/nanyang-executive-mba",
         sub_page_suffixes=DEFAULT_SUB_PAGES,
+        aliases=["Executive MBA", "EMBA", "NEMBA"],
     ),
     ProgrammeEntry(
         name="Nanyang Professional MBA",
@@ -69,6 +74,7 @@ NBS_PROGRAMME_REGISTRY: list[ProgrammeEntry] = [
         category="mba",
         landing_url="https://www.ntu.edu.sg/business/admissions/graduate-studies/nanyang-professional-mba/home",
         sub_page_suffixes=DEFAULT_SUB_PAGES,
+        aliases=["Professional MBA", "PMBA", "NPMBA", "part-time MBA"],
     ),
 
     # ── Specialized Masters Track (7 programmes) ─────────────────────
@@ -78,6 +84,7 @@ NBS_PROGRAMME_REGISTRY: list[ProgrammeEntry] = [
         category="msc",
         landing_url="https://www.ntu.edu.sg/business/admissions/graduate-studies/msc-business-analytics",
         sub_page_suffixes=DEFAULT_SUB_PAGES,
+        aliases=["MSBA", "Business Analytics"],
     ),
     ProgrammeEntry(
         name="MSc Finance",
@@ -85,6 +92,7 @@ NBS_PROGRAMME_REGISTRY: list[ProgrammeEntry] = [
         category="msc",
         landing_url="https://ntu.sg/nbs-msf",
         sub_page_suffixes=DEFAULT_SUB_PAGES,
+        aliases=["MSF", "MSc Fin"],
     ),
     ProgrammeEntry(
         name="MSc Financial Engineering",
@@ -92,6 +100,7 @@ NBS_PROGRAMME_REGISTRY: list[ProgrammeEntry] = [
         category="msc",
         landing_url="https://www.ntu.edu.sg/business/admissions/graduate-studies/msc-financial-engineering/home",
         sub_page_suffixes=DEFAULT_SUB_PAGES,
+        aliases=["MFE", "MSFE", "Financial Engineering"],
     ),
     ProgrammeEntry(
         name="MSc Marketing Science",
@@ -99,6 +108,7 @@ NBS_PROGRAMME_REGISTRY: list[ProgrammeEntry] = [
         category="msc",
         landing_url="https://www.ntu.edu.sg/business/admissions/graduate-studies/msc-marketing-science/home",
         sub_page_suffixes=DEFAULT_SUB_PAGES,
+        aliases=["MSMS", "Marketing Science"],
     ),
     ProgrammeEntry(
         name="MSc Actuarial and Risk Analytics",
@@ -106,6 +116,7 @@ NBS_PROGRAMME_REGISTRY: list[ProgrammeEntry] = [
         category="msc",
         landing_url="https://ntu.sg/nbs-mara",
         sub_page_suffixes=DEFAULT_SUB_PAGES,
+        aliases=["MARA", "MSARA", "Actuarial and Risk Analytics", "Actuarial & Risk Analytics"],
     ),
     ProgrammeEntry(
         name="MSc Accountancy",
@@ -113,6 +124,7 @@ NBS_PROGRAMME_REGISTRY: list[ProgrammeEntry] = [
         category="msc",
         landing_url="https://www.ntu.edu.sg/business/admissions/graduate-studies/msc-accountancy/home",
         sub_page_suffixes=DEFAULT_SUB_PAGES,
+        aliases=["MSAcc", "MAcc", "Accountancy"],
     ),
     ProgrammeEntry(
         name="Master in Management",
@@ -120,6 +132,7 @@ NBS_PROGRAMME_REGISTRY: list[ProgrammeEntry] = [
         category="msc",
         landing_url="https://ntu.sg/nbs-mim",
         sub_page_suffixes=DEFAULT_SUB_PAGES,
+        aliases=["MiM", "Master of Management"],
     ),
 ]
 
@@ -140,3 +153,66 @@ def get_registry_by_slug(slug: str) -> ProgrammeEntry | None:
         if p.slug == slug:
             return p
     return None
+
+
+def degree_type_for(entry: ProgrammeEntry) -> str:
+    """Derive the degree type (MBA, EMBA, MSc, ...) from a programme's name and category."""
+    name_upper = entry.name.upper()
+    if entry.category == "phd":
+        return "PhD"
+    if entry.category == "undergraduate":
+        return "Bachelor"
+    if "EMBA" in name_upper or "EXECUTIVE MBA" in name_upper:
+        return "EMBA"
+    if "MBA" in name_upper:
+        return "MBA"
+    if "MSC" in name_upper or "MASTER" in name_upper:
+        return "MSc"
+    return "Other"
+
+
+def _normalize_name(name: str) -> str:
+    name = name.lower().replace("&", " and ")
+    return re.sub(r"[^a-z0-9]+", " ", name).strip()
+
+
+def match_programme(name: str) -> ProgrammeEntry | None:
+    """Resolve a user-supplied programme name to a registry entry.
+
+    Tries, in order: exact name/slug/alias match (case-insensitive); the
+    programme with the longest name or alias appearing as whole words in the
+    text ("Executive MBA (English)" -> Nanyang Executive MBA); then a unique
+    programme whose name contains the text ("actuarial").
+
+    Args:
+        name: Programme name as typed by a user or the agent, e.g. "msba"
+
+    Returns:
+        The matching ProgrammeEntry, or None if absent or ambiguous
+    """
+    wanted = _normalize_name(name)
+    if not wanted:
+        return None
+
+    names = {
+        p.slug: [_normalize_name(c) for c in (p.name, p.slug, *p.aliases)]
+        for p in NBS_PROGRAMME_REGISTRY
+    }
+
+    for p in NBS_PROGRAMME_REGISTRY:
+        if wanted in names[p.slug]:
+            return p
+
+    best: list[tuple[int, ProgrammeEntry]] = []
+    for p in NBS_PROGRAMME_REGISTRY:
+        contained = [len(c) for c in names[p.slug] if f" {c} " in f" {wanted} "]
+        if contained:
+            best.append((max(contained), p))
+    if best:
+        best.sort(key=lambda item: item[0], reverse=True)
+        if len(best) == 1 or best[0][0] > best[1][0]:
+            return best[0][1]
+        return None
+
+    partial = [p for p in NBS_PROGRAMME_REGISTRY if wanted in _normalize_name(p.name)]
+    return partial[0] if len(partial) == 1 else None
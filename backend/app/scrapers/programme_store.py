@@ -0,0 +1,163 @@
+"""Streaming storage for scraped programme data.
+
+Scraped programmes are stored as JSON Lines (one programme per line) so
+the scraper can append each programme as it finishes and ingestion can
+parse them one at a time; memory stays flat however large the crawl gets.
+Legacy combined files (a single JSON array) are still read, element by
+element, without loading the whole array.
+"""
+
+import json
+import logging
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+JSONL_SUFFIX = ".jsonl"
+
+# Bytes read per step when streaming a JSON array
+_READ_SIZE = 1 << 16
+
+_DECODER = json.JSONDecoder()
+
+
+def _iter_json_lines(f) -> Iterator[dict]:
+    for line_number, line in enumerate(f, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            # A crawl interrupted mid-write leaves a truncated last line
+            logger.warning("Skipping malformed line %d: %s", line_number, e)
+
+
+def _iter_json_array(f) -> Iterator[dict]:
+    buffer = ""
+    pos = 0
+    started = False
+    eof = False
+    read_size = _READ_SIZE
+
+    while True:
+        # Skip whitespace and separators up to the next element
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+        if pos < len(buffer) and not started:
+            if buffer[pos] != "[":
+                raise ValueError("Expected a JSON array of programmes")
+            started = True
+            pos += 1
+            continue
+        if pos < len(buffer) and buffer[pos] == "]":
+            return
+
+        incomplete = False
+        if pos < len(buffer):
+            try:
+                element, end = _DECODER.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                incomplete = True
+            else:
+                yield element
+                # Keep only unparsed text, so nothing is scanned twice
+                buffer = buffer[end:]
+                pos = 0
+                read_size = _READ_SIZE
+                continue
+
+        # Need more input: drop consumed text and read the next block
+        if eof:
+            return
+        buffer = buffer[pos:]
+        pos = 0
+        if incomplete:
+            # An element spanning several blocks is re-parsed on each read;
+            # doubling the read keeps that linear in the element's size
+            read_size *= 2
+        block = f.read(read_size)
+        eof = not block
+        buffer += block
+
+
+def iter_programmes(path: str | Path) -> Iterator[dict]:
+    """Yield programme dicts from a JSON Lines or JSON array file, one at a time.
+
+    Args:
+        path: Path to a .jsonl file, or a .json file holding a list
+
+    Yields:
+        Programme dicts in file order
+    """
+    path = Path(path)
+    with open(path, "r", encoding="utf-8") as f:
+        if path.suffix == JSONL_SUFFIX:
+            yield from _iter_json_lines(f)
+        else:
+            yield from _iter_json_array(f)
+
+
+def find_programmes_file(directory: str | Path, stem: str) -> Path | None:
+    """Locate a programmes file, preferring JSON Lines over a JSON array.
+
+    Args:
+        directory: Directory to look in
+        stem: File name without suffix, e.g. "all_programs_deep"
+
+    Returns:
+        Path to the file, or None if neither format exists
+    """
+    for suffix in (JSONL_SUFFIX, ".json"):
+        path = Path(directory) / f"{stem}{suffix}"
+        if path.exists():
+            return path
+    return None
+
+
+class ProgrammeWriter:
+    """Append programmes to a JSON Lines file as they are produced.
+
+    Each programme is flushed as soon as it is written, so an interrupted
+    crawl keeps every programme that finished.
+
+    Usage:
+        with ProgrammeWriter(path) as writer:
+            for programme in programmes:
+                writer.write(programme)
+    """
+
+    def __init__(self, path: str | Path, append: bool = False):
+        self.path = Path(path)
+        self.count = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a" if append else "w", encoding="utf-8")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self._file.close()
+
+    def write(self, programme: dict):
+        self._file.write(json.dumps(programme, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self.count += 1
+
+
+def write_programmes(path: str | Path, programmes: Iterable[dict]) -> int:
+    """Write programmes to a JSON Lines file, consuming the iterable lazily.
+
+    Returns:
+        Number of programmes written
+    """
+    with ProgrammeWriter(path) as writer:
+        for programme in programmes:
+            writer.write(programme)
+    return writer.count
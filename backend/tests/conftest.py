@@ -0,0 +1,7 @@
+"""Shared test setup: settings that let app modules load without a real backend."""
+
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("SUPABASE_URL", "https://test.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "test")
@@ -0,0 +1,201 @@
+"""Tests for the write-behind chat history buffer."""
+
+import asyncio
+
+import httpx
+from postgrest.exceptions import APIError
+
+from app.config import get_settings
+from app.db import chat_buffer
+from app.db.chat_buffer import ChatHistoryBuffer, load_chat_history
+from app.db.conversation_cache import ConversationCache
+
+
+class _Insert:
+    def __init__(self, client, rows):
+        self.client = client
+        self.rows = rows if isinstance(rows, list) else [rows]
+
+    async def execute(self):
+        return await self.client.insert(self.rows)
+
+
+class _Table:
+    def __init__(self, client):
+        self.client = client
+
+    def insert(self, rows):
+        return _Insert(self.client, rows)
+
+
+class FakeClient:
+    """Records inserted rows; ``fail`` decides the error (if any) for each insert."""
+
+    def __init__(self, fail=None):
+        self.fail = fail or (lambda rows: None)
+        self.calls = 0
+        self.stored: list[dict] = []
+
+    def table(self, name):
+        return _Table(self)
+
+    async def insert(self, rows):
+        self.calls += 1
+        error = self.fail(rows)
+        if error is not None:
+            raise error
+        self.stored.extend(rows)
+
+
+def _use_client(monkeypatch, client):
+    async def get_client():
+        return client
+
+    monkeypatch.setattr(chat_buffer, "get_async_supabase_client", get_client)
+
+
+def _buffer(**kwargs) -> ChatHistoryBuffer:
+    options = {"flush_interval_seconds": 3600, "max_batch": 100, "max_pending": 100, "max_attempts": 3}
+    options.update(kwargs)
+    buffer = ChatHistoryBuffer(**options)
+    buffer._closed = True  # No background task; the tests flush explicitly
+    return buffer
+
+
+def test_network_outage_keeps_messages(monkeypatch):
+    outage = {"left": 10}
+
+    def fail(rows):
+        if outage["left"]:
+            outage["left"] -= 1
+            return httpx.ConnectError("connection refused")
+
+    client = FakeClient(fail)
+    _use_client(monkeypatch, client)
+
+    async def run():
+        buffer = _buffer()
+        buffer.add("c1", "user", "hello")
+        buffer.add("c1", "assistant", "hi")
+        for _ in range(10):
+            try:
+                await buffer.flush()
+            except httpx.ConnectError:
+                pass
+            else:
+                raise AssertionError("flush succeeded during the outage")
+        assert await buffer.flush() == 2
+        return buffer.stats()
+
+    stats = asyncio.run(run())
+    assert stats["dropped"] == 0 and stats["flushed"] == 2 and stats["pending"] == 0
+    assert [row["content"] for row in client.stored] == ["hello", "hi"]
+
+
+def test_server_errors_are_retried_not_dropped(monkeypatch):
+    client = FakeClient(lambda rows: APIError({"message": "Bad gateway", "code": 502}))
+    _use_client(monkeypatch, client)
+
+    async def run():
+        buffer = _buffer()
+        buffer.add("c1", "user", "hello")
+        for _ in range(5):
+            try:
+                await buffer.flush()
+            except APIError:
+                pass
+        return buffer.stats()
+
+    stats = asyncio.run(run())
+    assert stats["dropped"] == 0 and stats["pending"] == 1
+    assert client.calls == 5  # Never fell back to row-by-row writes
+
+
+def test_rejected_row_is_dropped_after_max_attempts(monkeypatch):
+    def fail(rows):
+        if any(row["content"] == "bad" for row in rows):
+            return APIError({"message": "invalid input syntax", "code": "22P02"})
+
+    client = FakeClient(fail)
+    _use_client(monkeypatch, client)
+
+    async def run():
+        buffer = _buffer(max_attempts=2)
+        buffer.add("c1", "user", "good")
+        buffer.add("c2", "user", "bad")
+        buffer.add("c3", "user", "also good")
+        try:
+            await buffer.flush()
+        except APIError:
+            pass
+        else:
+            raise AssertionError("the first rejection should be retried")
+        assert await buffer.flush() == 2
+        return buffer.stats()
+
+    stats = asyncio.run(run())
+    assert stats["dropped"] == 1 and stats["flushed"] == 2 and stats["pending"] == 0
+    assert [row["content"] for row in client.stored] == ["good", "also good"]
+
+
+def test_eviction_during_flush_keeps_unflushed_rows(monkeypatch):
+    async def run():
+        buffer = _buffer(max_batch=2, max_pending=3)
+        first = [buffer.add("c1", "user", f"m{i}") for i in range(2)]
+        in_insert = asyncio.Event()
+        release = asyncio.Event()
+
+        class SlowClient(FakeClient):
+            async def insert(self, rows):
+                in_insert.set()
+                await release.wait()
+                await super().insert(rows)
+
+        client = SlowClient()
+        _use_client(monkeypatch, client)
+
+        flush = asyncio.create_task(buffer.flush())
+        await in_insert.wait()
+        # Two more messages push the queue past max_pending: the oldest is evicted
+        later = [buffer.add("c1", "user", f"m{i}") for i in range(2, 4)]
+        release.set()
+        await flush
+        return first, later, buffer, client
+
+    first, later, buffer, client = asyncio.run(run())
+    assert [row["content"] for row in client.stored] == ["m0", "m1", "m2", "m3"]
+    assert buffer.pending("c1") == []
+    assert {row["id"] for row in client.stored} == {row["id"] for row in first + later}
+
+
+def _cached_history(monkeypatch, **settings) -> list:
+    """Load a cached conversation's history; returns the database reads it made."""
+    reads = []
+
+    async def get_chat_history(conversation_id, limit=10, after=None):
+        reads.append(after)
+        return []
+
+    cache = ConversationCache()
+    cache.put("c1", [{"id": "1", "role": "user", "content": "hello", "created_at": "2026-01-01T00:00:00"}], True)
+    monkeypatch.setattr(chat_buffer, "get_conversation_cache", lambda: cache)
+    monkeypatch.setattr(chat_buffer, "get_chat_history", get_chat_history)
+    monkeypatch.setattr(chat_buffer, "get_settings", lambda: get_settings().model_copy(update=settings))
+
+    history = asyncio.run(load_chat_history("c1"))
+    assert [row["content"] for row in history] == ["hello"]
+    return reads
+
+
+def test_cache_hit_makes_no_database_call_on_a_single_instance(monkeypatch):
+    reads = _cached_history(monkeypatch, vercel=False, conversation_cache_multi_instance=False)
+    assert reads == []
+
+
+def test_cache_hit_probes_for_newer_rows_with_several_instances(monkeypatch):
+    assert _cached_history(monkeypatch, vercel=False, conversation_cache_multi_instance=True) == [
+        "2026-01-01T00:00:00"
+    ]
+    assert _cached_history(monkeypatch, vercel=True, conversation_cache_multi_instance=False) == [
+        "2026-01-01T00:00:00"
+    ]
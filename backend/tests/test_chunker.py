@@ -0,0 +1,42 @@
+"""Tests for the structure-aware chunker."""
+
+from app.rag.chunker import HEADING, iter_blocks, iter_chunks
+
+
+def _assert_every_block_chunked(text: str, chunk_tokens: int, overlap_tokens: int = 0) -> list[str]:
+    chunks = list(iter_chunks(text, chunk_tokens, overlap_tokens))
+    chunked_lines = {line for chunk in chunks for line in chunk.split("\n")}
+    missing = [block for _, block in iter_blocks(text) if block not in chunked_lines]
+    assert not missing, f"{len(missing)} blocks missing from chunks, e.g. {missing[:3]}"
+    return chunks
+
+
+def test_course_list_of_heading_lines_is_chunked():
+    courses = [f"Course Module {i} Assurance and Auditing" for i in range(300)]
+    assert all(kind == HEADING for kind, _ in iter_blocks("\n".join(courses)))
+
+    chunks = _assert_every_block_chunked("\n".join(courses), chunk_tokens=100)
+    assert len(chunks) > 1
+
+
+def test_list_after_paragraph_is_chunked():
+    text = "\n".join(
+        [
+            "Curriculum",
+            "The programme combines core courses with electives in the second semester.",
+            "Core courses",
+            *(f"Tax Management {i}" for i in range(60)),
+            "Electives",
+            "Students choose two electives from the list published each year.",
+        ]
+    )
+    _assert_every_block_chunked(text, chunk_tokens=80, overlap_tokens=20)
+
+
+def test_mixed_document_chunks_every_block():
+    lines = []
+    for section in range(20):
+        lines.append(f"Section {section}")
+        lines.append("A paragraph of prose that runs long enough to take up space. " * 3)
+        lines.append("Fee | 12,000 EUR | per year")
+    _assert_every_block_chunked("\n".join(lines), chunk_tokens=120, overlap_tokens=30)
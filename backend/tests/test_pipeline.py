@@ -0,0 +1,163 @@
+"""Tests for incremental, deduplicated ingestion runs."""
+
+import asyncio
+import uuid
+from types import SimpleNamespace
+
+from app.rag import pipeline
+from app.rag.pipeline import IngestionPipeline, IngestionSource
+
+_BOILERPLATE = [
+    "Nanyang Business School is accredited by both AACSB and EQUIS and is ranked among the "
+    "leading business schools in Asia for research and teaching.",
+    "Applications are reviewed on a rolling basis, so candidates are encouraged to apply early "
+    "and to submit complete transcripts and reference letters with the form.",
+    "Scholarships and financial aid are available to outstanding candidates; details are sent "
+    "with the offer letter and depend on the intake and the programme chosen.",
+]
+
+
+def _contains(value, expected) -> bool:
+    """jsonb @> for the shapes the ingestion code filters on."""
+    if isinstance(expected, dict):
+        return isinstance(value, dict) and all(_contains(value.get(k), v) for k, v in expected.items())
+    if isinstance(expected, list):
+        return isinstance(value, list) and all(item in value for item in expected)
+    return value == expected
+
+
+class _Query:
+    def __init__(self, store):
+        self.store = store
+        self.action = None
+        self.rows = None
+        self.filters = []
+        self.bounds = None
+
+    def select(self, columns):
+        self.action = "select"
+        return self
+
+    def contains(self, column, value):
+        self.filters.append(lambda row: _contains(row[column], value))
+        return self
+
+    def in_(self, column, values):
+        values = set(values)
+        self.filters.append(lambda row: row[column] in values)
+        return self
+
+    def order(self, column):
+        return self
+
+    def range(self, start, end):
+        self.bounds = (start, end + 1)
+        return self
+
+    def upsert(self, rows, on_conflict):
+        self.action, self.rows = "upsert", rows
+        return self
+
+    def delete(self):
+        self.action = "delete"
+        return self
+
+    def execute(self):
+        return SimpleNamespace(data=getattr(self, f"_{self.action}")())
+
+    def _select(self):
+        matched = [row for row in self.store.rows if all(f(row) for f in self.filters)]
+        if self.bounds:
+            matched = matched[slice(*self.bounds)]
+        return [
+            {
+                "id": row["id"],
+                "chunk_key": row["chunk_key"],
+                "content_hash": row["content_hash"],
+                "content": row["content"],
+                "program": row["metadata"].get("program"),
+                "programs": row["metadata"].get("programs"),
+            }
+            for row in matched
+        ]
+
+    def _upsert(self):
+        by_key = {row["chunk_key"]: row for row in self.store.rows}
+        for record in self.rows:
+            if record["chunk_key"] in by_key:
+                by_key[record["chunk_key"]].update(record)
+            else:
+                self.store.rows.append({"id": str(uuid.uuid4()), **record})
+        self.store.upserts += len(self.rows)
+        return self.rows
+
+    def _delete(self):
+        deleted = [row for row in self.store.rows if all(f(row) for f in self.filters)]
+        self.store.rows = [row for row in self.store.rows if row not in deleted]
+        return deleted
+
+
+class FakeStore:
+    """In-memory documents table behind a sync Supabase client."""
+
+    def __init__(self):
+        self.rows: list[dict] = []
+        self.upserts = 0
+
+    def table(self, name):
+        assert name == "documents"
+        return _Query(self)
+
+
+def _source(program: str) -> IngestionSource:
+    own = (
+        f"The {program} curriculum covers topics taught only in {program}, with electives "
+        f"and a capstone project designed around the {program} career outcomes."
+    )
+    texts = [own, *_BOILERPLATE]
+    metadatas = [
+        {"program": program, "type": "sub_page_section", "sub_page": "overview", "section_name": f"s{i}"}
+        for i in range(len(texts))
+    ]
+    return IngestionSource(program, texts, metadatas, {"program": program})
+
+
+def _run(monkeypatch, store: FakeStore, programs: list[str]) -> dict:
+    async def embed(texts):
+        return [[0.0] for _ in texts]
+
+    monkeypatch.setattr(pipeline, "get_supabase_admin_client", lambda: store)
+    monkeypatch.setattr(pipeline, "aget_embeddings_batch", embed)
+    monkeypatch.setattr(pipeline, "bump_catalog_version", lambda client: "test")
+    return asyncio.run(IngestionPipeline(dedup=True).run(_source(p) for p in programs))
+
+
+def test_partial_rerun_does_not_duplicate_shared_chunks(monkeypatch):
+    store = FakeStore()
+    programs = ["MSc Accountancy", "MSc Finance", "MSc Marketing Science"]
+
+    _run(monkeypatch, store, programs)
+    rows_after_full = len(store.rows)
+    # Boilerplate is stored once, shared by every programme
+    assert rows_after_full == len(programs) + len(_BOILERPLATE)
+
+    store.upserts = 0
+    _run(monkeypatch, store, programs)
+    assert store.upserts == 0
+
+    # MSc Finance's boilerplate is stored under MSc Accountancy, the first programme
+    counts = _run(monkeypatch, store, ["MSc Finance"])
+    assert store.upserts == 0
+    assert len(store.rows) == rows_after_full
+    assert counts["MSc Finance"]["duplicates"] == len(_BOILERPLATE)
+
+    _run(monkeypatch, store, ["MSc Accountancy"])
+    assert store.upserts == 0
+    assert len(store.rows) == rows_after_full
+
+    for program in programs:
+        covering = [
+            row for row in store.rows
+            if program in (row["metadata"].get("programs") or [row["metadata"]["program"]])
+        ]
+        assert len(covering) == 1 + len(_BOILERPLATE)
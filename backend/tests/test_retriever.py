@@ -0,0 +1,31 @@
+"""Tests for programme-filtered retrieval."""
+
+import asyncio
+
+from app.rag import retriever
+from app.rag.retriever import build_metadata_filter, retrieve_comparison_documents
+
+
+def test_unknown_programme_is_not_filtered():
+    assert build_metadata_filter(program="PhD") == {}
+    assert build_metadata_filter(program="msf") == {"program": "MSc Finance"}
+
+
+def test_comparison_leaves_unknown_programme_slot_empty(monkeypatch):
+    searches = []
+
+    async def retrieve_relevant_documents(query, match_count=4, program=None):
+        searches.append(program)
+        # An unfiltered search returns whatever ranks best, e.g. MSc Finance chunks
+        name = program or "MSc Finance"
+        return [
+            {"id": f"{name}-{i}", "content": f"{name} chunk {i}", "metadata": {"program": name}}
+            for i in range(match_count)
+        ]
+
+    monkeypatch.setattr(retriever, "retrieve_relevant_documents", retrieve_relevant_documents)
+
+    docs = asyncio.run(retrieve_comparison_documents(["MBA", "PhD"], per_program_count=2))
+
+    assert searches == ["Nanyang MBA"]
+    assert [doc["metadata"]["program"] for doc in docs] == ["Nanyang MBA", "Nanyang MBA"]
@@ -0,0 +1,17 @@
+-- Migration: version stamp for the backend's in-memory programme catalog
+-- Run this in the Supabase SQL Editor on existing deployments.
+-- scrape_and_ingest.py (and seed_profile_scores.py) write a new
+-- catalog_version after changing the programs table; serving processes
+-- compare it on each TTL and reload the catalog only when it changed.
+-- Without this table the catalog reloads programs on every TTL instead.
+
+create table if not exists app_metadata (
+  key text primary key,
+  value text not null,
+  updated_at timestamp with time zone default now()
+);
+
+alter table app_metadata enable row level security;
+
+create policy "Allow read access to app metadata" on app_metadata
+  for select using (true);
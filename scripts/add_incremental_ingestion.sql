@@ -0,0 +1,11 @@
+-- Migration: stable chunk keys and content hashes for incremental ingestion
+-- Run this in the Supabase SQL Editor on existing deployments.
+-- Rows ingested before this migration have no chunk_key; the next sync
+-- re-embeds their programme once and deletes them.
+
+alter table documents add column if not exists chunk_key text;
+alter table documents add column if not exists content_hash text;
+
+-- Upserts conflict on chunk_key (NULLs from older rows don't collide)
+create unique index if not exists documents_chunk_key_idx
+  on documents (chunk_key);
@@ -0,0 +1,38 @@
+-- Add metadata filter push-down to match_documents
+-- Run this in Supabase SQL Editor on databases created before the filter parameter existed
+
+-- Drop the old 3-argument signature so the new one doesn't become an ambiguous overload
+drop function if exists match_documents(vector(1536), int, float);
+
+create or replace function match_documents(
+  query_embedding vector(1536),
+  match_count int default 4,
+  match_threshold float default 0.7,
+  filter jsonb default '{}'
+)
+returns table (
+  id uuid,
+  content text,
+  metadata jsonb,
+  similarity float
+)
+language plpgsql
+as $$
+begin
+  -- Increase IVFFlat probe count for better recall on large datasets
+  set local ivfflat.probes = 10;
+
+  return query
+  select
+    documents.id,
+    documents.content,
+    documents.metadata,
+    1 - (documents.embedding <=> query_embedding) as similarity
+  from documents
+  -- Uses documents_metadata_idx (GIN) for the containment check
+  where documents.metadata @> filter
+    and 1 - (documents.embedding <=> query_embedding) > match_threshold
+  order by documents.embedding <=> query_embedding
+  limit match_count;
+end;
+$$;
@@ -0,0 +1,47 @@
+-- Let programme filters match chunks shared by several programmes
+-- Run this in Supabase SQL Editor on existing deployments.
+--
+-- Ingestion collapses near-duplicate chunks (boilerplate repeated across
+-- programme pages) into one row whose metadata.programs lists every
+-- programme it belongs to; metadata.program keeps the first of them.
+
+create or replace function match_documents(
+  query_embedding vector(1536),
+  match_count int default 4,
+  match_threshold float default 0.7,
+  filter jsonb default '{}'
+)
+returns table (
+  id uuid,
+  content text,
+  metadata jsonb,
+  similarity float
+)
+language plpgsql
+as $$
+begin
+  -- Increase IVFFlat probe count for better recall on large datasets
+  set local ivfflat.probes = 10;
+
+  return query
+  select
+    documents.id,
+    documents.content,
+    documents.metadata,
+    1 - (documents.embedding <=> query_embedding) as similarity
+  from documents
+  -- Both containment checks use documents_metadata_idx (GIN)
+  where (
+      documents.metadata @> filter
+      or (
+        filter ? 'program'
+        and documents.metadata @> (
+          (filter - 'program') || jsonb_build_object('programs', jsonb_build_array(filter->'program'))
+        )
+      )
+    )
+    and 1 - (documents.embedding <=> query_embedding) > match_threshold
+  order by documents.embedding <=> query_embedding
+  limit match_count;
+end;
+$$;
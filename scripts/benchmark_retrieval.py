@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""Benchmark retrieval quality and latency against a golden query set.
+
+Runs fully offline. Each golden query (data/benchmarks/golden_queries.json)
+names the metadata a relevant chunk must have, plus optional keywords its
+content must contain, so judgements hold across chunk sizes.
+
+Two embedding sources:
+
+- default: a deterministic hashing embedder over the deep-scraped data,
+  re-chunked at every --chunk-sizes value. Vectors are lexical, so the
+  numbers compare configurations rather than predict production quality.
+- --index DIR: a stored local index (scripts/snapshot_index.py or
+  scripts/build_index_bundle.py; a root serves its CURRENT version) with real
+  embeddings. Query vectors come from the embedding cache; queries that
+  were never embedded are skipped.
+
+Every configuration reports recall@k (share of queries with a relevant
+chunk in the top k), MRR, p50/p99 search latency, and tokens returned
+before and after context packing. "exact" searches the whole index;
+"routed" first narrows to the programme picked by the centroid router,
+standing in for an approximate, partitioned search.
+
+Usage:
+    python scripts/benchmark_retrieval.py
+    python scripts/benchmark_retrieval.py --chunk-sizes 250 400 600 --k 8
+    python scripts/benchmark_retrieval.py --index data/index --threshold 0.5
+    python scripts/benchmark_retrieval.py --json results.json
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from dotenv import load_dotenv
+
+# Load environment variables
+env_path = Path(__file__).parent.parent / "backend" / ".env"
+load_dotenv(env_path)
+
+# Required settings; never used, the benchmark makes no network calls
+for _key in ("OPENAI_API_KEY", "SUPABASE_URL", "SUPABASE_KEY"):
+    os.environ.setdefault(_key, "offline")
+
+from app.config import get_settings
+from app.rag.bm25 import get_lexical_index, tokenize
+from app.rag.context_packer import pack_context
+from app.rag.embedding_cache import embedding_cache_key, get_embedding_cache, normalize_embedding_text
+from app.rag.ingestion import build_program_texts, prepare_documents
+from app.rag.local_index import LocalVectorIndex, resolve_serving_path
+from app.rag.programme_router import ProgrammeRouter
+from app.rag.retriever import search_local_index
+from app.rag.tokenizer import count_tokens
+from app.scrapers.programme_store import find_programmes_file, iter_programmes
+
+PROJECT_ROOT = Path(__file__).parent.parent
+DEFAULT_GOLDEN = PROJECT_ROOT / "data" / "benchmarks" / "golden_queries.json"
+DEFAULT_DATA = find_programmes_file(PROJECT_ROOT / "data" / "scraped" / "deep", "all_programs_deep")
+
+# (name, hybrid, routed)
+CONFIGS = [
+    ("vector-exact", False, False),
+    ("hybrid-exact", True, False),
+    ("vector-routed", False, True),
+    ("hybrid-routed", True, True),
+]
+
+
+class HashingEmbedder:
+    """Deterministic bag-of-words embedder (signed feature hashing of uni/bigrams)."""
+
+    def __init__(self, dimensions: int = 512):
+        self.dimensions = dimensions
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        terms = tokenize(text)
+        for feature in terms + [f"{a} {b}" for a, b in zip(terms, terms[1:])]:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            value = int.from_bytes(digest, "little")
+            vector[value % self.dimensions] += 1.0 if value >> 63 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+def is_relevant(doc: dict, golden: dict) -> bool:
+    """Check a retrieved chunk against a golden query's expectations."""
+    metadata = doc.get("metadata", {})
+    if any(metadata.get(k) != v for k, v in golden["relevant"].items()):
+        return False
+    keywords = golden.get("keywords")
+    if keywords:
+        content = doc.get("content", "").lower()
+        return any(k.lower() in content for k in keywords)
+    return True
+
+
+def build_hashed_index(programs: list[dict], embedder: HashingEmbedder, chunk_size: int) -> LocalVectorIndex:
+    """Chunk and embed the scraped programmes into an in-memory index."""
+    documents = []
+    for program in programs:
+        if "error" in program:
+            continue
+        texts, metadatas = build_program_texts(program)
+        documents.extend(prepare_documents(texts, metadatas, chunk_size))
+
+    records = [
+        {"id": str(i), **doc, "embedding": embedder.embed(doc["content"])}
+        for i, doc in enumerate(documents)
+    ]
+    return LocalVectorIndex.from_records(records, {"source": "benchmark", "chunk_size": chunk_size})
+
+
+def cached_query_vectors(queries: list[dict]) -> dict[str, list[float]]:
+    """Look up stored embeddings for the golden queries in the embedding cache."""
+    settings = get_settings()
+    cache = get_embedding_cache()
+    if cache is None:
+        return {}
+    keys = {
+        q["query"]: embedding_cache_key(
+            normalize_embedding_text(q["query"]), settings.embedding_model, settings.embedding_dimensions
+        )
+        for q in queries
+    }
+    found = cache.get_many(list(keys.values()))
+    return {query: found[key] for query, key in keys.items() if key in found}
+
+
+def evaluate(
+    index: LocalVectorIndex,
+    queries: list[dict],
+    vectors: dict[str, list[float]],
+    k: int,
+    threshold: float,
+    hybrid: bool,
+    router: ProgrammeRouter | None,
+) -> dict:
+    """Run every golden query through one configuration and aggregate metrics."""
+    hits, reciprocal_ranks, latencies, tokens, packed_tokens = [], [], [], [], []
+
+    for golden in queries:
+        vector = vectors.get(golden["query"])
+        if vector is None:
+            continue
+
+        start = time.perf_counter()
+        filters = {}
+        if router is not None:
+            routed = router.route(vector)
+            if routed is not None:
+                filters = {"program": routed}
+        results = search_local_index(index, golden["query"], vector, k, threshold, filters, hybrid=hybrid)
+        if filters and len(results) < k:
+            # Same fallback as the retriever: too few routed hits, search globally
+            results = search_local_index(index, golden["query"], vector, k, threshold, {}, hybrid=hybrid)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+        rank = next((i for i, doc in enumerate(results, 1) if is_relevant(doc, golden)), None)
+        hits.append(rank is not None)
+        reciprocal_ranks.append(1.0 / rank if rank else 0.0)
+        tokens.append(sum(count_tokens(doc["content"]) for doc in results))
+        packed_tokens.append(sum(count_tokens(doc["content"]) for doc in pack_context(results)))
+
+    if not latencies:
+        return {"queries": 0}
+    return {
+        "queries": len(latencies),
+        f"recall@{k}": float(np.mean(hits)),
+        "mrr": float(np.mean(reciprocal_ranks)),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "avg_tokens": float(np.mean(tokens)),
+        "avg_packed_tokens": float(np.mean(packed_tokens)),
+    }
+
+
+def run_configs(index, queries, vectors, k, threshold, label) -> list[dict]:
+    """Evaluate every configuration against one index."""
+    # Build the lexical index and router before timing anything
+    get_lexical_index(index)
+    router = ProgrammeRouter.from_index(index)
+
+    rows = []
+    for name, hybrid, routed in CONFIGS:
+        metrics = evaluate(index, queries, vectors, k, threshold, hybrid, router if routed else None)
+        rows.append({"index": label, "config": name, **metrics})
+    return rows
+
+
+def print_table(rows: list[dict], k: int):
+    header = f"{'index':<26} {'config':<14} {'n':>3} {f'R@{k}':>6} {'MRR':>6} {'p50ms':>7} {'p99ms':>7} {'tokens':>7} {'packed':>7}"
+    print(header)
+    print("-" * len(header))
+    for row in rows:
+        if not row.get("queries"):
+            print(f"{row['index']:<26} {row['config']:<14}   0  (no query vectors)")
+            continue
+        print(
+            f"{row['index']:<26} {row['config']:<14} {row['queries']:>3} "
+            f"{row[f'recall@{k}']:>6.2f} {row['mrr']:>6.3f} {row['p50_ms']:>7.2f} {row['p99_ms']:>7.2f} "
+            f"{row['avg_tokens']:>7.0f} {row['avg_packed_tokens']:>7.0f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline retrieval benchmark over golden queries.")
+    parser.add_argument("--golden", type=Path, default=DEFAULT_GOLDEN, help="Golden query JSON file.")
+    parser.add_argument("--data", type=Path, default=DEFAULT_DATA, help="Scraped programmes, JSON Lines or JSON (hashing mode).")
+    parser.add_argument("--index", type=Path, default=None, help="Stored local index directory (artifact mode).")
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=None, help="Chunk sizes to compare (hashing mode).")
+    parser.add_argument("--dimensions", type=int, default=512, help="Hashing embedder dimensions.")
+    parser.add_argument("--k", type=int, default=5, help="Results per query.")
+    parser.add_argument("--threshold", type=float, default=0.0, help="Minimum vector similarity.")
+    parser.add_argument("--json", type=Path, default=None, help="Also write results to this JSON file.")
+    args = parser.parse_args()
+
+    with open(args.golden, "r", encoding="utf-8") as f:
+        queries = json.load(f)
+
+    rows: list[dict] = []
+    if args.index:
+        index = LocalVectorIndex.load(resolve_serving_path(args.index))
+        vectors = cached_query_vectors(queries)
+        print(f"Loaded {len(index)} chunks from {args.index}; {len(vectors)}/{len(queries)} queries have stored embeddings")
+        rows += run_configs(index, queries, vectors, args.k, args.threshold, f"artifact:{index.version}")
+    else:
+        programs = list(iter_programmes(args.data))
+        embedder = HashingEmbedder(args.dimensions)
+        vectors = {q["query"]: embedder.embed(q["query"]).tolist() for q in queries}
+        for chunk_size in args.chunk_sizes or [get_settings().chunk_size]:
+            index = build_hashed_index(programs, embedder, chunk_size)
+            print(f"chunk_size={chunk_size}: {len(index)} chunks")
+            rows += run_configs(index, queries, vectors, args.k, args.threshold, f"hash:chunk={chunk_size}")
+
+    print()
+    print_table(rows, args.k)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+        print(f"\nWrote results to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
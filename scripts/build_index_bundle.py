@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""Build a versioned local index bundle from scraped programme data.
+
+Turns data/scraped/deep/all_programs_deep.jsonl (or .json) into data/index/<version>/
+(chunks.jsonl, memory-mappable embeddings.npy, programs.json, manifest.json)
+and points data/index/CURRENT at it. The backend loads the current bundle
+at startup and serves searches and programme data without touching
+Supabase. Programme records include the spider chart scores from
+seed_profile_scores.py.
+
+Embeddings come from the OpenAI API, or from the embedding cache for
+chunks embedded before.
+
+Usage:
+    python scripts/build_index_bundle.py                     # Build and publish a new version
+    python scripts/build_index_bundle.py --data other.jsonl  # Build from another programmes file
+    python scripts/build_index_bundle.py --list              # List published versions
+    python scripts/build_index_bundle.py --use <version>     # Roll back / forward to a version
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from dotenv import load_dotenv
+
+# Load environment variables
+env_path = Path(__file__).parent.parent / "backend" / ".env"
+load_dotenv(env_path)
+
+from app.rag.bundle import build_bundle
+from app.rag.local_index import (
+    list_index_versions,
+    resolve_index_path,
+    resolve_serving_path,
+    set_current_version,
+)
+from app.scrapers.programme_store import find_programmes_file, iter_programmes
+from seed_profile_scores import PROFILE_SCORES
+
+DEFAULT_DATA = find_programmes_file(Path(__file__).parent.parent / "data" / "scraped" / "deep", "all_programs_deep")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Build a local index bundle from scraped programmes.")
+    parser.add_argument("--data", type=Path, default=DEFAULT_DATA, help="Scraped programmes (JSON Lines or JSON).")
+    parser.add_argument("--out", type=str, default=None, help="Index root directory.")
+    parser.add_argument("--no-dedup", action="store_true", help="Keep near-duplicate chunks.")
+    parser.add_argument("--list", action="store_true", help="List published versions and exit.")
+    parser.add_argument("--use", type=str, default=None, help="Make a published version current and exit.")
+    args = parser.parse_args()
+
+    if args.list:
+        current = resolve_serving_path(args.out).name
+        for version in list_index_versions(args.out):
+            print(f"{'*' if version == current else ' '} {version}")
+        return
+
+    if args.use:
+        set_current_version(args.use, args.out)
+        print(f"CURRENT -> {args.use} ({resolve_index_path(args.out)})")
+        return
+
+    if args.data is None:
+        parser.error("no scraped programmes found; run deep_scrape.py or pass --data")
+
+    print(f"Building bundle from {args.data}...")
+    index = await build_bundle(
+        iter_programmes(args.data), args.out, dedup=not args.no_dedup, profile_scores=PROFILE_SCORES
+    )
+    print(f"Published {len(index)} chunks from {len(index.programs)} programmes as version {index.version}")
+    print(f"  -> {resolve_serving_path(args.out)}")
+    print(f"  content hash {index.manifest['content_hash']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
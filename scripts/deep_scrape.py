@@ -2,7 +2,9 @@
 """Deep-scrape all NBS programmes (landing pages, sub-pages, PDFs).
 
 Outputs one JSON file per programme into data/scraped/deep/, plus a
-combined all_programs_deep.json for the ingestion pipeline.
+combined all_programs_deep.jsonl (one programme per line) for the
+ingestion pipeline. Each programme is written as soon as it is scraped,
+so memory stays flat and an interrupted crawl keeps what it finished.
 """
 
 import json
@@ -16,6 +18,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
 
 from app.scrapers.deep_scraper import NBSDeepScraper, ScrapedProgramme
 from app.scrapers.programme_registry import get_registry
+from app.scrapers.programme_store import ProgrammeWriter
 
 logging.basicConfig(
     level=logging.INFO,
@@ -87,36 +90,33 @@ def main():
     print(f"Deep-scraping {len(registry)} programmes...")
     print("=" * 60)
 
-    with NBSDeepScraper(skip_pdfs=False) as scraper:
-        results = scraper.scrape_all(registry)
+    combined_path = output_dir / "all_programs_deep.jsonl"
+    ok = errs = total_sub = total_pdf = 0
 
-    # Write individual programme files + combined file
-    all_programs: list[dict] = []
+    # Write individual programme files + combined file as each programme finishes
+    with NBSDeepScraper(skip_pdfs=False) as scraper, ProgrammeWriter(combined_path) as combined:
+        for sp in scraper.iter_scrape(registry):
+            prog_dict = programme_to_dict(sp)
+            combined.write(prog_dict)
 
-    for sp in results:
-        prog_dict = programme_to_dict(sp)
-        all_programs.append(prog_dict)
+            # Individual file
+            individual_path = output_dir / f"{sp.entry.slug}.json"
+            with open(individual_path, "w", encoding="utf-8") as f:
+                json.dump(prog_dict, f, indent=2, ensure_ascii=False)
 
-        # Individual file
-        individual_path = output_dir / f"{sp.entry.slug}.json"
-        with open(individual_path, "w", encoding="utf-8") as f:
-            json.dump(prog_dict, f, indent=2, ensure_ascii=False)
-
-    # Combined file
-    combined_path = output_dir / "all_programs_deep.json"
-    with open(combined_path, "w", encoding="utf-8") as f:
-        json.dump(all_programs, f, indent=2, ensure_ascii=False)
+            if "error" in prog_dict:
+                errs += 1
+            else:
+                ok += 1
+            total_sub += len(prog_dict["sub_pages"])
+            total_pdf += len(prog_dict["pdf_contents"])
 
     print("=" * 60)
-    print(f"Done! {len(all_programs)} programmes scraped.")
+    print(f"Done! {combined.count} programmes scraped.")
     print(f"Individual files: {output_dir}/")
     print(f"Combined file:    {combined_path}")
 
     # Summary
-    ok = sum(1 for p in all_programs if "error" not in p)
-    errs = len(all_programs) - ok
-    total_sub = sum(len(p.get("sub_pages", {})) for p in all_programs)
-    total_pdf = sum(len(p.get("pdf_contents", [])) for p in all_programs)
     print(f"\nSuccess: {ok} | Errors: {errs} | Sub-pages: {total_sub} | PDFs: {total_pdf}")
 
 
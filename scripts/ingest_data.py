@@ -1,13 +1,29 @@
 #!/usr/bin/env python3
 """Script to ingest scraped NBS data into Supabase vector store.
 
-Prefers deep-scraped data (data/scraped/deep/all_programs_deep.json) when
-available, falling back to the legacy all_programs.json.
+Prefers deep-scraped data (data/scraped/deep/all_programs_deep.jsonl, or
+the older all_programs_deep.json) when available, falling back to the
+legacy all_programs.json. Programmes are parsed one at a time and streamed
+into the pipeline.
+
+With --plan nothing is embedded or written: the run is chunked and diffed
+against stored chunk hashes, and chunks, tokens, API calls, cost and index
+growth are reported per programme and doc type.
+
+Usage:
+    python scripts/ingest_data.py          # Ingest (incremental)
+    python scripts/ingest_data.py --plan   # Estimate the run without writing
+
+Ingestion is incremental: only new or changed chunks are embedded and
+upserted, and chunks that disappeared from a programme are deleted, so
+the live table is never emptied during a refresh.
 """
 
+import argparse
 import asyncio
-import json
+import itertools
 import sys
+from collections.abc import Iterator
 from pathlib import Path
 
 # Add backend to path
@@ -19,94 +35,70 @@ from dotenv import load_dotenv
 env_path = Path(__file__).parent.parent / "backend" / ".env"
 load_dotenv(env_path)
 
-from app.rag.ingestion import ingest_documents, ingest_program_data
+from app.rag.ingestion import build_program_texts
+from app.rag.local_index import resolve_serving_path, snapshot_local_index
+from app.rag.pipeline import IngestionPipeline, IngestionSource
+from app.rag.planner import plan_ingestion
+from app.scrapers.programme_store import find_programmes_file, iter_programmes
 from app.db.supabase import get_supabase_admin_client
 
 
-async def clear_documents():
-    """Delete all existing documents from the vector store."""
-    client = get_supabase_admin_client()
-    # Delete all rows (Supabase requires a filter, so use a tautology)
-    result = client.table("documents").delete().neq("id", "00000000-0000-0000-0000-000000000000").execute()
-    count = len(result.data) if result.data else 0
-    print(f"Cleared {count} existing documents from vector store")
-    return count
-
-
-async def ingest_programs_from_json(json_path: Path) -> int:
-    """Ingest programs from JSON file.
+def program_sources(json_path: Path) -> Iterator[IngestionSource]:
+    """Yield one incremental ingestion source per programme in a programmes file.
 
     Args:
-        json_path: Path to JSON file with program data
+        json_path: Path to a JSON Lines or JSON file with program data
 
-    Returns:
-        Number of documents ingested
+    Yields:
+        IngestionSource scoped to the programme's documents
     """
-    with open(json_path, "r", encoding="utf-8") as f:
-        programs = json.load(f)
-
-    total_ingested = 0
-
-    for program in programs:
+    for program in iter_programmes(json_path):
         if "error" in program:
             print(f"Skipping {program.get('name', 'Unknown')} due to error")
             continue
 
-        print(f"Ingesting {program['name']}...")
-        count = await ingest_program_data(program)
-        total_ingested += count
-        print(f"  -> Ingested {count} document chunks")
+        texts, metadatas = build_program_texts(program)
+        yield IngestionSource(program["name"], texts, metadatas, {"program": program["name"]})
 
-    return total_ingested
 
-
-async def ingest_additional_content(content_dir: Path) -> int:
-    """Ingest additional content files (markdown, txt).
+def additional_content_sources(content_dir: Path) -> Iterator[IngestionSource]:
+    """Yield one ingestion source per additional content file (markdown, txt).
 
     Args:
         content_dir: Directory containing content files
 
-    Returns:
-        Number of documents ingested
+    Yields:
+        IngestionSource scoped to the file's documents
     """
-    total_ingested = 0
-
-    for filepath in content_dir.glob("*.md"):
-        print(f"Ingesting {filepath.name}...")
-        content = filepath.read_text(encoding="utf-8")
-        count = await ingest_documents(
-            [content],
-            [{"source": filepath.name, "type": "additional_content"}]
-        )
-        total_ingested += count
-
-    for filepath in content_dir.glob("*.txt"):
-        print(f"Ingesting {filepath.name}...")
+    for filepath in [*content_dir.glob("*.md"), *content_dir.glob("*.txt")]:
         content = filepath.read_text(encoding="utf-8")
-        count = await ingest_documents(
+        yield IngestionSource(
+            filepath.name,
             [content],
-            [{"source": filepath.name, "type": "additional_content"}]
+            [{"source": filepath.name, "type": "additional_content"}],
+            {"source": filepath.name},
         )
-        total_ingested += count
-
-    return total_ingested
 
 
 async def main():
     """Run the data ingestion pipeline."""
-    print("Starting data ingestion...")
+    parser = argparse.ArgumentParser(description="Ingest scraped NBS data into the vector store.")
+    parser.add_argument("--plan", action="store_true", help="Estimate chunks, tokens and cost without writing.")
+    parser.add_argument("--top", type=int, default=None, help="With --plan, list only the N largest programmes.")
+    args = parser.parse_args()
+
+    print("Planning data ingestion..." if args.plan else "Starting data ingestion...")
     print("=" * 50)
 
     data_dir = Path(__file__).parent.parent / "data" / "scraped"
-    deep_json = data_dir / "deep" / "all_programs_deep.json"
-    legacy_json = data_dir / "all_programs.json"
-    total = 0
+    deep_json = find_programmes_file(data_dir / "deep", "all_programs_deep")
+    legacy_json = find_programmes_file(data_dir, "all_programs")
 
     # Determine which data source to use
-    if deep_json.exists():
+    if deep_json:
         programs_json = deep_json
         print(f"Using deep-scraped data: {deep_json}")
-    elif legacy_json.exists():
+    elif legacy_json:
         programs_json = legacy_json
         print(f"Deep-scraped data not found, using legacy: {legacy_json}")
     else:
@@ -114,22 +106,34 @@ async def main():
         print("No programs file found.")
         print("Run deep_scrape.py first to scrape programme data")
 
+    sources = additional_content_sources(data_dir)
     if programs_json:
-        # Clear old documents before re-ingesting
-        print("\nClearing existing vector store...")
-        await clear_documents()
-
         print(f"\nIngesting programmes from {programs_json.name}...")
-        count = await ingest_programs_from_json(programs_json)
-        total += count
-        print(f"\nIngested {count} documents from programmes")
+        sources = itertools.chain(program_sources(programs_json), sources)
+
+    if args.plan:
+        print()
+        print(plan_ingestion(sources, get_supabase_admin_client()).report(args.top))
+        return
+
+    # Chunking, embedding and writes overlap across all sources
+    pipeline = IngestionPipeline()
+    counts = await pipeline.run(sources)
+    for label, stats in counts.items():
+        print(
+            f"  {label}: {stats['upserted']} upserted, {stats['unchanged']} unchanged, "
+            f"{stats['deleted']} deleted, {stats['duplicates']} duplicates"
+        )
+    total = sum(stats["upserted"] for stats in counts.values())
+    print(f"\n{pipeline.summary()}")
 
-    # Ingest additional content if present
-    additional_count = await ingest_additional_content(data_dir)
-    total += additional_count
+    # Refresh the local exact index served by the backend
+    print("\nSnapshotting local vector index...")
+    index = snapshot_local_index(get_supabase_admin_client())
+    print(f"  -> Wrote {len(index)} documents to {resolve_serving_path()}")
 
     print("=" * 50)
-    print(f"Ingestion complete! Total documents: {total}")
+    print(f"Ingestion complete! Chunks upserted: {total}")
 
 
 if __name__ == "__main__":
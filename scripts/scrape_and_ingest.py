@@ -4,19 +4,21 @@
 Replaces the separate scrape_nbs.py and ingest_data.py scripts.
 
 Usage:
-    python scripts/scrape_and_ingest.py                # Scrape all programmes and ingest
-    python scripts/scrape_and_ingest.py --clean         # Truncate DB first, then scrape + ingest
+    python scripts/scrape_and_ingest.py                # Scrape all programmes and ingest (incremental)
+    python scripts/scrape_and_ingest.py --clean         # Truncate DB first, then scrape + ingest (full rebuild)
     python scripts/scrape_and_ingest.py --programme mba # Scrape only programmes matching 'mba'
     python scripts/scrape_and_ingest.py --no-pdfs       # Skip PDF download/extraction
     python scripts/scrape_and_ingest.py --dry-run       # Scrape only, don't write to DB
-    python scripts/scrape_and_ingest.py --save-json     # Also save scraped data to JSON
+    python scripts/scrape_and_ingest.py --plan          # Scrape, then estimate chunks/tokens/cost without writing
+    python scripts/scrape_and_ingest.py --save-json     # Also save scraped data to JSON Lines
 """
 
 import argparse
 import asyncio
-import json
 import logging
 import sys
+from collections.abc import Iterable, Iterator
+from contextlib import nullcontext
 from pathlib import Path
 
 # Add backend to Python path
@@ -31,12 +33,18 @@ load_dotenv(env_path)
 from app.scrapers.deep_scraper import NBSDeepScraper, ScrapedProgramme
 from app.scrapers.programme_registry import (
     ProgrammeEntry,
+    degree_type_for,
     get_registry,
     get_registry_by_slug,
 )
 from app.scrapers.content_cleaner import clean_pdf_text
-from app.rag.ingestion import ingest_program_data
-from app.db.supabase import get_supabase_admin_client
+from app.scrapers.programme_store import ProgrammeWriter
+from app.rag.ingestion import build_program_texts
+from app.rag.local_index import resolve_serving_path, snapshot_local_index
+from app.rag.pipeline import IngestionPipeline, IngestionSource
+from app.rag.planner import plan_ingestion
+from app.db.catalog import bump_catalog_version
+from app.db.supabase import bulk_upsert, get_supabase_admin_client
 
 logger = logging.getLogger(__name__)
 
@@ -48,7 +56,7 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument(
         "--clean",
         action="store_true",
-        help="Truncate documents table and delete all programmes before ingesting.",
+        help="Truncate documents table and delete all programmes before ingesting (full rebuild; refreshes are incremental without it).",
     )
     parser.add_argument(
         "--programme",
@@ -66,10 +74,15 @@ def parse_args() -> argparse.Namespace:
         action="store_true",
         help="Scrape only; do not write anything to the database.",
     )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Scrape, then report chunks, tokens, API calls, cost and index growth per programme without writing.",
+    )
     parser.add_argument(
         "--save-json",
         action="store_true",
-        help="Save scraped data to data/scraped/ as JSON alongside DB ingestion.",
+        help="Save scraped data to data/scraped/ as JSON Lines alongside DB ingestion.",
     )
     return parser.parse_args()
 
@@ -110,24 +123,8 @@ def clean_database():
             logger.warning("Could not clean 'programs' table: %s", e2)
 
 
-def _extract_degree_type(entry: ProgrammeEntry) -> str:
-    """Derive degree_type from programme name/category."""
-    name_upper = entry.name.upper()
-    if entry.category == "phd":
-        return "PhD"
-    if entry.category == "undergraduate":
-        return "Bachelor"
-    if "EMBA" in name_upper or "EXECUTIVE MBA" in name_upper:
-        return "EMBA"
-    if "MBA" in name_upper:
-        return "MBA"
-    if "MSC" in name_upper or "MASTER" in name_upper:
-        return "MSc"
-    return "Other"
-
-
 def upsert_programme(entry: ProgrammeEntry, scraped: ScrapedProgramme):
-    """Write programme metadata to the programs table."""
+    """Write programme metadata to the programs table (shared, pooled admin client)."""
     client = get_supabase_admin_client()
 
     landing = scraped.landing_page
@@ -137,7 +134,7 @@ def upsert_programme(entry: ProgrammeEntry, scraped: ScrapedProgramme):
 
     record = {
         "name": entry.name,
-        "degree_type": _extract_degree_type(entry),
+        "degree_type": degree_type_for(entry),
         "description": description,
         "url": entry.landing_url,
         "metadata": {
@@ -149,18 +146,9 @@ def upsert_programme(entry: ProgrammeEntry, scraped: ScrapedProgramme):
         },
     }
 
-    # Try upsert by name
+    # One round trip: programs.name is unique
     try:
-        existing = (
-            client.table("programs")
-            .select("id")
-            .eq("name", entry.name)
-            .execute()
-        )
-        if existing.data:
-            client.table("programs").update(record).eq("name", entry.name).execute()
-        else:
-            client.table("programs").insert(record).execute()
+        bulk_upsert(client, "programs", [record], on_conflict="name")
     except Exception as e:
         logger.warning("Failed to upsert programme %s: %s", entry.name, e)
 
@@ -172,7 +160,7 @@ def build_program_dict(entry: ProgrammeEntry, scraped: ScrapedProgramme) -> dict
     program = {
         "name": entry.name,
         "url": entry.landing_url,
-        "degree_type": _extract_degree_type(entry),
+        "degree_type": degree_type_for(entry),
         "category": entry.category,
         "language": entry.language,
         "description": landing.content if landing and not landing.error else "",
@@ -211,18 +199,44 @@ def build_program_dict(entry: ProgrammeEntry, scraped: ScrapedProgramme) -> dict
     return program
 
 
-async def ingest_one_programme(entry: ProgrammeEntry, scraped: ScrapedProgramme, dry_run: bool) -> int:
-    """Upsert programme metadata and ingest all documents for one programme."""
-    if dry_run:
-        return 0
+def programme_source(scraped: ScrapedProgramme, program: dict, upsert: bool = True) -> IngestionSource:
+    """Upsert programme metadata and build the incremental ingestion source for its documents."""
+    if upsert:
+        upsert_programme(scraped.entry, scraped)
+    texts, metadatas = build_program_texts(program)
+    return IngestionSource(scraped.entry.name, texts, metadatas, {"program": scraped.entry.name})
+
+
+def ingestable_programmes(
+    results: Iterable[ScrapedProgramme],
+    totals: dict[str, int],
+    writer: ProgrammeWriter | None = None,
+) -> Iterator[tuple[ScrapedProgramme, dict]]:
+    """Yield successfully scraped programmes with their ingestion dicts, as they finish.
+
+    Args:
+        results: Scraped programmes, typically a lazy NBSDeepScraper.iter_scrape
+        totals: Running counters of programmes, pages and PDFs, updated in place
+        writer: Optional JSON Lines writer each programme dict is appended to
+
+    Yields:
+        (scraped programme, dict in the format expected by build_program_texts)
+    """
+    for scraped in results:
+        entry = scraped.entry
+
+        if scraped.landing_page and scraped.landing_page.error:
+            print(f"  Skipping {entry.name} (landing page failed)")
+            continue
 
-    # Upsert to programs table
-    upsert_programme(entry, scraped)
+        totals["programmes"] += 1
+        totals["pages"] += 1 + len(scraped.sub_pages)
+        totals["pdfs"] += len(scraped.pdf_contents)
 
-    # Build dict and ingest documents
-    program_dict = build_program_dict(entry, scraped)
-    count = await ingest_program_data(program_dict)
-    return count
+        program = build_program_dict(entry, scraped)
+        if writer is not None:
+            writer.write(program)
+        yield scraped, program
 
 
 async def main():
@@ -243,63 +257,81 @@ async def main():
     print(f"Programmes to scrape: {len(registry)}")
     print(f"PDF extraction: {'ON' if args.with_pdfs else 'OFF'}")
     print(f"Dry run: {'YES' if args.dry_run else 'NO'}")
+    print(f"Plan only: {'YES' if args.plan else 'NO'}")
     print(f"=" * 60)
 
+    # Planning and dry runs never write
+    writes = not (args.dry_run or args.plan)
+
     # Clean DB if requested
-    if args.clean and not args.dry_run:
+    if args.clean and writes:
         clean_database()
 
-    # Scrape
-    pdf_dir = str(Path(__file__).parent.parent / "data" / "pdfs")
-    with NBSDeepScraper(skip_pdfs=not args.with_pdfs, pdf_download_dir=pdf_dir) as scraper:
-        results = scraper.scrape_all(registry)
-
-    # Ingest
-    total_chunks = 0
-    total_pages = 0
-    total_pdfs = 0
-    successful = 0
-    all_program_dicts = []
-
-    for scraped in results:
-        entry = scraped.entry
+    json_path = Path(__file__).parent.parent / "data" / "scraped" / "all_programs_deep.jsonl"
+    totals = {"programmes": 0, "pages": 0, "pdfs": 0}
+    counts: dict[str, dict[str, int]] = {}
 
-        if scraped.landing_page and scraped.landing_page.error:
-            print(f"  Skipping {entry.name} (landing page failed)")
-            continue
-
-        n_sub = len(scraped.sub_pages)
-        n_pdf = len(scraped.pdf_contents)
-        total_pages += 1 + n_sub
-        total_pdfs += n_pdf
-
-        count = await ingest_one_programme(entry, scraped, args.dry_run)
-        total_chunks += count
-        successful += 1
-        print(f"  Ingested {entry.name}: {count} chunks")
-
-        if args.save_json:
-            all_program_dicts.append(build_program_dict(entry, scraped))
+    # Scrape and ingest in one stream: each programme is chunked (and saved)
+    # as soon as it is scraped, so memory stays flat however large the crawl
+    pdf_dir = str(Path(__file__).parent.parent / "data" / "pdfs")
+    with (
+        NBSDeepScraper(skip_pdfs=not args.with_pdfs, pdf_download_dir=pdf_dir) as scraper,
+        ProgrammeWriter(json_path) if args.save_json else nullcontext() as writer,
+    ):
+        programmes = ingestable_programmes(scraper.iter_scrape(registry), totals, writer)
+
+        if args.dry_run:
+            for _ in programmes:
+                pass
+        elif args.plan:
+            plan = plan_ingestion(
+                (programme_source(scraped, program, upsert=False) for scraped, program in programmes),
+                get_supabase_admin_client(),
+            )
+            print(f"\n{plan.report()}")
+        else:
+            # One pipeline over all programmes: chunking, embedding and writes overlap.
+            # Only new or changed chunks are embedded; vanished ones are deleted.
+            pipeline = IngestionPipeline()
+            counts = await pipeline.run(
+                programme_source(scraped, program) for scraped, program in programmes
+            )
+            for name, stats in counts.items():
+                print(
+                    f"  Ingested {name}: {stats['upserted']} upserted, "
+                    f"{stats['unchanged']} unchanged, {stats['deleted']} deleted, "
+                    f"{stats['duplicates']} duplicates"
+                )
+            print(f"\n{pipeline.summary()}")
+
+    if writes:
+        # Refresh the local exact index served by the backend
+        index = snapshot_local_index(get_supabase_admin_client())
+        print(f"\nSnapshotted {len(index)} documents to {resolve_serving_path()}")
+
+        # Tell serving processes the programs table changed
+        try:
+            version = bump_catalog_version(get_supabase_admin_client())
+            print(f"Programme catalog version: {version}")
+        except Exception as e:
+            logger.warning("Could not write the catalog version stamp (catalogs refresh on their TTL): %s", e)
 
-    # Save JSON if requested
-    if args.save_json and all_program_dicts:
-        json_dir = Path(__file__).parent.parent / "data" / "scraped"
-        json_dir.mkdir(parents=True, exist_ok=True)
-        json_path = json_dir / "all_programs_deep.json"
-        with open(json_path, "w", encoding="utf-8") as f:
-            json.dump(all_program_dicts, f, indent=2, ensure_ascii=False)
-        print(f"\nSaved JSON to {json_path}")
+    if args.save_json:
+        print(f"\nSaved JSON Lines to {json_path}")
 
     # Summary
     print(f"\n{'=' * 60}")
     print(f"SCRAPE + INGEST COMPLETE")
     print(f"{'=' * 60}")
-    print(f"Programmes scraped:  {successful}/{len(registry)}")
-    print(f"Pages crawled:       {total_pages}")
-    print(f"PDFs extracted:      {total_pdfs}")
-    print(f"Document chunks:     {total_chunks}")
-    if args.dry_run:
-        print(f"(Dry run - nothing written to database)")
+    print(f"Programmes scraped:  {totals['programmes']}/{len(registry)}")
+    print(f"Pages crawled:       {totals['pages']}")
+    print(f"PDFs extracted:      {totals['pdfs']}")
+    print(f"Chunks upserted:     {sum(c['upserted'] for c in counts.values())}")
+    print(f"Chunks unchanged:    {sum(c['unchanged'] for c in counts.values())}")
+    print(f"Chunks deleted:      {sum(c['deleted'] for c in counts.values())}")
+    print(f"Duplicates removed:  {sum(c['duplicates'] for c in counts.values())}")
+    if not writes:
+        print(f"({'Plan' if args.plan else 'Dry run'} - nothing written to database)")
 
 
 if __name__ == "__main__":
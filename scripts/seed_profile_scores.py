@@ -24,6 +24,8 @@ load_dotenv(os.path.join(os.path.dirname(__file__), '..', 'backend', '.env'))
 
 from supabase import create_client
 
+from app.db.catalog import bump_catalog_version
+
 PROFILE_SCORES = {
     # MBA programmes
     "Nanyang MBA": {
@@ -145,6 +147,13 @@ def main():
         else:
             print(f"  Skipped (no scores defined): {name}")
 
+    if updated:
+        # Serving processes reload their programme catalog
+        try:
+            bump_catalog_version(supabase)
+        except Exception as e:
+            print(f"Could not write the catalog version stamp: {e}")
+
     print(f"\nDone! Updated {updated}/{len(result.data)} programmes.")
 
 
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""Snapshot the Supabase documents table into the local vector index.
+
+The backend serves searches from this on-disk index (exact cosine
+similarity, no network round trip) and falls back to the
+match_documents RPC when it is missing.
+
+Usage:
+    python scripts/snapshot_index.py                  # Write to settings.local_index_path
+    python scripts/snapshot_index.py --out /tmp/index # Write somewhere else
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add backend to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+from dotenv import load_dotenv
+
+# Load environment variables
+env_path = Path(__file__).parent.parent / "backend" / ".env"
+load_dotenv(env_path)
+
+from app.rag.local_index import resolve_serving_path, snapshot_local_index
+from app.db.supabase import get_supabase_admin_client
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot documents into the local vector index.")
+    parser.add_argument("--out", type=str, default=None, help="Index root directory (a new version is published under it).")
+    args = parser.parse_args()
+
+    print("Snapshotting documents table...")
+    index = snapshot_local_index(get_supabase_admin_client(), args.out)
+    print(f"Wrote {len(index)} documents to {resolve_serving_path(args.out)} (version {index.version})")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,9 +10,16 @@ create table if not exists documents (
   content text not null,
   metadata jsonb default '{}',
   embedding vector(1536),
+  -- Stable chunk identity and content hash for incremental ingestion
+  chunk_key text,
+  content_hash text,
   created_at timestamp with time zone default now()
 );
 
+-- Upserts during incremental ingestion conflict on chunk_key
+create unique index if not exists documents_chunk_key_idx
+  on documents (chunk_key);
+
 -- Create index for vector similarity search
 create index if not exists documents_embedding_idx
   on documents using ivfflat (embedding vector_cosine_ops)
@@ -50,11 +57,15 @@ create table if not exists chat_history (
 create index if not exists chat_history_conversation_idx
   on chat_history (conversation_id, created_at);
 
--- Function to match documents by vector similarity
+-- Function to match documents by vector similarity, optionally restricted
+-- to documents whose metadata contains `filter` (e.g. {"program": "MSc Finance"}).
+-- A programme filter also matches chunks shared by several programmes,
+-- which list them in metadata.programs.
 create or replace function match_documents(
   query_embedding vector(1536),
   match_count int default 4,
-  match_threshold float default 0.7
+  match_threshold float default 0.7,
+  filter jsonb default '{}'
 )
 returns table (
   id uuid,
@@ -75,7 +86,16 @@ begin
     documents.metadata,
     1 - (documents.embedding <=> query_embedding) as similarity
   from documents
-  where 1 - (documents.embedding <=> query_embedding) > match_threshold
+  where (
+      documents.metadata @> filter
+      or (
+        filter ? 'program'
+        and documents.metadata @> (
+          (filter - 'program') || jsonb_build_object('programs', jsonb_build_array(filter->'program'))
+        )
+      )
+    )
+    and 1 - (documents.embedding <=> query_embedding) > match_threshold
   order by documents.embedding <=> query_embedding
   limit match_count;
 end;
@@ -108,11 +128,20 @@ insert into programs (name, degree_type, description, duration, url) values
   ('Bachelor of Business', 'Bachelor', 'The Bachelor of Business programme provides a comprehensive foundation in business and management.', '4 years', 'https://www.ntu.edu.sg/business/admissions/ugadmission')
 on conflict (name) do nothing;
 
+-- Key/value metadata; catalog_version is bumped whenever the programs
+-- table changes, so the backend reloads its in-memory programme catalog
+create table if not exists app_metadata (
+  key text primary key,
+  value text not null,
+  updated_at timestamp with time zone default now()
+);
+
 -- Row Level Security (RLS) policies
 -- Enable RLS on tables
 alter table documents enable row level security;
 alter table chat_history enable row level security;
 alter table programs enable row level security;
+alter table app_metadata enable row level security;
 
 -- Allow read access to documents for authenticated and anon users
 create policy "Allow read access to documents" on documents
@@ -122,6 +151,10 @@ create policy "Allow read access to documents" on documents
 create policy "Allow read access to programs" on programs
   for select using (true);
 
+-- Allow read access to app metadata
+create policy "Allow read access to app metadata" on app_metadata
+  for select using (true);
+
 -- Allow read/write access to chat history
 create policy "Allow read access to chat history" on chat_history
   for select using (true);